@@ -1,25 +1,53 @@
 import streamlit as st
 
-from db.sqlite_store import save_tabla_maestra_to_db
+from db.escritor import ConflictoDeVersion
+from db.repository import delete_by_expediente, delete_localidad
+from state import sincronizar_tabla_maestra, version_sesion
 
 
 def eliminar_localidad(nombre_localidad: str):
-    """Elimina una localidad completa de la tabla maestra."""
+    """Elimina una localidad completa (DELETE en la DB; la tabla en sesión se refresca desde el log)."""
     if st.session_state["tabla_maestra"].empty:
         st.warning("⚠️ No hay datos cargados en la tabla maestra.")
         return
 
-    df = st.session_state["tabla_maestra"]
-    if "Localidad" not in df.columns:
+    if "Localidad" not in st.session_state["tabla_maestra"].columns:
         st.error("❌ No se encontró columna 'Localidad'.")
         return
 
-    eliminados = len(df[df["Localidad"] == nombre_localidad])
+    version_previa = version_sesion()
+    try:
+        eliminados = delete_localidad(nombre_localidad, version_esperada=version_previa)
+    except ConflictoDeVersion as e:
+        sincronizar_tabla_maestra()
+        st.warning(f"⚠️ {e}")
+        return
+
+    sincronizar_tabla_maestra()
     if eliminados == 0:
         st.info(f"ℹ️ No se encontró la localidad **{nombre_localidad}** en la tabla.")
         return
 
-    st.session_state["tabla_maestra"] = df[df["Localidad"] != nombre_localidad]
-    # >>> CAMBIO SQLITE: guardamos en DB
-    save_tabla_maestra_to_db(st.session_state["tabla_maestra"])
     st.success(f"✅ Localidad **{nombre_localidad}** eliminada ({eliminados} registros).")
+
+
+def eliminar_expediente(expediente: str):
+    """Elimina todas las mediciones cargadas bajo un expediente."""
+    if st.session_state["tabla_maestra"].empty:
+        st.warning("⚠️ No hay datos cargados en la tabla maestra.")
+        return
+
+    version_previa = version_sesion()
+    try:
+        eliminados = delete_by_expediente(expediente, version_esperada=version_previa)
+    except ConflictoDeVersion as e:
+        sincronizar_tabla_maestra()
+        st.warning(f"⚠️ {e}")
+        return
+
+    sincronizar_tabla_maestra()
+    if eliminados == 0:
+        st.info(f"ℹ️ No se encontraron mediciones del expediente **{expediente}**.")
+        return
+
+    st.success(f"✅ Expediente **{expediente}** eliminado ({eliminados} registros).")
@@ -11,11 +11,17 @@ import streamlit as st
 import plotly.express as px
 
 from config import CSS_PATH, ASSETS
+from db.columnas import seleccion, seleccion_global
+from db.hotspots import leer_ranking
+from processing.agregados import kpis_inicio, top_localidades_por_maximo, vm_a_pct
+from processing.precalentado import filtros_por_defecto, leer_precalentado, programar_precalentado
 from state import (
     init_session_state,
     ensure_tabla_maestra_loaded,
     render_global_filters_sidebar,
+    render_admin_login,
     get_df_filtrado_global,
+    version_sesion,
 )
 
 from sections.sidebar_upload import render_sidebar
@@ -23,14 +29,24 @@ from sections.resumen_general import render_resumen_general
 from sections.graficos import render_graficos
 from sections.gestion_localidades import render_gestion_localidades
 from sections.semaforo_mapa import render_semaforo, render_mapa
+from sections.busqueda_geo import render_busqueda_cercania
+from sections.serie_temporal import render_serie_temporal
+from sections.mapa_exposicion import render_mapa_exposicion
 from sections.editor_localidad import render_editor_localidad
 from sections.export_informes import render_export_informes
+from sections.export_datos import render_export_datos
 from sections.diagnostico import render_diagnostico
+from sections.perfilado_panel import render_perfilado_panel
+from sections.precalentado import render_precalentado
+from utils.perfilado import fin_rerun, inicio_rerun, perfilado, registrar_filas
 
 
 # ---------------------- CONFIG (SIEMPRE ARRIBA) ----------------------
 st.set_page_config(page_title="Base de datos RNI - ENACOM", layout="wide")
 
+# Los reruns parciales (fragmentos) no pasan por acá: esto mide solo reruns completos
+inicio_rerun()
+
 
 # ---------------------- ESTILO ----------------------
 if CSS_PATH.exists():
@@ -71,6 +87,9 @@ st.markdown(header_html, unsafe_allow_html=True)
 
 # ------------------- SESSION STATE ------------------
 init_session_state()
+# Precalentado de cachés (una vez por proceso y data_version): el aviso queda mientras corre
+programar_precalentado()
+render_precalentado()
 ensure_tabla_maestra_loaded()
 
 
@@ -111,38 +130,44 @@ with sb.expander("Carga / Administración de nuevas mediciones", expanded=False)
     render_sidebar(sb=st)
 
 sb.markdown("---")
+render_admin_login(sb=sb)
 
 
 # ============================================================
 # 🏠 INICIO
 # ============================================================
+@perfilado("render_inicio")
 def render_inicio():
     st.markdown("## 🏠 Inicio")
-    df = get_df_filtrado_global(st.session_state["tabla_maestra"]).copy()
+    tabla = st.session_state["tabla_maestra"]
+    gf = st.session_state["global_filters"]
+
+    # Picos desde el índice de hotspots; conteos desde el almacén columnar (.npy) si ya está armado.
+    # Con el almacén listo no se arma la tabla filtrada: df queda en None.
+    sel = seleccion_global(tabla, gf)
+    df = get_df_filtrado_global(tabla) if sel is None else None
+    filas = len(sel) if sel is not None else len(df)
 
-    if df.empty:
+    if filas == 0:
         st.info("Aún no hay datos cargados. Usá **📥 Carga / Administración** en el sidebar para importar mediciones.")
         return
 
-    df["Resultado"] = pd.to_numeric(df.get("Resultado", np.nan), errors="coerce")
-
-    total_reg = len(df)
-    total_localidades = df["Localidad"].dropna().nunique() if "Localidad" in df.columns else 0
-    total_provincias = df["Provincia"].dropna().nunique() if "Provincia" in df.columns else 0
-    total_ccte = df["CCTE"].dropna().nunique() if "CCTE" in df.columns else 0
+    registrar_filas(filas)
+    if df is not None:
+        df["Resultado"] = pd.to_numeric(df.get("Resultado", np.nan), errors="coerce")
+    ranking = leer_ranking(gf)
 
-    ultima_carga = None
-    if "FechaCarga" in df.columns:
-        _fc = pd.to_datetime(df["FechaCarga"], errors="coerce")
-        if _fc.notna().any():
-            ultima_carga = _fc.max()
+    kpis = leer_precalentado("kpis_inicio", version_sesion()) if filtros_por_defecto(gf) else None
+    if kpis is None:
+        kpis = kpis_inicio(df, sel, ranking)
+    total_reg = kpis["total_reg"]
+    total_localidades = kpis["total_localidades"]
+    total_provincias = kpis["total_provincias"]
+    total_ccte = kpis["total_ccte"]
+    ultima_carga = kpis["ultima_carga"]
 
-    max_row = None
-    max_val = None
-    if df["Resultado"].notna().any():
-        i = df["Resultado"].idxmax()
-        max_row = df.loc[i]
-        max_val = max_row["Resultado"]
+    max_row = kpis["max_row"]
+    max_val = max_row["Resultado"] if max_row is not None else None
 
     c1, c2, c3, c4 = st.columns(4)
 
@@ -171,20 +196,17 @@ def render_inicio():
     # ============================================================
     st.subheader("🏢 Mediciones por Centro de Comprobación Técnica de Emisiones")
 
-    if "CCTE" in df.columns:
-        base = df.copy()
-        base["CCTE"] = base["CCTE"].astype(str)
-        
-                
+    if "CCTE" in tabla.columns:
         FIJOS = ["Buenos Aires", "CABA"]
-        
-        conteo = (
-            base["CCTE"].dropna().astype(str).str.strip()
-            .value_counts()
-            .to_dict()
-        )
 
-        cctes_unicos = {c.strip() for c in base["CCTE"].dropna().astype(str).tolist() if c.strip()}
+        if sel is not None:
+            locs = sel.filas_por_localidad().dropna(subset=["CCTE"])
+            conteo = locs.groupby(locs["CCTE"].astype(str).str.strip())["Filas"].sum().to_dict()
+        else:
+            ccte_txt = df["CCTE"].dropna().astype(str).str.strip()
+            conteo = ccte_txt.value_counts().to_dict()
+
+        cctes_unicos = {c for c in conteo if c}
         for f in FIJOS:
             cctes_unicos.add(f)
 
@@ -207,23 +229,40 @@ def render_inicio():
                 unsafe_allow_html=True,
             )
 
-        base["Resultado"] = pd.to_numeric(base.get("Resultado", np.nan), errors="coerce")
-
         def ccte_card(col, ccte_name: str):
-            
-            g = base[base["CCTE"].astype(str).str.strip().str.lower() == str(ccte_name).strip().lower()].copy()
-
-            puntos = int(len(g))
-
             pico_vm = None
             pico_pct = None
             pico_loc = "N/D"
 
-            if puntos > 0 and g["Resultado"].notna().any():
+            def es_ccte(s: pd.Series) -> pd.Series:
+                return s.astype(str).str.strip().str.lower() == str(ccte_name).strip().lower()
+
+            s_ccte, g = None, None
+            if sel is not None:
+                s_ccte = seleccion(tabla, [ccte_name], gf.get("provincia"), gf.get("anio", "Todos"))
+                puntos = len(s_ccte)
+            else:
+                g = df[es_ccte(df["CCTE"])]
+                puntos = int(len(g))
+
+            if not ranking.empty:
+                # Top 1 del CCTE en el índice de hotspots
+                top = ranking.loc[es_ccte(ranking["CCTE"])]
+                if not top.empty:
+                    pico_vm = float(top["MaxVm"].iloc[0])
+                    pico_pct = vm_a_pct(pico_vm)
+                    pico_loc = str(top["Localidad"].iloc[0])
+            elif s_ccte is not None:
+                m = s_ccte.maximo()
+                if m is not None:
+                    pico_vm = m[0]
+                    pico_pct = vm_a_pct(pico_vm)
+                    pico_loc = str(tabla["Localidad"].iloc[m[1]])
+            elif puntos > 0 and g["Resultado"].notna().any():
                 j = g["Resultado"].idxmax()
                 rmax = g.loc[j]
                 pico_vm = float(rmax["Resultado"]) if pd.notna(rmax["Resultado"]) else None
-                pico_pct = (pico_vm ** 2) / 3770 / 0.20021 * 100 if pico_vm is not None else None
+                pico_pct = vm_a_pct(pico_vm) if pico_vm is not None else None
                 pico_loc = str(rmax.get("Localidad", "N/D"))
 
             
@@ -255,7 +294,7 @@ def render_inicio():
         ccte = max_row.get("CCTE", "N/D")
         exp = max_row.get("Expediente", "N/D")
 
-        max_pct = (max_val**2 / 3770 / 0.20021 * 100) if pd.notna(max_val) else None
+        max_pct = vm_a_pct(max_val) if pd.notna(max_val) else None
 
         st.markdown("### 🌎 Pico máximo registrado")
         a, b, c, d = st.columns([2.2, 1.2, 1.2, 1.4])
@@ -268,18 +307,10 @@ def render_inicio():
     # ------------------- Top 5 localidades en CARDS -------------------
     st.markdown("### 🔥 Top 5 localidades (máximo registrado)")
 
-    if "Localidad" in df.columns and "Resultado" in df.columns:
-        df_toploc = df.dropna(subset=["Resultado", "Localidad"]).copy()
-
-        if not df_toploc.empty:
+    if "Localidad" in tabla.columns and "Resultado" in tabla.columns:
+        top_loc = top_localidades_por_maximo(df, n=5, sel=sel, ranking=ranking)
 
-            idx = df_toploc.groupby("Localidad")["Resultado"].idxmax()
-            top_loc = df_toploc.loc[idx].copy()
-            top_loc = top_loc.sort_values("Resultado", ascending=False).head(5)
-
-            top_loc["Resultado %"] = (top_loc["Resultado"] ** 2) / 3770 / 0.20021 * 100
-            top_loc["Resultado %"] = pd.to_numeric(top_loc["Resultado %"], errors="coerce").round(2)
-            top_loc["Resultado"] = pd.to_numeric(top_loc["Resultado"], errors="coerce").round(2)
+        if not top_loc.empty:
 
             cols = st.columns(5)
             for i, (_, r) in enumerate(top_loc.iterrows(), start=1):
@@ -321,15 +352,31 @@ def render_inicio():
     else:
         st.info("Faltan columnas necesarias (Localidad/Resultado) para armar el Top 5.")
 
+    # ------------------- Mapa de exposición (PNG precalculado) -------------------
+    if tabla.attrs.get("data_version") is not None:
+        render_mapa_exposicion(gf, int(tabla.attrs["data_version"]))
+
     # ------------------- Mini histograma -------------------
     st.markdown("### 📈 Distribución rápida de resultados (V/m)")
-    df_hist = df.dropna(subset=["Resultado"]).copy()
-    if not df_hist.empty:
-        fig = px.histogram(df_hist, x="Resultado", nbins=40, title="")
-        fig.update_layout(height=320, template="plotly_white")
-        st.plotly_chart(fig, width='stretch')
+    if sel is not None:
+        # Histograma armado acá (40 barras) en vez de mandar todos los puntos al navegador
+        vals = sel.valores("resultado")
+        vals = vals[~np.isnan(vals)]
+        if vals.size:
+            cuentas, bordes = np.histogram(vals, bins=40)
+            fig = px.bar(x=(bordes[:-1] + bordes[1:]) / 2, y=cuentas, labels={"x": "Resultado", "y": "count"}, title="")
+            fig.update_layout(height=320, template="plotly_white", bargap=0)
+            st.plotly_chart(fig, width='stretch')
+        else:
+            st.info("No hay resultados válidos para graficar.")
     else:
-        st.info("No hay resultados válidos para graficar.")
+        df_hist = df.dropna(subset=["Resultado"])
+        if not df_hist.empty:
+            fig = px.histogram(df_hist, x="Resultado", nbins=40, title="")
+            fig.update_layout(height=320, template="plotly_white")
+            st.plotly_chart(fig, width='stretch')
+        else:
+            st.info("No hay resultados válidos para graficar.")
 
 
 # ============================================================
@@ -350,20 +397,25 @@ elif page == "Gestión":
 
     ctx = render_gestion_localidades()
 
-    tabs = st.tabs(["📌 Vista", "🗺️ Mapa", "✏️ Editar", "🖨️ Exportar"])
+    tabs = st.tabs(["📌 Vista", "📈 Serie", "🗺️ Mapa", "✏️ Editar", "🖨️ Exportar"])
 
     with tabs[0]:
 
         st.caption("")
 
     with tabs[1]:
-        render_semaforo(ctx.get("max_resultado_pct"), ctx.get("df_localidad"))
-        render_mapa(ctx.get("df_localidad"))
+        render_serie_temporal(ctx.get("df_localidad"))
 
     with tabs[2]:
-        render_editor_localidad(ctx.get("localidad_seleccionada"), ctx.get("df_localidad"))
+        render_semaforo(ctx.get("max_resultado_pct"), ctx.get("df_localidad"))
+        render_mapa(ctx.get("df_localidad"), sel=ctx.get("seleccion"))
+        render_busqueda_cercania(ctx.get("df_localidad"))
 
     with tabs[3]:
+        render_editor_localidad(ctx.get("localidad_seleccionada"), ctx.get("df_localidad"))
+
+    with tabs[4]:
+        render_export_datos()
         render_export_informes(
             df_localidad=ctx.get("df_localidad"),
             df_filtrado_prov=ctx.get("df_filtrado_prov"),
@@ -373,6 +425,7 @@ elif page == "Gestión":
 
 elif page == "Diagnóstico":
     render_diagnostico()
+    render_perfilado_panel()
 
 # ---------------------- FOOTER ----------------------
 footer_html = """
@@ -381,3 +434,5 @@ footer_html = """
 </div>
 """
 st.markdown(footer_html, unsafe_allow_html=True)
+
+fin_rerun(page)
@@ -0,0 +1,53 @@
+"""
+Compara dos corridas de benchmarks (JSON de bench.correr).
+
+    python -m bench.comparar bench/resultados/antes.json bench/resultados/despues.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def _indexar(data: dict) -> dict:
+    return {(r["tamanio"], r["bench"]): r for r in data.get("resultados", [])}
+
+
+def comparar(base: dict, nuevo: dict) -> list[dict]:
+    a, b = _indexar(base), _indexar(nuevo)
+    filas = []
+    for key in sorted(set(a) | set(b)):
+        ta = a.get(key, {}).get("mediana_s")
+        tb = b.get(key, {}).get("mediana_s")
+        filas.append({
+            "tamanio": key[0],
+            "bench": key[1],
+            "base_s": ta,
+            "nuevo_s": tb,
+            "speedup": round(ta / tb, 2) if ta and tb else None,
+        })
+    return filas
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compara dos JSON de benchmarks.")
+    ap.add_argument("base")
+    ap.add_argument("nuevo")
+    args = ap.parse_args(argv)
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    nuevo = json.loads(Path(args.nuevo).read_text(encoding="utf-8"))
+
+    print(f"base : {base['meta'].get('commit')} ({base['meta'].get('fecha')})")
+    print(f"nuevo: {nuevo['meta'].get('commit')} ({nuevo['meta'].get('fecha')})\n")
+    print(f"{'tamaño':<8} {'bench':<45} {'base (s)':>10} {'nuevo (s)':>10} {'speedup':>8}")
+    for f in comparar(base, nuevo):
+        ta = f"{f['base_s']:.3f}" if f["base_s"] is not None else "-"
+        tb = f"{f['nuevo_s']:.3f}" if f["nuevo_s"] is not None else "-"
+        sp = f"{f['speedup']:.2f}x" if f["speedup"] is not None else "-"
+        print(f"{f['tamanio']:<8} {f['bench']:<45} {ta:>10} {tb:>10} {sp:>8}")
+
+
+if __name__ == "__main__":
+    main()
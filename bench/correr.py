@@ -0,0 +1,345 @@
+"""
+Benchmarks del pipeline RNI.
+
+Mide (wall time, varias repeticiones):
+  - procesar_archivos (planillas Excel con layout de sonda)
+  - add_fechahora / calcular_tiempo_total_por_archivo
+  - save_tabla_maestra_to_db / load_tabla_maestra_from_db (SQLite y snapshot Arrow)
+  - agregados de cada página (Inicio, Resumen, Gráficos, Gestión)
+
+Los resultados se guardan en JSON (bench/resultados/) para comparar corridas:
+    python -m bench.correr --tamanios 100k,1M
+    python -m bench.comparar bench/resultados/A.json bench/resultados/B.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bench.generar_datos import BENCH_DIR, a_tabla_maestra, iter_bloques, parse_filas, planillas_en_memoria
+
+RESULTADOS_DIR = BENCH_DIR / "resultados"
+
+# procesar_archivos con 10M filas de Excel tarda horas: lo acotamos por defecto
+MAX_FILAS_EXCEL = 200_000
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR.parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def medir(nombre: str, fn, filas: int, repeticiones: int, setup=None) -> dict:
+    """Corre fn() `repeticiones` veces (setup() antes de cada una, sin medir)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        arg = setup() if setup is not None else None
+        t0 = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        tiempos.append(time.perf_counter() - t0)
+
+    res = {
+        "bench": nombre,
+        "filas": int(filas),
+        "tiempos_s": [round(t, 6) for t in tiempos],
+        "min_s": round(min(tiempos), 6),
+        "mediana_s": round(statistics.median(tiempos), 6),
+        "filas_por_s": round(filas / min(tiempos), 1) if min(tiempos) > 0 else None,
+    }
+    print(f"  {nombre:<45} {res['mediana_s']:>10.3f} s  ({filas:,} filas)")
+    return res
+
+
+def _benchs_excel(n: int, repeticiones: int, max_filas_excel: int) -> list[dict]:
+    from processing.excel_processor import procesar_archivos
+
+    n_excel = min(n, max_filas_excel)
+    df_raw = next(iter_bloques(n_excel, bloque=n_excel))
+    planillas = planillas_en_memoria(df_raw)
+
+    def _setup():
+        for p in planillas:
+            p.seek(0)
+        return planillas
+
+    return [medir(
+        "procesar_archivos",
+        lambda files: procesar_archivos(files, "CABA", "CABA", "Bench", ""),
+        n_excel, repeticiones, setup=_setup,
+    )]
+
+
+def _benchs_tiempo(df: pd.DataFrame, repeticiones: int) -> list[dict]:
+    from utils.time_utils import add_fechahora, calcular_tiempo_total_por_archivo
+
+    n = len(df)
+    return [
+        medir("add_fechahora", lambda: add_fechahora(df), n, repeticiones),
+        medir("calcular_tiempo_total_por_archivo", lambda: calcular_tiempo_total_por_archivo(df), n, repeticiones),
+    ]
+
+
+def _benchs_db(df: pd.DataFrame, repeticiones: int) -> list[dict]:
+    import db.sqlite_store as store
+
+    n = len(df)
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # El store usa una ruta fija: la apuntamos a un archivo temporal durante el bench
+        db_original = store.DB_FILE
+        store.DB_FILE = Path(tmp) / "rni.db"
+        try:
+            out.append(medir("save_tabla_maestra_to_db", lambda: store.save_tabla_maestra_to_db(df), n, repeticiones))
+            out.append(medir("load_tabla_maestra_from_db", store.load_tabla_maestra_from_db, n, repeticiones))
+
+            # Snapshot Arrow: escritura y arranque en frío desde el snapshot
+            from db import snapshot
+            cargada = store.load_tabla_maestra_from_db()
+            out.append(medir("escribir_snapshot", lambda: snapshot.escribir_snapshot(cargada), n, repeticiones))
+            out.append(medir("load_tabla_maestra_from_db (snapshot)", store.load_tabla_maestra_from_db, n, repeticiones))
+
+            # Almacén columnar .npy: armado y KPIs de Inicio leyendo slices del memmap
+            from db import columnas
+            from processing import agregados
+            out.append(medir("escribir_columnas", lambda: columnas.escribir_columnas(cargada), n, repeticiones))
+
+            def _inicio_columnas():
+                sel = columnas.seleccion(cargada)
+                agregados.kpis_inicio(cargada, sel)
+                agregados.top_localidades_por_maximo(cargada, n=5, sel=sel)
+
+            out.append(medir("pagina_inicio (kpis + top5, columnas npy)", _inicio_columnas, n, repeticiones))
+
+            # Particiones (CCTE, año): armado completo y lectura de un CCTE con poda
+            from db import particiones
+            gf = {"ccte": [str(cargada["CCTE"].dropna().iloc[0])]}
+            out.append(medir("actualizar_particiones (completo)", particiones.actualizar_particiones, n, repeticiones))
+            out.append(medir(
+                "iter_mediciones_chunks (1 CCTE, particiones)",
+                lambda: sum(len(c) for c in store.iter_mediciones_chunks(gf)),
+                n, repeticiones,
+            ))
+
+            # Cubo (localidad, año, mes, día): recálculo completo y KPIs de Gráficos desde el cubo
+            from db import cubo
+
+            def _recalcular_cubo():
+                conn = store._connect()
+                try:
+                    cubo.recalcular(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            def _graficos_cubo():
+                c = cubo.leer_cubo()
+                agregados.kpis_cubo(c)
+                agregados.agregados_operativo_cubo(c)
+
+            out.append(medir("recalcular_cubo (completo)", _recalcular_cubo, n, repeticiones))
+            out.append(medir("pagina_graficos (kpis + operativo, cubo)", _graficos_cubo, n, repeticiones))
+
+            # Percentiles por (localidad, año): recálculo completo y p50/p90/p99 por CCTE
+            from db import cuantiles
+
+            def _recalcular_cuantiles():
+                conn = store._connect()
+                try:
+                    cuantiles.recalcular(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            out.append(medir("recalcular_cuantiles (completo)", _recalcular_cuantiles, n, repeticiones))
+            out.append(medir("leer_percentiles (por CCTE)", lambda: cuantiles.leer_percentiles(por="CCTE"), n, repeticiones))
+
+            # Índice de hotspots: recálculo completo y top 10 nacional
+            from db import hotspots
+
+            def _recalcular_hotspots():
+                conn = store._connect()
+                try:
+                    hotspots.recalcular(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            out.append(medir("recalcular_hotspots (completo)", _recalcular_hotspots, n, repeticiones))
+            out.append(medir("leer_ranking (top 10, hotspots)", lambda: hotspots.leer_ranking(k=10), n, repeticiones))
+
+            # Índice espacial: reconstrucción completa y radio de 500 m alrededor de una medición
+            from db import geo
+
+            def _reconstruir_geo():
+                conn = store._connect()
+                try:
+                    geo.reconstruir(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            lat = pd.to_numeric(df["Lat"], errors="coerce").dropna()
+            lon = pd.to_numeric(df["Lon"], errors="coerce").dropna()
+            out.append(medir("reconstruir_geo (completo)", _reconstruir_geo, n, repeticiones))
+            if not lat.empty and not lon.empty:
+                out.append(medir(
+                    "cercanas (500 m, índice geo)",
+                    lambda: geo.cercanas(lat.median(), lon.median(), 500), n, repeticiones,
+                ))
+
+            # Pirámide de teselas del mapa: reconstrucción y caja de todo el país
+            from db import teselas
+
+            def _reconstruir_teselas():
+                conn = store._connect()
+                try:
+                    teselas.reconstruir(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            out.append(medir("reconstruir_teselas (completo)", _reconstruir_teselas, n, repeticiones))
+            out.append(medir(
+                "leer_teselas (país)", lambda: teselas.leer_teselas(-56, -21, -74, -53), n, repeticiones,
+            ))
+
+            # Resumen general por bloques (sin la tabla en memoria)
+            from processing.streaming import resumen_por_localidad_streaming
+            out.append(medir("resumen_por_localidad (streaming)", resumen_por_localidad_streaming, n, repeticiones))
+            from config import PROCESOS_AGREGADOS
+            procesos = max(2, PROCESOS_AGREGADOS)
+            out.append(medir(
+                f"resumen_por_localidad (streaming, {procesos} procesos)",
+                lambda: resumen_por_localidad_streaming(procesos=procesos), n, repeticiones,
+            ))
+
+            # Mapa de exposición: raster nacional sin filtros (desde las teselas)
+            from processing import mapa_calor
+            out.append(medir("generar_mapa_calor (sin filtros)", lambda: mapa_calor.generar_mapa_calor({}), n, repeticiones))
+
+            # Precalentado de arranque: tabla compartida en frío + Inicio + Resumen + Gráficos
+            from db import dataset
+            from processing import precalentado
+            out.append(medir(
+                "precalentar (tabla + KPIs + resumen + gráficos)", precalentado.precalentar, n, repeticiones,
+                setup=dataset._CACHE.clear,
+            ))
+        finally:
+            store.DB_FILE = db_original
+    return out
+
+
+def _benchs_paginas(df: pd.DataFrame, repeticiones: int) -> list[dict]:
+    from processing import agregados
+    from utils.time_utils import add_fechahora
+
+    n = len(df)
+    out = []
+
+    # Inicio
+    def _inicio():
+        d = df.copy()
+        d["Resultado"] = pd.to_numeric(d["Resultado"], errors="coerce")
+        agregados.kpis_inicio(d)
+        agregados.top_localidades_por_maximo(d, n=5)
+
+    out.append(medir("pagina_inicio (kpis + top5)", _inicio, n, repeticiones))
+
+    # Resumen general
+    out.append(medir(
+        "pagina_resumen (resumen_por_localidad)",
+        lambda: agregados.resumen_por_localidad(add_fechahora(df)),
+        n, repeticiones,
+    ))
+
+    # Gráficos
+    def _graficos():
+        base = agregados.preparar_base_graficos(df.copy())
+        agregados.agregados_operativo(base)
+        agregados.hotspots_por_localidad(base)
+
+    out.append(medir("pagina_graficos (operativo + hotspots)", _graficos, n, repeticiones))
+
+    # Gestión (todo el país: resumen diario + mensual)
+    def _gestion():
+        d = add_fechahora(df).dropna(subset=["FechaHora"])
+        d["Fecha"] = d["FechaHora"].dt.date
+        d["Mes"] = d["FechaHora"].dt.to_period("M").astype(str)
+        agregados.calcular_resumen_diario(d)
+        agregados.calcular_resumen_mensual(d)
+
+    out.append(medir("pagina_gestion (diario + mensual)", _gestion, n, repeticiones))
+    return out
+
+
+def correr(tamanios: list[str], repeticiones: int, max_filas_excel: int, solo: set[str] | None = None) -> dict:
+    resultados = []
+    for t in tamanios:
+        n = parse_filas(t)
+        print(f"\n== {t} ({n:,} filas) ==")
+
+        df = pd.concat([a_tabla_maestra(b) for b in iter_bloques(n)], ignore_index=True)
+
+        grupos = {
+            "excel": lambda: _benchs_excel(n, repeticiones, max_filas_excel),
+            "tiempo": lambda: _benchs_tiempo(df, repeticiones),
+            "db": lambda: _benchs_db(df, repeticiones),
+            "paginas": lambda: _benchs_paginas(df, repeticiones),
+        }
+        for nombre, fn in grupos.items():
+            if solo and nombre not in solo:
+                continue
+            for r in fn():
+                r["tamanio"] = t
+                resultados.append(r)
+
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "repeticiones": repeticiones,
+        },
+        "resultados": resultados,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks del pipeline RNI.")
+    ap.add_argument("--tamanios", default="100k", help="Lista separada por comas: 100k,1M,10M")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--max-filas-excel", default=str(MAX_FILAS_EXCEL), help="Tope de filas para procesar_archivos")
+    ap.add_argument("--solo", default="", help="Grupos a correr: excel,tiempo,db,paginas (default: todos)")
+    ap.add_argument("--salida", default=None, help="Archivo JSON de salida")
+    args = ap.parse_args(argv)
+
+    tamanios = [t.strip() for t in args.tamanios.split(",") if t.strip()]
+    solo = {s.strip() for s in args.solo.split(",") if s.strip()} or None
+
+    data = correr(tamanios, args.repeticiones, parse_filas(args.max_filas_excel), solo)
+
+    RESULTADOS_DIR.mkdir(parents=True, exist_ok=True)
+    salida = Path(args.salida) if args.salida else RESULTADOS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados: {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Generador de datos sintéticos para benchmarks.
+
+Arma mediciones "realistas" (varios CCTE/provincias/localidades, horas mezcladas
+"a. m." / 24 h, coordenadas DMS y decimales con coma) y las escribe como:
+  - planillas Excel con el mismo layout que las sondas (encabezado en la fila 9 -> header=8)
+  - una base SQLite con el formato de la app
+
+Uso:
+    python -m bench.generar_datos --filas 100k --salida bench/datos
+    python -m bench.generar_datos --filas 1M --sin-excel
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATOS_DIR = BENCH_DIR / "datos"
+
+# CCTE -> provincias -> (localidades, lat/lon aproximados)
+GEOGRAFIA = {
+    "CABA": {"CABA": [("Palermo", -34.58, -58.42), ("Caballito", -34.62, -58.44), ("Recoleta", -34.59, -58.39)]},
+    "Buenos Aires": {
+        "Buenos Aires": [("La Plata", -34.92, -57.95), ("Mar del Plata", -38.00, -57.55), ("Bahía Blanca", -38.72, -62.27)],
+    },
+    "Córdoba": {
+        "Córdoba": [("Córdoba", -31.42, -64.18), ("Villa María", -32.41, -63.24)],
+        "San Luis": [("San Luis", -33.30, -66.34)],
+    },
+    "Salta": {"Salta": [("Salta", -24.79, -65.41)], "Jujuy": [("San Salvador de Jujuy", -24.19, -65.30)]},
+    "Neuquén": {"Neuquén": [("Neuquén", -38.95, -68.06)], "Río Negro": [("Bariloche", -41.13, -71.31)]},
+    "Posadas": {"Misiones": [("Posadas", -27.37, -55.90)], "Corrientes": [("Corrientes", -27.47, -58.83)]},
+    "Comodoro Rivadavia": {"Chubut": [("Comodoro Rivadavia", -45.86, -67.48)]},
+}
+
+SONDAS = ["EP-600 (100 kHz - 9.25 GHz)", "EP-645 (100 kHz - 6.5 GHz)", "SRM-3006"]
+
+# Filas por planilla (una campaña típica de sonda)
+FILAS_POR_ARCHIVO = 5_000
+
+
+def parse_filas(txt: str) -> int:
+    """'100k' -> 100000, '1M' -> 1000000, '2500' -> 2500."""
+    t = str(txt).strip().lower().replace("_", "")
+    mult = 1
+    if t.endswith("k"):
+        mult, t = 1_000, t[:-1]
+    elif t.endswith("m"):
+        mult, t = 1_000_000, t[:-1]
+    return int(float(t) * mult)
+
+
+def _localidades() -> list[tuple[str, str, str, float, float]]:
+    out = []
+    for ccte, provs in GEOGRAFIA.items():
+        for prov, locs in provs.items():
+            for loc, lat, lon in locs:
+                out.append((ccte, prov, loc, lat, lon))
+    return out
+
+
+def _hora_texto(ts: pd.Series, rng: np.random.Generator) -> np.ndarray:
+    """Mezcla formatos reales: '10:08:09 a. m.', '10:08:09 p.m.', '22:10:00'."""
+    h24 = ts.dt.strftime("%H:%M:%S").to_numpy()
+    h12 = ts.dt.strftime("%I:%M:%S").to_numpy()
+    pm = (ts.dt.hour >= 12).to_numpy()
+
+    sufijo_es = np.where(pm, " p. m.", " a. m.")
+    sufijo_pt = np.where(pm, " p.m.", " a.m.")
+
+    estilo = rng.choice(3, size=len(ts), p=[0.6, 0.2, 0.2])
+    return np.where(estilo == 0, h12 + sufijo_es, np.where(estilo == 1, h12 + sufijo_pt, h24))
+
+
+def _coord_texto(vals: np.ndarray, rng: np.random.Generator, hemi: str) -> np.ndarray:
+    """Mezcla DMS ('34°36'12.5" S'), decimal con coma y decimal con punto."""
+    a = np.abs(vals)
+    d = np.floor(a).astype(int)
+    m_full = (a - d) * 60
+    m = np.floor(m_full).astype(int)
+    s = (m_full - m) * 60
+
+    dms = np.char.add(np.char.add(np.char.add(d.astype(str), "°"), np.char.add(m.astype(str), "'")),
+                      np.char.add(np.char.mod("%.2f", s), f'" {hemi}'))
+    dec_coma = np.char.replace(np.char.mod("%.6f", vals), ".", ",")
+    dec_punto = np.char.mod("%.6f", vals)
+
+    estilo = rng.choice(3, size=len(vals), p=[0.5, 0.3, 0.2])
+    return np.where(estilo == 0, dms, np.where(estilo == 1, dec_coma, dec_punto))
+
+
+def generar_mediciones(n_filas: int, seed: int = 42, archivo_inicial: int = 0) -> pd.DataFrame:
+    """
+    Genera n_filas mediciones agrupadas en archivos de FILAS_POR_ARCHIVO filas.
+    Devuelve columnas "crudas" de planilla (texto) + metadatos de carga.
+    """
+    rng = np.random.default_rng(seed + archivo_inicial)
+    locs = _localidades()
+
+    n_archivos = max(1, int(np.ceil(n_filas / FILAS_POR_ARCHIVO)))
+    archivo_id = np.repeat(np.arange(n_archivos), FILAS_POR_ARCHIVO)[:n_filas]
+    pos_en_archivo = np.tile(np.arange(FILAS_POR_ARCHIVO), n_archivos)[:n_filas]
+
+    # Cada archivo: una localidad, una sonda, un día y hora de arranque
+    loc_idx = rng.integers(0, len(locs), size=n_archivos)
+    sonda_idx = rng.integers(0, len(SONDAS), size=n_archivos)
+    inicio = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, size=n_archivos), unit="D")
+    inicio = inicio + pd.to_timedelta(rng.integers(7 * 3600, 11 * 3600, size=n_archivos), unit="s")
+
+    loc_rows = loc_idx[archivo_id]
+    ccte = np.array([l[0] for l in locs], dtype=object)[loc_rows]
+    prov = np.array([l[1] for l in locs], dtype=object)[loc_rows]
+    localidad = np.array([l[2] for l in locs], dtype=object)[loc_rows]
+    lat0 = np.array([l[3] for l in locs])[loc_rows]
+    lon0 = np.array([l[4] for l in locs])[loc_rows]
+
+    # Puntos cada ~3 s (la jornada puede cruzar el mediodía -> a. m./p. m.)
+    ts = pd.Series(inicio[archivo_id]) + pd.to_timedelta(pos_en_archivo * 3 + rng.integers(0, 2, size=n_filas), unit="s")
+
+    # Recorrido: deriva aleatoria alrededor del centro de la localidad
+    lat = lat0 + rng.normal(0, 0.02, size=n_filas)
+    lon = lon0 + rng.normal(0, 0.02, size=n_filas)
+
+    # Resultado V/m: lognormal con algunos picos
+    res = rng.lognormal(mean=-0.5, sigma=0.7, size=n_filas)
+    picos = rng.random(n_filas) < 0.001
+    res[picos] *= rng.uniform(5, 15, size=int(picos.sum()))
+
+    return pd.DataFrame({
+        "archivo_id": archivo_id + archivo_inicial,
+        "Índice": pos_en_archivo + 1,
+        "Fecha": ts.dt.strftime("%d/%m/%Y").to_numpy(),
+        "Hora": _hora_texto(ts, rng),
+        "Resultado con incertidumbre": np.char.add(np.char.replace(np.char.mod("%.3f", res), ".", ","), " V/m"),
+        "Sonda utilizada": np.array(SONDAS, dtype=object)[sonda_idx[archivo_id]],
+        "Latitud": _coord_texto(lat, rng, "S"),
+        "Longitud": _coord_texto(lon, rng, "O"),
+        "CCTE": ccte,
+        "Provincia": prov,
+        "Localidad": localidad,
+        "Resultado": res,
+        "Lat": lat,
+        "Lon": lon,
+    })
+
+
+# ============================================================
+# Excel (layout de sonda)
+# ============================================================
+COLUMNAS_PLANILLA = ["Índice", "Fecha", "Hora", "Resultado con incertidumbre", "Sonda utilizada", "Latitud", "Longitud"]
+
+
+def _escribir_planilla(destino, g: pd.DataFrame, nombre: str):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Mediciones")
+
+    # 8 filas de cabecera "de equipo" antes del encabezado real (header=8)
+    ws.append(["Informe de mediciones de RNI"])
+    ws.append(["Archivo", nombre])
+    ws.append(["Equipo", str(g["Sonda utilizada"].iloc[0])])
+    ws.append(["Localidad", str(g["Localidad"].iloc[0])])
+    ws.append(["Provincia", str(g["Provincia"].iloc[0])])
+    ws.append(["Generado", datetime.now().strftime("%d/%m/%Y %H:%M")])
+    ws.append([])
+    ws.append([])
+
+    ws.append(COLUMNAS_PLANILLA)
+    for row in g[COLUMNAS_PLANILLA].itertuples(index=False, name=None):
+        ws.append([v.item() if hasattr(v, "item") else v for v in row])
+
+    wb.save(destino)
+
+
+def planillas_en_memoria(df: pd.DataFrame) -> list[BytesIO]:
+    """Una planilla por archivo_id como BytesIO con `.name` (igual que un UploadedFile)."""
+    out = []
+    for aid, g in df.groupby("archivo_id", sort=True):
+        nombre = f"medicion_{int(aid):05d}.xlsx"
+        buf = BytesIO()
+        _escribir_planilla(buf, g, nombre)
+        buf.seek(0)
+        buf.name = nombre
+        out.append(buf)
+    return out
+
+
+def escribir_planillas(df: pd.DataFrame, out_dir: Path) -> list[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for aid, g in df.groupby("archivo_id", sort=True):
+        nombre = f"medicion_{int(aid):05d}.xlsx"
+        ruta = out_dir / nombre
+        _escribir_planilla(ruta, g, nombre)
+        rutas.append(ruta)
+    return rutas
+
+
+# ============================================================
+# SQLite (formato de la app)
+# ============================================================
+def a_tabla_maestra(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte el DF crudo al formato de tabla maestra (como queda tras procesar_archivos)."""
+    fecha_carga = "2025-01-02 09:00:00"
+    return pd.DataFrame({
+        "CCTE": df["CCTE"],
+        "Provincia": df["Provincia"],
+        "Localidad": df["Localidad"],
+        "Resultado": df["Resultado"].round(3),
+        "Fecha": df["Fecha"],
+        "Hora": df["Hora"],
+        "Nombre Archivo": "medicion_" + df["archivo_id"].astype(int).astype(str).str.zfill(5) + ".xlsx",
+        "Expediente": "EX-2025-" + (df["archivo_id"] // 10).astype(int).astype(str).str.zfill(6) + "-APN-ENACOM",
+        "Sonda": df["Sonda utilizada"],
+        "Lat": df["Lat"].round(6),
+        "Lon": df["Lon"].round(6),
+        "FechaCarga": fecha_carga,
+    })
+
+
+def iter_bloques(n_filas: int, seed: int = 42, bloque: int = 1_000_000):
+    """Genera las n_filas en bloques (múltiplos de FILAS_POR_ARCHIVO) para no armar 10M filas de una."""
+    bloque = max(FILAS_POR_ARCHIVO, bloque - bloque % FILAS_POR_ARCHIVO)
+    hechas = 0
+    while hechas < n_filas:
+        n = min(bloque, n_filas - hechas)
+        yield generar_mediciones(n, seed=seed, archivo_inicial=hechas // FILAS_POR_ARCHIVO)
+        hechas += n
+
+
+def escribir_db(bloques, db_path: Path):
+    """Escribe la tabla maestra (esquema estrella) en una SQLite nueva, bloque por bloque."""
+    from db import cubo, cuantiles, geo, hotspots, migrations, schema, teselas
+    from db.sqlite_store import _sanitize_for_sqlite
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        migrations.aplicar_migraciones(conn)
+        for df in bloques:
+            with conn:
+                schema.insertar_mediciones(conn, _sanitize_for_sqlite(a_tabla_maestra(df)))
+        with conn:
+            cubo.recalcular(conn)
+            cuantiles.recalcular(conn)
+            hotspots.recalcular(conn)
+            geo.reconstruir(conn)
+            teselas.reconstruir(conn)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Genera datos sintéticos de mediciones RNI.")
+    ap.add_argument("--filas", default="100k", help="Cantidad de filas (100k, 1M, 10M...)")
+    ap.add_argument("--salida", default=str(DATOS_DIR), help="Carpeta de salida")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--sin-excel", action="store_true", help="No escribir planillas Excel (solo SQLite)")
+    args = ap.parse_args(argv)
+
+    n = parse_filas(args.filas)
+    salida = Path(args.salida) / args.filas
+
+    escribir_db(iter_bloques(n, seed=args.seed), salida / "rni.db")
+    print(f"SQLite: {salida / 'rni.db'} ({n:,} filas)")
+
+    if not args.sin_excel:
+        total = 0
+        for df in iter_bloques(n, seed=args.seed):
+            total += len(escribir_planillas(df, salida / "excel"))
+        print(f"Excel: {total} planillas en {salida / 'excel'}")
+
+
+if __name__ == "__main__":
+    main()
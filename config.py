@@ -1,13 +1,26 @@
+import os
 from pathlib import Path
 
 # ---------------------- ESTILO ----------------------
-BASE_DIR = Path(__file__).parent
+BASE_DIR = Path(__file__).resolve().parent
 CSS_PATH = BASE_DIR / "styles" / "style.css"
 ASSETS = BASE_DIR / "assets"
 
 # ---------------------- DB ----------------------
-DB_FILE = "archivosdata/rni.db"
-TABLE_NAME = "tabla_maestra"
+DB_FILE = BASE_DIR / "archivosdata" / "rni.db"
+# Vista con las columnas de siempre sobre el esquema estrella (ver db/schema.py)
+TABLE_NAME = "mediciones_rni"
+# Snapshot Arrow de la tabla maestra al lado de la DB (arranque en frío sin SQLite)
+SNAPSHOT_ARROW = True
+# Columnas calientes en .npy mapeados + índice de rangos por localidad/CCTE/año (db/columnas.py)
+COLUMNAS_NPY = True
+# Copia de lectura particionada por (CCTE, año) en Parquet (db/particiones.py)
+PARTICIONES_PARQUET = True
+# Desde cuántas filas el Resumen general se arma por bloques desde la DB (processing/streaming.py)
+RESUMEN_STREAMING_FILAS = 500_000
+# Procesos para esos agregados (uno por CCTE a la vez); 1 = en el mismo proceso.
+# Con más (RNI_PROCESOS) se usa un pool spawn aparte (processing/pool_agregados.py)
+PROCESOS_AGREGADOS = max(1, int(os.environ.get("RNI_PROCESOS", "1")))
 
 EXPECTED_COLS = [
     "CCTE", "Provincia", "Localidad",
@@ -16,3 +29,22 @@ EXPECTED_COLS = [
     "Sonda", "Lat", "Lon",
     "FechaCarga",
 ]
+
+# ---------------------- EXPORTACIÓN ----------------------
+# Tope del botón de descarga: st.download_button lee el archivo entero a la memoria del
+# servidor para mandarlo, así que uno más grande queda en disco y no se ofrece por acá
+EXPORT_DESCARGA_MAX_BYTES = int(os.environ.get("RNI_EXPORT_DESCARGA_MAX_MB", "200")) * 1024 * 1024
+
+# ---------------------- PERFILADO ----------------------
+# Log JSONL con tiempos por sección (una línea por render)
+PERF_LOG_FILE = BASE_DIR / "archivosdata" / "perfilado" / "render_times.jsonl"
+# Tope del log: al pasarlo se rota a render_times.jsonl.1 (se guarda una sola copia)
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+# Además de la variación de RSS (siempre), medir pico de memoria con tracemalloc: frena
+# bastante las páginas con pandas, así que viene apagado (RNI_PERF_MEMORIA=1 para
+# prenderlo mientras se diagnostica)
+PERF_TRACK_MEMORY = os.environ.get("RNI_PERF_MEMORIA", "") == "1"
+
+# ---------------------- ADMIN ----------------------
+# Clave para paneles de administración (vacía = paneles deshabilitados)
+ADMIN_KEY = os.environ.get("RNI_ADMIN_KEY", "")
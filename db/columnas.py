@@ -0,0 +1,361 @@
+"""
+Almacén columnar de las columnas "calientes" en arrays NumPy (.npy) mapeados.
+
+Un directorio por versión al lado de la DB (`rni.columnas.<version>/`) con:
+  resultado.npy (float32), lat.npy, lon.npy (float32), fechahora.npy (datetime64[s]),
+  localidad.npy (int32, código de localidad), fila.npy (posición en la tabla maestra)
+  indice.json: localidades (CCTE, Provincia, Localidad -> rango de filas) y
+               rangos por (localidad, año).
+
+Las filas están ordenadas por (CCTE, Provincia, Localidad, año, FechaHora): una
+localidad, un CCTE o una localidad+año son rangos contiguos, así que los
+caminos calientes (máximos, picos por localidad, histogramas, mapa) leen
+slices del memmap sin copiar ni pasar por pandas.
+
+Se arma en segundo plano desde la tabla compartida (db.dataset) cuando cambia
+la versión, igual que el snapshot Arrow. Mientras no está lista para la
+versión de la sesión, `seleccion()` devuelve None y las páginas usan pandas.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db.sqlite_store as store
+from config import COLUMNAS_NPY
+from utils.time_utils import fechahora_desde_texto
+
+COLUMNAS = ("resultado", "lat", "lon", "fechahora", "localidad", "fila")
+_CLAVES = ["CCTE", "Provincia", "Localidad"]
+
+_LOCK = threading.Lock()
+_PENDIENTE: dict[str, pd.DataFrame] = {}
+_ABIERTAS: dict[tuple[str, int], "Columnas"] = {}
+
+
+def ruta_columnas(version: int) -> Path:
+    db = Path(store.DB_FILE)
+    return db.with_name(f"{db.stem}.columnas.{int(version)}")
+
+
+def _columnas_existentes() -> list[Path]:
+    db = Path(store.DB_FILE)
+    return sorted(p for p in db.parent.glob(f"{db.stem}.columnas.*") if p.is_dir())
+
+
+def _texto(v):
+    return None if pd.isna(v) else str(v)
+
+
+# ============================================================
+# Escritura
+# ============================================================
+def escribir_columnas(df: pd.DataFrame) -> Path | None:
+    """Arma el almacén de la versión de `df` (directorio temporal + rename atómico)."""
+    if not COLUMNAS_NPY or df is None or df.empty or df.attrs.get("data_version") is None:
+        return None
+    if not set(_CLAVES + ["Resultado", "Fecha"]).issubset(df.columns):
+        return None
+
+    version = int(df.attrs["data_version"])
+    ruta = ruta_columnas(version)
+    if not ruta.exists():
+        gb = df.groupby(_CLAVES, observed=True, sort=True, dropna=False)
+        codigo = gb.ngroup().to_numpy(dtype=np.int32)
+        nombres = gb.size().index
+
+        fecha = pd.to_datetime(df["Fecha"], errors="coerce")
+        anio = fecha.dt.year.fillna(0).to_numpy(dtype=np.int32)
+        if "Hora" in df.columns:
+            fh = fechahora_desde_texto(fecha, df["Hora"])
+        else:
+            fh = fecha
+        fh = fh.to_numpy(dtype="datetime64[s]")
+
+        orden = np.lexsort((fh.view(np.int64), anio, codigo))
+        codigo, anio = codigo[orden], anio[orden]
+
+        arrays = {
+            "resultado": df["Resultado"].to_numpy(dtype=np.float32, na_value=np.nan)[orden],
+            "lat": _float32(df, "Lat")[orden],
+            "lon": _float32(df, "Lon")[orden],
+            "fechahora": fh[orden],
+            "localidad": codigo,
+            "fila": orden.astype(np.int64),
+        }
+
+        # Rangos por localidad y por (localidad, año)
+        fin = np.cumsum(np.bincount(codigo, minlength=len(nombres)))
+        inicio = fin - np.bincount(codigo, minlength=len(nombres))
+        corte = np.flatnonzero((np.diff(codigo) != 0) | (np.diff(anio) != 0)) + 1
+        bordes = np.concatenate([[0], corte, [len(codigo)]])
+        anios = [
+            [int(codigo[a]), int(anio[a]), int(a), int(b)]
+            for a, b in zip(bordes[:-1], bordes[1:])
+            if anio[a] > 0
+        ]
+
+        indice = {
+            "data_version": version,
+            "filas": int(len(df)),
+            "localidades": [
+                {"ccte": _texto(c), "provincia": _texto(p), "localidad": _texto(l),
+                 "inicio": int(i), "fin": int(f)}
+                for (c, p, l), i, f in zip(nombres, inicio, fin)
+            ],
+            "anios": anios,
+        }
+
+        tmp = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.mkdir(parents=True, exist_ok=True)
+        for nombre, arr in arrays.items():
+            np.save(tmp / f"{nombre}.npy", arr)
+        (tmp / "indice.json").write_text(json.dumps(indice), encoding="utf-8")
+        try:
+            os.replace(tmp, ruta)
+        except OSError:
+            # Otro proceso llegó primero con la misma versión
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    # Versiones anteriores: se borran si se puede (en Windows pueden estar mapeadas)
+    for viejo in _columnas_existentes():
+        v = viejo.name.rsplit(".", 1)[-1]
+        if v.isdigit() and int(v) < version:
+            shutil.rmtree(viejo, ignore_errors=True)
+    return ruta
+
+
+def _float32(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan, dtype=np.float32)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+def programar_columnas(df: pd.DataFrame):
+    """Arma el almacén en un hilo aparte; si llegan varias versiones, solo la última."""
+    if not COLUMNAS_NPY or df is None or df.empty:
+        return
+
+    clave = str(Path(store.DB_FILE).resolve())
+    with _LOCK:
+        en_curso = clave in _PENDIENTE
+        _PENDIENTE[clave] = df
+    if en_curso:
+        return
+
+    def _trabajo():
+        while True:
+            with _LOCK:
+                actual = _PENDIENTE.get(clave)
+            try:
+                escribir_columnas(actual)
+            except Exception:
+                # Es solo una aceleración: sin almacén las páginas usan pandas
+                pass
+            with _LOCK:
+                if _PENDIENTE.get(clave) is actual:
+                    del _PENDIENTE[clave]
+                    return
+
+    threading.Thread(target=_trabajo, name="rni-columnas", daemon=True).start()
+
+
+# ============================================================
+# Lectura
+# ============================================================
+class Columnas:
+    """Arrays mapeados (solo lectura) de una versión + índice de rangos."""
+
+    def __init__(self, ruta: Path):
+        indice = json.loads((ruta / "indice.json").read_text(encoding="utf-8"))
+        self.version = int(indice["data_version"])
+        self.filas = int(indice["filas"])
+        self.arrays = {c: np.load(ruta / f"{c}.npy", mmap_mode="r") for c in COLUMNAS}
+
+        loc = pd.DataFrame(indice["localidades"])
+        self.localidades = pd.DataFrame({
+            "CCTE": loc["ccte"], "Provincia": loc["provincia"], "Localidad": loc["localidad"],
+        }) if not loc.empty else pd.DataFrame(columns=_CLAVES)
+        self.inicio = loc["inicio"].to_numpy(dtype=np.int64) if not loc.empty else np.array([], np.int64)
+        self.fin = loc["fin"].to_numpy(dtype=np.int64) if not loc.empty else np.array([], np.int64)
+        self.anios = np.array(indice["anios"], dtype=np.int64).reshape(-1, 4)
+
+    def codigos(self, ccte=None, provincia=None, localidad=None) -> np.ndarray:
+        """Códigos de localidad que cumplen los filtros (listas de nombres o None)."""
+        m = np.ones(len(self.localidades), dtype=bool)
+        if ccte:
+            m &= self.localidades["CCTE"].isin([str(x) for x in ccte]).to_numpy()
+        if provincia:
+            m &= self.localidades["Provincia"].isin([str(x) for x in provincia]).to_numpy()
+        if localidad:
+            m &= self.localidades["Localidad"].isin([str(x) for x in localidad]).to_numpy()
+        return np.flatnonzero(m)
+
+    def rangos(self, ccte=None, provincia=None, anio=None, localidad=None) -> list[tuple[int, int]]:
+        """Rangos [inicio, fin) de filas (contiguos ya fusionados)."""
+        cods = self.codigos(ccte, provincia, localidad)
+        if anio is None:
+            pares = zip(self.inicio[cods], self.fin[cods])
+        else:
+            sel = self.anios[np.isin(self.anios[:, 0], cods) & (self.anios[:, 1] == int(anio))]
+            pares = zip(sel[:, 2], sel[:, 3])
+
+        out: list[tuple[int, int]] = []
+        for a, b in pares:
+            if b <= a:
+                continue
+            if out and out[-1][1] == a:
+                out[-1] = (out[-1][0], int(b))
+            else:
+                out.append((int(a), int(b)))
+        return out
+
+
+def abrir_columnas(version: int) -> Columnas | None:
+    """Almacén de `version` (abierto una vez por proceso); None si todavía no existe."""
+    if not COLUMNAS_NPY:
+        return None
+    clave = (str(Path(store.DB_FILE).resolve()), int(version))
+    with _LOCK:
+        col = _ABIERTAS.get(clave)
+    if col is not None:
+        return col
+
+    ruta = ruta_columnas(version)
+    if not ruta.exists():
+        return None
+    try:
+        col = Columnas(ruta)
+    except (OSError, ValueError, KeyError):
+        return None
+    if col.version != int(version):
+        return None
+
+    with _LOCK:
+        # Solo se mantiene abierta la última versión de cada DB
+        for k in [k for k in _ABIERTAS if k[0] == clave[0]]:
+            del _ABIERTAS[k]
+        _ABIERTAS[clave] = col
+    return col
+
+
+class Seleccion:
+    """Filas de una tabla maestra elegidas por rangos del almacén columnar."""
+
+    def __init__(self, columnas: Columnas, rangos: list[tuple[int, int]], tabla: pd.DataFrame):
+        self.columnas = columnas
+        self.rangos = rangos
+        self.tabla = tabla
+
+    def __len__(self) -> int:
+        return sum(b - a for a, b in self.rangos)
+
+    def tramos(self, nombre: str) -> list[np.ndarray]:
+        """Un slice (vista del memmap, sin copia) por rango."""
+        arr = self.columnas.arrays[nombre]
+        return [arr[a:b] for a, b in self.rangos]
+
+    def valores(self, nombre: str) -> np.ndarray:
+        """La columna seleccionada; sin copia si es un único rango."""
+        tramos = self.tramos(nombre)
+        if not tramos:
+            return np.empty(0, dtype=self.columnas.arrays[nombre].dtype)
+        return tramos[0] if len(tramos) == 1 else np.concatenate(tramos)
+
+    def filas_por_localidad(self) -> pd.DataFrame:
+        """CCTE, Provincia, Localidad y Filas de cada localidad con filas en la selección."""
+        n = np.bincount(self.valores("localidad"), minlength=len(self.columnas.localidades))
+        out = self.columnas.localidades.assign(Filas=n[:len(self.columnas.localidades)])
+        return out[out["Filas"] > 0].reset_index(drop=True)
+
+    def columna_tabla(self, nombre: str) -> pd.Series:
+        """Columna `nombre` de la tabla maestra en las filas seleccionadas (sin copiar la tabla)."""
+        return self.tabla[nombre].iloc[self.valores("fila")]
+
+    def maximo(self) -> tuple[float, int] | None:
+        """(Resultado máximo, posición en la tabla maestra) o None si no hay valores."""
+        mejor = None
+        for a, b in self.rangos:
+            i = _argmax(self.columnas.arrays["resultado"][a:b])
+            if i is None:
+                continue
+            v = float(self.columnas.arrays["resultado"][a + i])
+            if mejor is None or v > mejor[0]:
+                mejor = (v, a + i)
+        if mejor is None:
+            return None
+        return mejor[0], int(self.columnas.arrays["fila"][mejor[1]])
+
+    def fila_maxima(self) -> pd.Series | None:
+        m = self.maximo()
+        return None if m is None else self.tabla.iloc[m[1]]
+
+    def picos_por_localidad(self) -> pd.DataFrame:
+        """
+        Por localidad (CCTE, Provincia, Localidad): Puntos con Resultado válido,
+        MaxVm y la posición de la fila del máximo en la tabla maestra.
+        """
+        res = self.columnas.arrays["resultado"]
+        loc = self.columnas.arrays["localidad"]
+        filas = []
+        for a, b in self.rangos:
+            # Un rango puede cubrir varias localidades contiguas
+            cods = np.arange(int(loc[a]), int(loc[b - 1]) + 1)
+            for c in cods:
+                ia = max(a, int(self.columnas.inicio[c]))
+                ib = min(b, int(self.columnas.fin[c]))
+                seg = res[ia:ib]
+                puntos = int(seg.size - np.count_nonzero(np.isnan(seg)))
+                i = _argmax(seg)
+                if i is None:
+                    continue
+                filas.append((int(c), puntos, float(seg[i]), int(self.columnas.arrays["fila"][ia + i])))
+
+        out = pd.DataFrame(filas, columns=["codigo", "Puntos", "MaxVm", "fila"])
+        if out.empty:
+            return pd.DataFrame(columns=_CLAVES + ["Puntos", "MaxVm", "fila"])
+
+        # Una localidad partida por años: se combinan sus tramos
+        out = out.sort_values("MaxVm", ascending=False)
+        out = out.groupby("codigo", sort=False).agg(
+            Puntos=("Puntos", "sum"), MaxVm=("MaxVm", "first"), fila=("fila", "first"),
+        )
+        nombres = self.columnas.localidades.iloc[out.index.to_numpy()].reset_index(drop=True)
+        return pd.concat([nombres, out.reset_index(drop=True)], axis=1)
+
+
+def _argmax(seg: np.ndarray) -> int | None:
+    """argmax ignorando NaN (sin copiar el slice salvo que haya NaN)."""
+    if seg.size == 0:
+        return None
+    i = int(np.argmax(seg))
+    if not np.isnan(seg[i]):
+        return i
+    if np.isnan(seg).all():
+        return None
+    return int(np.nanargmax(seg))
+
+
+def seleccion(tabla: pd.DataFrame, ccte=None, provincia=None, anio=None, localidad=None) -> Seleccion | None:
+    """
+    Selección sobre el almacén de la versión de `tabla` (la tabla maestra de la
+    sesión); None si el almacén de esa versión todavía no está armado.
+    """
+    if tabla is None or tabla.empty or tabla.attrs.get("data_version") is None:
+        return None
+    col = abrir_columnas(int(tabla.attrs["data_version"]))
+    if col is None or col.filas != len(tabla):
+        return None
+    anio = None if anio in (None, "Todos", "Todas") else int(anio)
+    return Seleccion(col, col.rangos(ccte, provincia, anio, localidad), tabla)
+
+
+def seleccion_global(tabla: pd.DataFrame, gf: dict) -> Seleccion | None:
+    """Selección con los filtros globales (mismo criterio que state.get_df_filtrado_global)."""
+    return seleccion(tabla, gf.get("ccte"), gf.get("provincia"), gf.get("anio", "Todos"))
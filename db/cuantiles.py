@@ -0,0 +1,160 @@
+"""
+Percentiles aproximados de Resultado por (localidad, año), combinables entre celdas.
+
+Tabla `cubo_cuantiles`, una fila por (localidad_id, anio, bin) con mediciones:
+  n   mediciones con Resultado dentro del bin
+
+Los bins son logarítmicos sobre V/m (como DDSketch): el bin b cubre
+(GAMMA**(b-1), GAMMA**b] y se representa con un valor que está a menos de
+ERROR_RELATIVO (1 %) de cualquier Resultado del bin. Combinar celdas es sumar
+n por bin, así que cualquier combinación de filtros (CCTE, provincia, año) se
+contesta con un GROUP BY bin sobre las celdas que entran, sin ordenar filas.
+Como % = vm² / K_DEN es creciente, el cuantil de % es el % del cuantil de V/m
+(error relativo ~2 %).
+
+El año es el del cubo (FechaHora; si falta, el de Fecha). Se mantiene en la
+transacción de cada escritura, para las mismas localidades que db.cubo.
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from db import cubo, schema
+from processing.agregados import vm_a_pct
+
+CUANTILES = "cubo_cuantiles"
+
+ERROR_RELATIVO = 0.01
+GAMMA = (1 + ERROR_RELATIVO) / (1 - ERROR_RELATIVO)
+# Por debajo de VM_MIN (incluido 0) todo cae en el primer bin
+VM_MIN = 1e-3
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+DDL_CUANTILES = f"""
+CREATE TABLE IF NOT EXISTS {CUANTILES} (
+    localidad_id INTEGER NOT NULL,
+    anio INTEGER NOT NULL,
+    bin INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (localidad_id, anio, bin)
+) WITHOUT ROWID
+"""
+
+_FILAS = f"""
+SELECT a.localidad_id AS loc,
+       CASE WHEN m.FechaHora IS NULL THEN {schema.ANIO_FECHA_SQL}
+            ELSE CAST(substr(m.FechaHora, 1, 4) AS INTEGER) END AS anio,
+       m.Resultado AS r
+FROM {schema.FACT_TABLE} m
+JOIN dim_archivo a ON a.id = m.archivo_id
+WHERE m.Resultado IS NOT NULL {{where}}
+"""
+
+_CHUNK = 200_000
+
+
+def bins(vm) -> np.ndarray:
+    """Bin de cada Resultado (V/m)."""
+    vm = np.maximum(np.asarray(vm, dtype="float64"), VM_MIN)
+    return np.ceil(np.log(vm) / math.log(GAMMA)).astype(np.int64)
+
+
+def valor_bin(b) -> np.ndarray:
+    """Valor representativo (V/m) de cada bin: a menos de ERROR_RELATIVO de todo el bin."""
+    return 2.0 * np.power(GAMMA, np.asarray(b, dtype="float64")) / (GAMMA + 1.0)
+
+
+# ============================================================
+# Mantenimiento (dentro de la transacción del escritor)
+# ============================================================
+def _insertar(conn: sqlite3.Connection, where: str, params: tuple):
+    partes = []
+    for chunk in pd.read_sql(_FILAS.format(where=where), conn, params=params, chunksize=_CHUNK):
+        chunk["bin"] = bins(chunk["r"].to_numpy())
+        partes.append(chunk.groupby(["loc", "anio", "bin"]).size().rename("n"))
+    if not partes:
+        return
+    conteos = pd.concat(partes).groupby(level=[0, 1, 2]).sum().reset_index()
+    conn.executemany(
+        f"INSERT INTO {CUANTILES} (localidad_id, anio, bin, n) VALUES (?, ?, ?, ?)",
+        conteos[["loc", "anio", "bin", "n"]].itertuples(index=False, name=None),
+    )
+
+
+def recalcular(conn: sqlite3.Connection, localidad_ids=None):
+    """Rearma los bins de esas localidades (None = toda la tabla). No hace commit."""
+    if localidad_ids is None:
+        conn.execute(f"DELETE FROM {CUANTILES}")
+        _insertar(conn, "", ())
+        return
+
+    ids = sorted({int(i) for i in localidad_ids})
+    for i in range(0, len(ids), schema.LOTE_IDS):
+        lote = ids[i:i + schema.LOTE_IDS]
+        marcas = ",".join("?" * len(lote))
+        conn.execute(f"DELETE FROM {CUANTILES} WHERE localidad_id IN ({marcas})", lote)
+        _insertar(conn, f"AND a.localidad_id IN ({marcas})", tuple(lote))
+
+
+# ============================================================
+# Lectura
+# ============================================================
+_GRUPOS = {
+    None: "'Total'",
+    "CCTE": "NULLIF(c.nombre, '')",
+    "Provincia": "NULLIF(p.nombre, '')",
+    "Año": "k.anio",
+}
+
+
+def _cuantiles_de_bins(b: np.ndarray, n: np.ndarray, percentiles) -> list[float]:
+    orden = np.argsort(b)
+    b, acumulado = b[orden], np.cumsum(n[orden])
+    total = acumulado[-1]
+    # Rango (base 0) del percentil, como numpy 'lower': el primer bin que lo alcanza
+    rangos = np.floor(np.asarray(percentiles) * (total - 1))
+    return list(valor_bin(b[np.searchsorted(acumulado, rangos, side="right")]))
+
+
+def _leer(conn, gf, por, percentiles):
+    if por not in _GRUPOS:
+        raise ValueError(f"Agrupación no soportada: {por!r} (opciones: CCTE, Provincia, Año)")
+    where, params = cubo.where_dimensiones(gf)
+    celdas = pd.read_sql(
+        f"""
+        SELECT {_GRUPOS[por]} AS grupo, k.bin, SUM(k.n) AS n
+        FROM {CUANTILES} k
+        JOIN dim_localidad l ON l.id = k.localidad_id
+        JOIN dim_ccte c ON c.id = l.ccte_id
+        JOIN dim_provincia p ON p.id = l.provincia_id
+        {where}
+        GROUP BY 1, 2
+        """,
+        conn,
+        params=params,
+    )
+
+    filas = []
+    for grupo, g in celdas.groupby("grupo", dropna=False, sort=True):
+        vm = _cuantiles_de_bins(g["bin"].to_numpy(), g["n"].to_numpy(), percentiles)
+        fila = {por or "Ámbito": grupo, "Mediciones": int(g["n"].sum())}
+        for q, v in zip(percentiles, vm):
+            fila[f"p{q * 100:g} (%)"] = round(vm_a_pct(float(v)), 2)
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def leer_percentiles(
+    gf: dict | None = None, por: str | None = None, percentiles=PERCENTILES,
+    conn: sqlite3.Connection | None = None,
+) -> pd.DataFrame:
+    """
+    Percentiles de Resultado % con los filtros globales: una fila por grupo
+    (`por` = None, "CCTE", "Provincia" o "Año") con Mediciones y p50/p90/p99 (%).
+    """
+    return schema.con_conexion(_leer, gf, por, tuple(percentiles), conn=conn)
@@ -0,0 +1,152 @@
+"""
+Cubo de agregados para los tableros (rollup precalculado en SQLite).
+
+Grano: (localidad, año, mes, día). Por celda:
+  puntos            filas
+  puntos_fecha      filas con FechaHora válida (las que cuentan para días/meses)
+  puntos_resultado  filas con Resultado
+  max_vm            máximo de Resultado
+  suma_cuadrados    Σ Resultado² (promedio de % = Σ vm² / puntos_resultado / K_DEN)
+  segundos          Σ (fin - inicio) por archivo en ese día (tiempo trabajado)
+
+Las filas sin FechaHora quedan en la celda (año de Fecha, mes 0, día 0), así
+el filtro de año coincide con el de sql_where_from_filters. Días distintos =
+celdas con mes > 0 (una por día). CCTE y Provincia salen de dim_localidad al
+leer, así que editar metadatos de una localidad no toca el cubo.
+
+Se mantiene dentro de la misma transacción que cada escritura: se recalculan
+solo las localidades tocadas (append, borrados, fusiones).
+"""
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+
+from db import schema
+
+CUBO = "cubo_mediciones"
+
+DDL_CUBO = f"""
+CREATE TABLE IF NOT EXISTS {CUBO} (
+    localidad_id INTEGER NOT NULL,
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    dia INTEGER NOT NULL,
+    puntos INTEGER NOT NULL,
+    puntos_fecha INTEGER NOT NULL,
+    puntos_resultado INTEGER NOT NULL,
+    max_vm REAL,
+    suma_cuadrados REAL,
+    segundos REAL NOT NULL,
+    PRIMARY KEY (localidad_id, anio, mes, dia)
+) WITHOUT ROWID
+"""
+
+_RECALCULAR = f"""
+INSERT INTO {CUBO}
+WITH base AS (
+    SELECT a.localidad_id AS loc, m.archivo_id AS arch, m.Resultado AS r, m.FechaHora AS fh,
+           CASE WHEN m.FechaHora IS NULL THEN {schema.ANIO_FECHA_SQL}
+                ELSE CAST(substr(m.FechaHora, 1, 4) AS INTEGER) END AS anio,
+           CASE WHEN m.FechaHora IS NULL THEN 0 ELSE CAST(substr(m.FechaHora, 6, 2) AS INTEGER) END AS mes,
+           CASE WHEN m.FechaHora IS NULL THEN 0 ELSE CAST(substr(m.FechaHora, 9, 2) AS INTEGER) END AS dia
+    FROM {schema.FACT_TABLE} m
+    JOIN dim_archivo a ON a.id = m.archivo_id
+    {{where}}
+),
+por_archivo AS (
+    SELECT loc, anio, mes, dia,
+           COUNT(*) AS puntos, COUNT(fh) AS puntos_fecha, COUNT(r) AS puntos_resultado,
+           MAX(r) AS max_vm, SUM(r * r) AS suma_cuadrados,
+           COALESCE((julianday(MAX(fh)) - julianday(MIN(fh))) * 86400.0, 0) AS segundos
+    FROM base
+    GROUP BY loc, anio, mes, dia, arch
+)
+SELECT loc, anio, mes, dia,
+       SUM(puntos), SUM(puntos_fecha), SUM(puntos_resultado),
+       MAX(max_vm), SUM(suma_cuadrados), SUM(segundos)
+FROM por_archivo
+GROUP BY loc, anio, mes, dia
+"""
+
+def recalcular(conn: sqlite3.Connection, localidad_ids=None):
+    """Rearma las celdas de esas localidades (None = todo el cubo). No hace commit."""
+    if localidad_ids is None:
+        conn.execute(f"DELETE FROM {CUBO}")
+        conn.execute(_RECALCULAR.format(where=""))
+        return
+
+    ids = sorted({int(i) for i in localidad_ids})
+    for i in range(0, len(ids), schema.LOTE_IDS):
+        lote = ids[i:i + schema.LOTE_IDS]
+        marcas = ",".join("?" * len(lote))
+        conn.execute(f"DELETE FROM {CUBO} WHERE localidad_id IN ({marcas})", lote)
+        conn.execute(_RECALCULAR.format(where=f"WHERE a.localidad_id IN ({marcas})"), lote)
+
+
+def localidades_desde_id(conn: sqlite3.Connection, id_desde: int) -> list[int]:
+    """Localidades que recibieron mediciones con id > id_desde (append)."""
+    return [r[0] for r in conn.execute(
+        f"""
+        SELECT DISTINCT a.localidad_id FROM {schema.FACT_TABLE} m
+        JOIN dim_archivo a ON a.id = m.archivo_id
+        WHERE m.id > ?
+        """,
+        (int(id_desde),),
+    )]
+
+
+def localidades_de_archivos(conn: sqlite3.Connection, where_archivo: str, params: tuple) -> list[int]:
+    return [r[0] for r in conn.execute(
+        f"SELECT DISTINCT localidad_id FROM dim_archivo WHERE {where_archivo}", params
+    )]
+
+
+def where_dimensiones(gf: dict | None) -> tuple[str, tuple]:
+    """WHERE de los filtros globales sobre dim_ccte (c), dim_provincia (p) y la tabla de rollup (k.anio)."""
+    gf = gf or {}
+    clauses, params = [], []
+    if gf.get("ccte"):
+        clauses.append(f"c.nombre IN ({','.join('?' * len(gf['ccte']))})")
+        params.extend(str(x) for x in gf["ccte"])
+    if gf.get("provincia"):
+        clauses.append(f"p.nombre IN ({','.join('?' * len(gf['provincia']))})")
+        params.extend(str(x) for x in gf["provincia"])
+    anio = gf.get("anio", "Todos")
+    if anio and anio != "Todos":
+        clauses.append("k.anio = ?")
+        params.append(int(anio))
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, tuple(params)
+
+
+def leer_cubo(gf: dict | None = None, conn: sqlite3.Connection | None = None) -> pd.DataFrame:
+    """Celdas del cubo con CCTE/Provincia/Localidad, filtradas por los filtros globales."""
+    if conn is None:
+        import db.sqlite_store as store
+
+        if not store.DB_FILE.exists():
+            return pd.DataFrame()
+        conn = store.conectar_lectura()
+        try:
+            return leer_cubo(gf, conn)
+        finally:
+            conn.close()
+
+    where, params = where_dimensiones(gf)
+    return pd.read_sql(
+        f"""
+        SELECT NULLIF(c.nombre, '') AS CCTE, NULLIF(p.nombre, '') AS Provincia,
+               NULLIF(l.nombre, '') AS Localidad,
+               k.anio, k.mes, k.dia, k.puntos, k.puntos_fecha, k.puntos_resultado,
+               k.max_vm, k.suma_cuadrados, k.segundos
+        FROM {CUBO} k
+        JOIN dim_localidad l ON l.id = k.localidad_id
+        JOIN dim_ccte c ON c.id = l.ccte_id
+        JOIN dim_provincia p ON p.id = l.provincia_id
+        {where}
+        """,
+        conn,
+        params=params,
+    )
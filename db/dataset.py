@@ -0,0 +1,184 @@
+"""
+Tabla maestra compartida por todas las sesiones del proceso.
+
+Una sola copia en memoria por DB. En cada rerun las sesiones piden la tabla;
+acá se compara la data_version de la DB (una consulta de un registro) y, si
+cambió, se aplican solo los cambios del log (`cambios`): filas agregadas,
+localidades/expedientes borrados, metadatos editados. Si el log no alcanza
+o hubo un reemplazo total, se recarga todo. Cada versión nueva se vuelca
+al snapshot Arrow (db.snapshot) para el próximo arranque en frío y al
+almacén columnar .npy (db.columnas) que usan los caminos calientes; las
+particiones Parquet por (CCTE, año) (db.particiones) se ponen al día aparte.
+
+Las tablas devueltas no se modifican nunca en el lugar: cada refresco arma
+un DataFrame nuevo, así una sesión que está renderizando no ve cambios a medias.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from db import schema
+from db.columnas import programar_columnas
+from db.particiones import programar_particiones
+from db.snapshot import programar_snapshot
+import db.sqlite_store as store
+
+_LOCK = threading.Lock()
+_CACHE: dict[str, pd.DataFrame] = {}
+
+
+def _clave() -> str:
+    return str(Path(store.DB_FILE).resolve())
+
+
+def _concat(df: pd.DataFrame, nuevas: pd.DataFrame) -> pd.DataFrame:
+    """Concatena manteniendo las columnas category (unión de categorías, sin pasar por object)."""
+    if df.empty:
+        return nuevas
+    if nuevas.empty:
+        return df
+
+    out = {}
+    for col in df.columns:
+        a, b = df[col], nuevas[col]
+        if isinstance(a.dtype, pd.CategoricalDtype) and isinstance(b.dtype, pd.CategoricalDtype):
+            out[col] = union_categoricals([a, b], ignore_order=True)
+        else:
+            out[col] = pd.concat([a, b], ignore_index=True)
+    return pd.DataFrame(out)
+
+
+def _set_categoria(s: pd.Series, mask, valor) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype) and valor not in s.cat.categories:
+        s = s.cat.add_categories([valor])
+    s = s.copy()
+    s[mask] = valor
+    return s
+
+
+_CLAVE_ARCHIVO = ["CCTE", "Provincia", "Localidad", "Nombre Archivo"]
+
+
+def _reetiquetar_archivos(df: pd.DataFrame, nuevas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Si el append cayó en un archivo que ya existía (mismo nombre y localidad), la DB
+    le actualiza Expediente/FechaCarga a todo el archivo: se replica en las filas viejas.
+    """
+    if df.empty or nuevas.empty or not set(_CLAVE_ARCHIVO).issubset(df.columns):
+        return df
+    previas = df["Nombre Archivo"].isin(nuevas["Nombre Archivo"].dropna().unique())
+    if not previas.any():
+        return df
+
+    archivos = nuevas[_CLAVE_ARCHIVO + ["Expediente", "FechaCarga"]].drop_duplicates(_CLAVE_ARCHIVO)
+    out = df.copy(deep=False)
+    for fila in archivos.itertuples(index=False):
+        mask = previas.copy()
+        for col, valor in zip(_CLAVE_ARCHIVO, fila[:4]):
+            mask &= out[col].isna() if pd.isna(valor) else (out[col] == valor)
+        if not mask.any():
+            continue
+        out["Expediente"] = _set_categoria(out["Expediente"], mask, fila[4])
+        fc = out["FechaCarga"].copy()
+        fc[mask] = fila[5]
+        out["FechaCarga"] = fc
+    out["Expediente"] = out["Expediente"].cat.remove_unused_categories()
+    return out
+
+
+def _aplicar(df: pd.DataFrame, tipo: str, detalle: dict, conn) -> pd.DataFrame | None:
+    """Aplica un cambio del log. None = no se puede aplicar incremental (recargar todo)."""
+    if tipo == "append":
+        nuevas = store.cargar_mediciones(conn, detalle.get("id_desde"), detalle.get("id_hasta"))
+        return _concat(_reetiquetar_archivos(df, nuevas), nuevas)
+
+    if tipo == "delete":
+        col = detalle.get("columna")
+        if col not in df.columns:
+            return None
+        out = df.loc[df[col] != detalle.get("valor")].reset_index(drop=True)
+        for c in out.columns:
+            if isinstance(out[c].dtype, pd.CategoricalDtype):
+                out[c] = out[c].cat.remove_unused_categories()
+        return out
+
+    if tipo == "update_localidad":
+        out = df.copy(deep=False)
+        mask = out["Localidad"] == detalle["localidad"]
+        out["CCTE"] = _set_categoria(out["CCTE"], mask, detalle["ccte"])
+        out["Provincia"] = _set_categoria(out["Provincia"], mask, detalle["provincia"])
+        out["Localidad"] = _set_categoria(out["Localidad"], mask, detalle["nombre"])
+
+        # Incluye la localidad destino si la edición fusionó dos localidades
+        destino = (
+            (out["Localidad"] == detalle["nombre"])
+            & (out["CCTE"] == detalle["ccte"])
+            & (out["Provincia"] == detalle["provincia"])
+        )
+        out["Expediente"] = _set_categoria(out["Expediente"], destino, detalle["expediente"])
+        fc = out["FechaCarga"].copy()
+        fc[destino] = pd.Timestamp(detalle["fecha"])
+        out["FechaCarga"] = fc
+        for c in ("CCTE", "Provincia", "Localidad", "Expediente"):
+            out[c] = out[c].cat.remove_unused_categories()
+        return out
+
+    return None
+
+
+def obtener_tabla_maestra() -> pd.DataFrame:
+    """
+    Tabla maestra al día con la DB. Si nada cambió devuelve el mismo objeto
+    (comparar con `is` alcanza para saber si hubo refresco).
+    """
+    version = store.leer_data_version()
+    if version is None:
+        return pd.DataFrame()
+
+    clave = _clave()
+    with _LOCK:
+        df = _CACHE.get(clave)
+        if df is not None and df.attrs.get("data_version") == version:
+            return df
+
+        if df is not None and df.attrs.get("data_version") is not None:
+            nuevo = _refrescar(df)
+            if nuevo is not None:
+                _CACHE[clave] = nuevo
+                programar_snapshot(nuevo)
+                programar_columnas(nuevo)
+                programar_particiones()
+                return nuevo
+
+        df = store.load_tabla_maestra_from_db()
+        _CACHE[clave] = df
+        programar_snapshot(df)
+        programar_columnas(df)
+        programar_particiones()
+        return df
+
+
+def _refrescar(df: pd.DataFrame) -> pd.DataFrame | None:
+    conn = store.conectar_lectura()
+    try:
+        conn.execute("BEGIN")
+        cambios = schema.leer_cambios(conn, int(df.attrs["data_version"]))
+        if cambios is None:
+            return None
+
+        version = df.attrs["data_version"]
+        for version, tipo, detalle in cambios:
+            df = _aplicar(df, tipo, detalle, conn)
+            if df is None:
+                return None
+        conn.rollback()
+    finally:
+        conn.close()
+
+    df = df.copy(deep=False)
+    df.attrs["data_version"] = version
+    return df
@@ -0,0 +1,104 @@
+"""
+Escritor único de la DB.
+
+Todas las escrituras del proceso pasan por una cola y las ejecuta un solo hilo,
+cada una en su transacción (BEGIN IMMEDIATE). Entre procesos, el lock de SQLite
++ busy_timeout las serializa. Cada escritura incrementa `data_version`; si el
+llamador pasa `version_esperada` y la DB ya cambió, se rechaza con
+ConflictoDeVersion (concurrencia optimista: nadie pisa cambios que no vio).
+
+Cada versión deja una entrada en la tabla `cambios` (ver anotar_cambio), que
+usa db.dataset para refrescar la tabla en memoria de forma incremental.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from db import schema
+import db.sqlite_store as store
+
+
+class ConflictoDeVersion(RuntimeError):
+    """La DB cambió desde que la sesión leyó los datos."""
+
+    def __init__(self, esperada: int, actual: int):
+        super().__init__(
+            f"Los datos cambiaron desde la última carga (versión {esperada} -> {actual}). "
+            "Recargá la tabla y volvé a intentar."
+        )
+        self.esperada = esperada
+        self.actual = actual
+
+
+_COLA: queue.Queue = queue.Queue()
+_HILO: threading.Thread | None = None
+_HILO_LOCK = threading.Lock()
+
+# Cambio anotado por la escritura en curso (solo lo usa el hilo escritor)
+_PENDIENTE = threading.local()
+
+
+def anotar_cambio(tipo: str, **detalle):
+    """
+    Llamar dentro de fn(conn) para describir la escritura en el log de cambios
+    ("append", "delete", "update_localidad"). Sin anotación se registra
+    "reemplazo" y los lectores recargan todo.
+    """
+    _PENDIENTE.cambio = (tipo, detalle)
+
+
+def _ejecutar(fn, version_esperada: int | None):
+    conn = store._connect()
+    conn.isolation_level = None  # manejamos la transacción a mano
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            actual = schema.leer_version(conn)
+            if version_esperada is not None and actual != version_esperada:
+                raise ConflictoDeVersion(version_esperada, actual)
+
+            _PENDIENTE.cambio = None
+            valor = fn(conn)
+            tipo, detalle = _PENDIENTE.cambio or ("reemplazo", {})
+            nueva = schema.incrementar_version(conn)
+            schema.registrar_cambio(conn, nueva, tipo, detalle)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return valor, nueva
+    finally:
+        conn.close()
+
+
+def _loop():
+    while True:
+        fn, version_esperada, fut = _COLA.get()
+        if not fut.set_running_or_notify_cancel():
+            continue
+        try:
+            fut.set_result(_ejecutar(fn, version_esperada))
+        except BaseException as e:
+            fut.set_exception(e)
+
+
+def _asegurar_hilo():
+    global _HILO
+    with _HILO_LOCK:
+        if _HILO is None or not _HILO.is_alive():
+            _HILO = threading.Thread(target=_loop, name="rni-db-escritor", daemon=True)
+            _HILO.start()
+
+
+def escribir(fn, version_esperada: int | None = None):
+    """
+    Encola fn(conn) y espera su resultado. fn no debe hacer commit/rollback:
+    corre dentro de la transacción del escritor.
+    """
+    _asegurar_hilo()
+    fut: Future = Future()
+    _COLA.put((fn, version_esperada, fut))
+    valor, _ = fut.result()
+    return valor
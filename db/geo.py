@@ -0,0 +1,217 @@
+"""
+Índice espacial de las mediciones: grilla fija en SQLite.
+
+Cada medición con coordenadas válidas cae en una celda de GRADOS_CELDA de lado
+(0,01° ≈ 1,1 km): celda = fila * COLUMNAS + columna. La tabla `geo_celdas` está
+ordenada por (celda, medicion_id) y guarda Lat/Lon normalizadas y el Resultado
+(las mediciones no se editan), así una consulta
+por radio o por caja lee solo los rangos de celdas que la cubren (cada fila de la
+grilla es un rango contiguo) y después filtra por distancia exacta.
+
+Coordenadas: Lat/Lon canónicas de la tabla de hechos (normalizadas al cargar,
+nulas si no son válidas), así que se indexan tal cual. Los chequeos de rango
+quedan por las filas que todavía no pasaron por la migración 7.
+
+Se mantiene en la transacción de cada escritura, como el cubo y los hotspots:
+append indexa los ids nuevos y los borrados sacan los ids de los archivos borrados
+(las celdas tocadas se pasan a db.teselas, la pirámide del mapa).
+"""
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from db import schema
+from processing.agregados import vm_a_pct
+
+GEO = "geo_celdas"
+
+GRADOS_CELDA = 0.01
+COLUMNAS = 36_000  # 360° / GRADOS_CELDA
+RADIO_TIERRA_M = 6_371_008.8
+METROS_POR_GRADO = RADIO_TIERRA_M * np.pi / 180
+
+DDL_GEO = f"""
+CREATE TABLE IF NOT EXISTS {GEO} (
+    celda INTEGER NOT NULL,
+    medicion_id INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    resultado REAL,
+    PRIMARY KEY (celda, medicion_id)
+) WITHOUT ROWID
+"""
+
+# fila = (lat + 90) / paso; columna = (lon + 180) / paso
+_CELDA = f"""
+    (CAST((m.Lat + 90.0) / {GRADOS_CELDA} AS INTEGER) * {COLUMNAS}
+     + CAST((m.Lon + 180.0) / {GRADOS_CELDA} AS INTEGER))
+"""
+_VALIDA = """
+    m.Lat IS NOT NULL AND m.Lon IS NOT NULL
+    AND ABS(m.Lat) <= 90 AND ABS(m.Lon) <= 180 AND NOT (m.Lat = 0 AND m.Lon = 0)
+"""
+_INDEXAR = f"""
+INSERT OR REPLACE INTO {GEO} (celda, medicion_id, lat, lon, resultado)
+SELECT {_CELDA}, m.id, m.Lat, m.Lon, m.Resultado
+FROM {schema.FACT_TABLE} m
+WHERE {_VALIDA} {{where}}
+"""
+
+
+# ============================================================
+# Mantenimiento (dentro de la transacción del escritor)
+# ============================================================
+def reconstruir(conn: sqlite3.Connection):
+    """Rearma todo el índice. No hace commit."""
+    conn.execute(f"DELETE FROM {GEO}")
+    conn.execute(_INDEXAR.format(where=""))
+
+
+def indexar_desde_id(conn: sqlite3.Connection, id_desde: int, id_hasta: int | None = None):
+    """Indexa las mediciones con id_desde < id <= id_hasta (append, backfill). No hace commit."""
+    if id_hasta is None:
+        conn.execute(_INDEXAR.format(where="AND m.id > ?"), (int(id_desde),))
+    else:
+        conn.execute(_INDEXAR.format(where="AND m.id > ? AND m.id <= ?"), (int(id_desde), int(id_hasta)))
+
+
+def celdas_desde_id(conn: sqlite3.Connection, id_desde: int) -> list[int]:
+    """Celdas de las mediciones con id > id_desde (las que tocó un append)."""
+    return [r[0] for r in conn.execute(
+        f"SELECT DISTINCT {_CELDA} FROM {schema.FACT_TABLE} m WHERE m.id > ? AND {_VALIDA}", (int(id_desde),)
+    )]
+
+
+def borrar_archivos(conn: sqlite3.Connection, where_archivo: str, params: tuple) -> list[int]:
+    """
+    Saca del índice las mediciones de esos archivos. Llamar ANTES de borrar los
+    hechos: la celda se recalcula desde Lat/Lon y se borra por clave primaria.
+    Devuelve las celdas tocadas.
+    """
+    de_archivos = f"""
+        FROM {schema.FACT_TABLE} m
+        WHERE {_VALIDA} AND m.archivo_id IN (SELECT id FROM dim_archivo WHERE {where_archivo})
+    """
+    celdas = [r[0] for r in conn.execute(f"SELECT DISTINCT {_CELDA} {de_archivos}", params)]
+    conn.execute(f"DELETE FROM {GEO} WHERE (celda, medicion_id) IN (SELECT {_CELDA}, m.id {de_archivos})", params)
+    return celdas
+
+
+# ============================================================
+# Consultas
+# ============================================================
+def normalizar(lat: float, lon: float) -> tuple[float, float]:
+    """Coordenada de consulta en el hemisferio de los datos (sur y oeste): -|Lat|, -|Lon|."""
+    return -abs(float(lat)), -abs(float(lon))
+
+
+def _fila(lat: float) -> int:
+    return int((lat + 90.0) / GRADOS_CELDA)
+
+
+def _columna(lon: float) -> int:
+    return int((lon + 180.0) / GRADOS_CELDA)
+
+
+def _candidatos(conn: sqlite3.Connection, lat_min, lat_max, lon_min, lon_max) -> pd.DataFrame:
+    """
+    Mediciones indexadas dentro de la caja (ya normalizada), con su Resultado:
+    un rango de celdas por fila de la grilla.
+    """
+    c0, c1 = _columna(max(lon_min, -180.0)), _columna(min(lon_max, 180.0))
+    partes = []
+    for f in range(_fila(max(lat_min, -90.0)), _fila(min(lat_max, 90.0)) + 1):
+        partes.extend(conn.execute(
+            f"""
+            SELECT medicion_id, lat, lon, resultado FROM {GEO}
+            WHERE celda BETWEEN ? AND ? AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?
+            """,
+            (f * COLUMNAS + c0, f * COLUMNAS + c1, lat_min, lat_max, lon_min, lon_max),
+        ).fetchall())
+    return pd.DataFrame(partes, columns=["medicion_id", "lat", "lon", "Resultado"])
+
+
+def distancia_m(lat0: float, lon0: float, lat, lon) -> np.ndarray:
+    """Distancia haversine en metros desde (lat0, lon0)."""
+    p0, p1 = np.radians(lat0), np.radians(np.asarray(lat, dtype="float64"))
+    dlat = p1 - p0
+    dlon = np.radians(np.asarray(lon, dtype="float64") - lon0)
+    a = np.sin(dlat / 2) ** 2 + np.cos(p0) * np.cos(p1) * np.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _con_detalle(conn: sqlite3.Connection, puntos: pd.DataFrame) -> pd.DataFrame:
+    """Agrega a los puntos su fila de la vista (CCTE, Localidad, Resultado, %, Expediente, ...)."""
+    detalle = schema.filas_por_id(
+        conn, puntos["medicion_id"],
+        'CCTE, Provincia, Localidad, Fecha, Hora, Expediente, "Nombre Archivo"',
+    )
+    out = puntos.merge(detalle, on="medicion_id", how="left")
+    out["Resultado %"] = vm_a_pct(out["Resultado"]).round(2)
+    primeras = [c for c in ["Distancia (m)", "CCTE", "Provincia", "Localidad", "Resultado", "Resultado %", "Expediente"] if c in out.columns]
+    out = out[primeras + [c for c in out.columns if c not in primeras]]
+    return out.rename(columns={"lat": "Lat", "lon": "Lon"})
+
+
+def _cercanas(conn, lat, lon, radio_m, limite):
+    lat0, lon0 = normalizar(lat, lon)
+    # Caja que contiene el círculo: en longitud, medida en la latitud más alejada del ecuador
+    dlat = radio_m / METROS_POR_GRADO
+    lat_ext = min(abs(lat0) + dlat, 89.999)
+    dlon = radio_m / (METROS_POR_GRADO * np.cos(np.radians(lat_ext)))
+
+    puntos = _candidatos(conn, lat0 - dlat, lat0 + dlat, lon0 - dlon, lon0 + dlon)
+    if puntos.empty:
+        return pd.DataFrame()
+
+    d = distancia_m(lat0, lon0, puntos["lat"], puntos["lon"])
+    puntos = puntos[d <= radio_m].assign(**{"Distancia (m)": d[d <= radio_m].round(1)})
+    puntos = puntos.sort_values("Distancia (m)", kind="stable")
+    total = len(puntos)
+    if limite:
+        puntos = puntos.head(int(limite))
+    if puntos.empty:
+        return pd.DataFrame()
+    out = _con_detalle(conn, puntos.reset_index(drop=True))
+    out.attrs["total"] = total
+    return out
+
+
+def _en_caja(conn, lat_min, lat_max, lon_min, lon_max, limite):
+    la = sorted(normalizar(x, 0)[0] for x in (lat_min, lat_max))
+    lo = sorted(normalizar(0, x)[1] for x in (lon_min, lon_max))
+
+    puntos = _candidatos(conn, la[0], la[1], lo[0], lo[1])
+    if puntos.empty:
+        return pd.DataFrame()
+    puntos = puntos.sort_values("Resultado", ascending=False, kind="stable", na_position="last")
+    total = len(puntos)
+    if limite:
+        puntos = puntos.head(int(limite))
+    out = _con_detalle(conn, puntos.reset_index(drop=True))
+    out.attrs["total"] = total
+    return out
+
+
+def cercanas(
+    lat: float, lon: float, radio_m: float = 500, limite: int | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> pd.DataFrame:
+    """
+    Mediciones a menos de `radio_m` metros de (lat, lon), de la más cercana a la
+    más lejana: Distancia (m), CCTE, Provincia, Localidad, Resultado, Resultado %,
+    Expediente, Nombre Archivo, Fecha, Hora, Lat, Lon. Con `limite` trae el detalle
+    solo de las más cercanas; attrs["total"] es la cantidad dentro del radio.
+    """
+    return schema.con_conexion(_cercanas, lat, lon, float(radio_m), limite, conn=conn)
+
+
+def en_caja(
+    lat_min: float, lat_max: float, lon_min: float, lon_max: float, limite: int | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> pd.DataFrame:
+    """Mediciones dentro de la caja Lat/Lon, de mayor a menor Resultado (mismas columnas que `cercanas`)."""
+    return schema.con_conexion(_en_caja, lat_min, lat_max, lon_min, lon_max, limite, conn=conn)
@@ -0,0 +1,125 @@
+"""
+Índice de hotspots: pico de cada localidad, mantenido en SQLite.
+
+Tabla `picos_localidad`, una fila por (localidad, año) y otra por localidad con
+anio = 0 (todos los años):
+  max_vm        máximo de Resultado
+  medicion_id   id de la medición del pico (puntero a la fila)
+  puntos        mediciones con Resultado
+
+El ranking (nacional, por CCTE o por provincia) es la misma tabla ordenada por
+max_vm: el índice (anio, max_vm) da el top-K nacional sin ordenar nada, y con
+filtro de CCTE/Provincia se recorre una fila por localidad. El año sale del
+texto de Fecha (mismo criterio que el filtro de año en SQL).
+
+Se mantiene en la misma transacción que cada escritura, igual que el cubo:
+se recalculan solo las localidades tocadas.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+
+from db import schema
+
+PICOS = "picos_localidad"
+
+# Fila de "todos los años" de cada localidad
+ANIO_TODOS = 0
+
+DDL_PICOS = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {PICOS} (
+        localidad_id INTEGER NOT NULL,
+        anio INTEGER NOT NULL,
+        max_vm REAL NOT NULL,
+        medicion_id INTEGER NOT NULL,
+        puntos INTEGER NOT NULL,
+        PRIMARY KEY (localidad_id, anio)
+    ) WITHOUT ROWID
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{PICOS}_ranking ON {PICOS}(anio, max_vm DESC)",
+]
+
+# Con MAX() como único agregado, SQLite toma las columnas sueltas (id) de la fila del máximo
+_RECALCULAR = f"""
+INSERT INTO {PICOS} (localidad_id, anio, max_vm, medicion_id, puntos)
+WITH base AS (
+    SELECT a.localidad_id AS loc, m.id AS id, m.Resultado AS r, {schema.ANIO_FECHA_SQL} AS anio
+    FROM {schema.FACT_TABLE} m
+    JOIN dim_archivo a ON a.id = m.archivo_id
+    WHERE m.Resultado IS NOT NULL {{where}}
+)
+SELECT loc, anio, MAX(r), id, COUNT(*) FROM base WHERE anio > 0 GROUP BY loc, anio
+UNION ALL
+SELECT loc, {ANIO_TODOS}, MAX(r), id, COUNT(*) FROM base GROUP BY loc
+"""
+
+def recalcular(conn: sqlite3.Connection, localidad_ids=None):
+    """Rearma los picos de esas localidades (None = todo el índice). No hace commit."""
+    if localidad_ids is None:
+        conn.execute(f"DELETE FROM {PICOS}")
+        conn.execute(_RECALCULAR.format(where=""))
+        return
+
+    ids = sorted({int(i) for i in localidad_ids})
+    for i in range(0, len(ids), schema.LOTE_IDS):
+        lote = ids[i:i + schema.LOTE_IDS]
+        marcas = ",".join("?" * len(lote))
+        conn.execute(f"DELETE FROM {PICOS} WHERE localidad_id IN ({marcas})", lote)
+        conn.execute(_RECALCULAR.format(where=f"AND a.localidad_id IN ({marcas})"), lote)
+
+
+def leer_ranking(gf: dict | None = None, k: int | None = None, conn: sqlite3.Connection | None = None) -> pd.DataFrame:
+    """
+    Localidades ordenadas por pico (mayor a menor) según los filtros globales,
+    con la fila del pico (Resultado, Fecha, Hora, FechaHora, Lat, Lon, Expediente, Nombre Archivo).
+    """
+    if conn is None:
+        import db.sqlite_store as store
+
+        if not store.DB_FILE.exists():
+            return pd.DataFrame()
+        conn = store.conectar_lectura()
+        try:
+            return leer_ranking(gf, k, conn)
+        finally:
+            conn.close()
+
+    gf = gf or {}
+    anio = gf.get("anio", "Todos")
+    clauses = ["h.anio = ?"]
+    params: list = [int(anio) if anio and anio != "Todos" else ANIO_TODOS]
+    if gf.get("ccte"):
+        clauses.append(f"c.nombre IN ({','.join('?' * len(gf['ccte']))})")
+        params.extend(str(x) for x in gf["ccte"])
+    if gf.get("provincia"):
+        clauses.append(f"p.nombre IN ({','.join('?' * len(gf['provincia']))})")
+        params.extend(str(x) for x in gf["provincia"])
+    limite = f"LIMIT {int(k)}" if k else ""
+
+    ranking = pd.read_sql(
+        f"""
+        SELECT NULLIF(c.nombre, '') AS CCTE, NULLIF(p.nombre, '') AS Provincia,
+               NULLIF(l.nombre, '') AS Localidad,
+               h.max_vm AS MaxVm, h.puntos AS Puntos, h.medicion_id
+        FROM {PICOS} h
+        JOIN dim_localidad l ON l.id = h.localidad_id
+        JOIN dim_ccte c ON c.id = l.ccte_id
+        JOIN dim_provincia p ON p.id = l.provincia_id
+        WHERE {" AND ".join(clauses)}
+        ORDER BY h.max_vm DESC
+        {limite}
+        """,
+        conn,
+        params=tuple(params),
+    )
+    if ranking.empty:
+        return ranking
+
+    # Fila de cada pico, por id (clave primaria de la tabla de hechos)
+    filas = schema.filas_por_id(
+        conn, ranking["medicion_id"], 'Resultado, Fecha, Hora, FechaHora, Lat, Lon, Expediente, "Nombre Archivo"'
+    )
+    return ranking.merge(filas, on="medicion_id", how="left")
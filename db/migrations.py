@@ -0,0 +1,328 @@
+"""
+Migraciones de esquema versionadas.
+
+Cada migración tiene un número y se aplica una sola vez, en orden, dentro de
+su propia transacción; la tabla `schema_migraciones` registra cuáles ya se
+aplicaron. Todas son idempotentes (se pueden re-ejecutar sin romper nada).
+Los backfills grandes corren aparte, en bloques con commit propio, y la
+migración queda registrada recién cuando el backfill terminó.
+
+Se aplican solas al abrir la DB (db.sqlite_store._connect). Para actualizar
+una DB desplegada a mano:
+
+    python -m db.migrations archivosdata/rni.db
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from db import cubo, cuantiles, geo, hotspots, schema, teselas
+from utils.geo_utils import ARGENTINA_LAT, ARGENTINA_LON, NOTA_SIN_DATO, normalizar_coordenadas
+
+BACKFILL_CHUNK = 100_000
+
+
+# ============================================================
+# 1) Esquema estrella (+ migración de la tabla ancha vieja)
+# ============================================================
+def _m001_esquema_estrella(conn: sqlite3.Connection):
+    for ddl in schema.DDL:
+        conn.execute(ddl)
+
+    if schema._object_type(conn, schema.VIEW_NAME) == "table":
+        _migrar_tabla_ancha(conn)
+        schema.registrar_cambio(conn, schema.incrementar_version(conn), "reemplazo")
+
+
+def _migrar_tabla_ancha(conn: sqlite3.Connection, chunksize: int = BACKFILL_CHUNK) -> int:
+    """Copia la tabla ancha `mediciones_rni` al esquema estrella y la borra."""
+    from db.sqlite_store import _normalize_column_names
+
+    legacy = f"{schema.VIEW_NAME}__ancha"
+    conn.execute(f'ALTER TABLE {schema.VIEW_NAME} RENAME TO "{legacy}"')
+
+    total = 0
+    for chunk in pd.read_sql(f'SELECT * FROM "{legacy}"', conn, chunksize=chunksize):
+        col_map = _normalize_column_names(chunk.columns)
+        if col_map:
+            chunk = chunk.rename(columns=col_map)
+        total += schema.insertar_mediciones(conn, chunk)
+
+    conn.execute(f'DROP TABLE "{legacy}"')
+    return total
+
+
+# ============================================================
+# 2) FechaHora tipada en la tabla de hechos
+# ============================================================
+def _m002_fechahora(conn: sqlite3.Connection):
+    if not schema.tiene_columna(conn, schema.FACT_TABLE, "FechaHora"):
+        conn.execute(f"ALTER TABLE {schema.FACT_TABLE} ADD COLUMN FechaHora TEXT")
+
+    # La vista expone la columna nueva
+    conn.execute(f"DROP VIEW IF EXISTS {schema.VIEW_NAME}")
+    conn.execute(schema.VIEW_DDL)
+
+
+def _m002_backfill_fechahora(conn: sqlite3.Connection, chunksize: int = BACKFILL_CHUNK):
+    """Completa FechaHora desde Fecha + Hora, por rangos de id (un commit por bloque)."""
+    hasta = schema.max_id_hechos(conn)
+    desde = 0
+    while desde < hasta:
+        bloque = pd.read_sql(
+            f"""
+            SELECT id, Fecha, Hora FROM {schema.FACT_TABLE}
+            WHERE id > ? AND id <= ? AND FechaHora IS NULL
+            """,
+            conn,
+            params=(desde, desde + chunksize),
+        )
+        if not bloque.empty:
+            fh = schema.texto_fechahora(bloque["Fecha"], bloque["Hora"])
+            with conn:
+                conn.executemany(
+                    f"UPDATE {schema.FACT_TABLE} SET FechaHora=? WHERE id=?",
+                    [(v, int(i)) for v, i in zip(fh, bloque["id"]) if v is not None],
+                )
+        desde += chunksize
+
+
+# ============================================================
+# 3) Índices para filtros por fecha y por CCTE/Provincia
+# ============================================================
+def _m003_indices(conn: sqlite3.Connection):
+    conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{schema.FACT_TABLE}_fechahora ON {schema.FACT_TABLE}(FechaHora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_dim_localidad_ccte ON dim_localidad(ccte_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_dim_localidad_provincia ON dim_localidad(provincia_id)")
+
+
+# ============================================================
+# 4) Cubo de agregados para los tableros
+# ============================================================
+def _m004_cubo(conn: sqlite3.Connection):
+    conn.execute(cubo.DDL_CUBO)
+
+
+def _m004_backfill_cubo(conn: sqlite3.Connection, lote: int = 200):
+    """Arma el cubo por lotes de localidades (un commit por lote)."""
+    ids = [r[0] for r in conn.execute("SELECT id FROM dim_localidad ORDER BY id")]
+    for i in range(0, len(ids), lote):
+        with conn:
+            cubo.recalcular(conn, ids[i:i + lote])
+
+
+# ============================================================
+# 5) Índice de hotspots (pico por localidad)
+# ============================================================
+def _m005_hotspots(conn: sqlite3.Connection):
+    for ddl in hotspots.DDL_PICOS:
+        conn.execute(ddl)
+
+
+def _m005_backfill_hotspots(conn: sqlite3.Connection, lote: int = 200):
+    """Arma el índice por lotes de localidades (un commit por lote)."""
+    ids = [r[0] for r in conn.execute("SELECT id FROM dim_localidad ORDER BY id")]
+    for i in range(0, len(ids), lote):
+        with conn:
+            hotspots.recalcular(conn, ids[i:i + lote])
+
+
+# ============================================================
+# 6) Índice espacial (grilla Lat/Lon)
+# ============================================================
+def _m006_geo(conn: sqlite3.Connection):
+    conn.execute(geo.DDL_GEO)
+
+
+def _m006_backfill_geo(conn: sqlite3.Connection, chunksize: int = BACKFILL_CHUNK):
+    """Indexa por rangos de id (un commit por bloque)."""
+    hasta = schema.max_id_hechos(conn)
+    for desde in range(0, hasta, chunksize):
+        with conn:
+            geo.indexar_desde_id(conn, desde, min(desde + chunksize, hasta))
+
+
+# ============================================================
+# 7) Coordenadas canónicas y validez
+# ============================================================
+def _m007_coordenadas(conn: sqlite3.Connection):
+    tipos = {"coord_valida": "INTEGER", "coord_nota": "TEXT", "lat_original": "REAL", "lon_original": "REAL"}
+    for col in schema.COLUMNAS_COORD:
+        if not schema.tiene_columna(conn, schema.FACT_TABLE, col):
+            conn.execute(f"ALTER TABLE {schema.FACT_TABLE} ADD COLUMN {col} {tipos[col]}")
+
+
+def _m007_backfill_coordenadas(conn: sqlite3.Connection, chunksize: int = BACKFILL_CHUNK):
+    """
+    Normaliza Lat/Lon ya guardadas, por rangos de id (un commit por bloque). Las que
+    ya son canónicas se marcan en SQL; el resto pasa por normalizar_coordenadas.
+    Si alguna cambió, se rearma el índice espacial y se sube la data_version (las
+    copias en memoria/disco se recargan).
+    """
+    lat0, lat1 = ARGENTINA_LAT
+    lon0, lon1 = ARGENTINA_LON
+    hasta = schema.max_id_hechos(conn)
+    cambiadas = 0
+    for desde in range(0, hasta, chunksize):
+        rango = (desde, desde + chunksize)
+        with conn:
+            conn.execute(
+                f"""
+                UPDATE {schema.FACT_TABLE} SET coord_valida = 1
+                WHERE id > ? AND id <= ? AND coord_valida IS NULL
+                  AND Lat BETWEEN ? AND ? AND Lon BETWEEN ? AND ?
+                """,
+                (*rango, lat0, lat1, lon0, lon1),
+            )
+            bloque = pd.read_sql(
+                f"SELECT id, Lat, Lon FROM {schema.FACT_TABLE} WHERE id > ? AND id <= ? AND coord_valida IS NULL",
+                conn,
+                params=rango,
+            )
+            if bloque.empty:
+                continue
+            c = normalizar_coordenadas(bloque["Lat"], bloque["Lon"])
+            conn.executemany(
+                f"""
+                UPDATE {schema.FACT_TABLE}
+                SET Lat=?, Lon=?, coord_valida=?, coord_nota=?, lat_original=?, lon_original=?
+                WHERE id=?
+                """,
+                (
+                    [schema._py(v) for v in fila]
+                    for fila in zip(
+                        c["Lat"], c["Lon"], c["CoordValida"], c["CoordNota"],
+                        c["LatOriginal"], c["LonOriginal"], bloque["id"],
+                    )
+                ),
+            )
+            cambiadas += int(c["CoordNota"].ne(NOTA_SIN_DATO).sum())
+
+    if cambiadas:
+        with conn:
+            geo.reconstruir(conn)
+            schema.registrar_cambio(conn, schema.incrementar_version(conn), "reemplazo")
+
+
+# ============================================================
+# 8) Pirámide de teselas del mapa
+# ============================================================
+def _m008_teselas(conn: sqlite3.Connection):
+    conn.execute(teselas.DDL_TESELAS)
+    # Sale de geo_celdas agregada (una pasada): entra en la misma transacción
+    teselas.reconstruir(conn)
+
+
+# ============================================================
+# 9) Percentiles aproximados por (localidad, año)
+# ============================================================
+def _m009_cuantiles(conn: sqlite3.Connection):
+    conn.execute(cuantiles.DDL_CUANTILES)
+
+
+def _m009_backfill_cuantiles(conn: sqlite3.Connection, lote: int = 200):
+    """Arma los bins por lotes de localidades (un commit por lote)."""
+    ids = [r[0] for r in conn.execute("SELECT id FROM dim_localidad ORDER BY id")]
+    for i in range(0, len(ids), lote):
+        with conn:
+            cuantiles.recalcular(conn, ids[i:i + lote])
+
+
+# (versión, nombre, migración en transacción, backfill en bloques o None)
+MIGRACIONES = [
+    (1, "esquema_estrella", _m001_esquema_estrella, None),
+    (2, "fechahora", _m002_fechahora, _m002_backfill_fechahora),
+    (3, "indices", _m003_indices, None),
+    (4, "cubo", _m004_cubo, _m004_backfill_cubo),
+    (5, "hotspots", _m005_hotspots, _m005_backfill_hotspots),
+    (6, "geo", _m006_geo, _m006_backfill_geo),
+    (7, "coordenadas", _m007_coordenadas, _m007_backfill_coordenadas),
+    (8, "teselas", _m008_teselas, None),
+    (9, "cuantiles", _m009_cuantiles, _m009_backfill_cuantiles),
+]
+
+
+# ============================================================
+# Runner
+# ============================================================
+def _versiones_aplicadas(conn: sqlite3.Connection) -> set[int]:
+    return {r[0] for r in conn.execute("SELECT version FROM schema_migraciones")}
+
+
+def version_esquema(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_migraciones").fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def aplicar_migraciones(conn: sqlite3.Connection) -> list[int]:
+    """Aplica las migraciones pendientes en orden. Devuelve las versiones aplicadas ahora."""
+    # WAL: los lectores no se bloquean mientras alguien escribe (queda grabado en el archivo)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migraciones "
+            "(version INTEGER PRIMARY KEY, nombre TEXT NOT NULL, aplicada TEXT NOT NULL)"
+        )
+
+    pendientes = [m for m in MIGRACIONES if m[0] not in _versiones_aplicadas(conn)]
+    aplicadas = []
+    vacuum = False
+    for version, nombre, migrar, backfill in pendientes:
+        # IMMEDIATE: si dos procesos arrancan a la vez, uno espera al otro
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version in _versiones_aplicadas(conn):
+                conn.rollback()
+                continue
+            legacy = version == 1 and schema._object_type(conn, schema.VIEW_NAME) == "table"
+            migrar(conn)
+            if backfill is None:
+                _registrar(conn, version, nombre)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if backfill is not None:
+            backfill(conn)
+            with conn:
+                _registrar(conn, version, nombre)
+
+        vacuum = vacuum or legacy
+        aplicadas.append(version)
+
+    if vacuum:
+        # Recupera el espacio de la tabla ancha (fuera de la transacción)
+        conn.execute("VACUUM")
+    return aplicadas
+
+
+def _registrar(conn: sqlite3.Connection, version: int, nombre: str):
+    conn.execute(
+        "INSERT OR IGNORE INTO schema_migraciones(version, nombre, aplicada) VALUES (?, ?, ?)",
+        (version, nombre, datetime.now().isoformat(timespec="seconds")),
+    )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Aplica las migraciones pendientes a una DB de mediciones RNI.")
+    ap.add_argument("db", nargs="?", default=None, help="Ruta a la DB (default: config.DB_FILE)")
+    args = ap.parse_args(argv)
+
+    from config import DB_FILE
+
+    conn = sqlite3.connect(args.db or str(DB_FILE), timeout=30)
+    try:
+        antes = version_esquema(conn) if schema._object_type(conn, "schema_migraciones") else 0
+        aplicadas = aplicar_migraciones(conn)
+        print(f"Esquema: v{antes} -> v{version_esquema(conn)} (aplicadas: {aplicadas or 'ninguna'})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Particiones por (CCTE, año) en Parquet, al lado de la DB.
+
+    rni.particiones/ccte=<CCTE>/anio=<año>/parte-<versión>.parquet
+    rni.particiones/manifiesto.json   (data_version + una entrada por partición)
+
+SQLite sigue siendo donde se escribe; las particiones son la copia de lectura
+con las mismas columnas y textos que la vista `mediciones_rni`. El año sale de
+Fecha con el mismo criterio que sql_where_from_filters ("dd/mm/yyyy" o
+"yyyy-mm-dd"; 0 si no se reconoce), así que leer las particiones que pasan
+los filtros globales da las mismas filas que el WHERE en SQL.
+
+Se actualizan en segundo plano cuando cambia la data_version, usando el log
+de `cambios`: un append solo reescribe las particiones que recibieron filas
+(en la práctica, la del año en curso); un borrado o una edición, las que
+tenían esa localidad/expediente. Los años cerrados quedan congelados:
+compactados una vez (ordenados por localidad y FechaHora, zstd, un solo
+row group) y no se vuelven a escribir salvo que cambie su contenido.
+
+La poda sirve solo a las lecturas por bloques (store.iter_mediciones_chunks:
+exportaciones y agregados por bloques de processing.streaming). Las páginas no
+leen de acá: usan la tabla maestra compartida (db.dataset), que carga toda la
+historia una vez por proceso para todas las sesiones, y la filtran en memoria
+(state.get_df_filtrado_global, db.columnas).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+from db import schema
+import db.sqlite_store as store
+from config import PARTICIONES_PARQUET
+
+MANIFIESTO = "manifiesto.json"
+CHUNK_SQL = 100_000
+
+# Año de la partición sobre la vista: el mismo que el del cubo y los hotspots
+ANIO_SQL = schema.anio_fecha_sql("Fecha")
+
+_LOCK = threading.Lock()
+_EN_CURSO: set[str] = set()
+_DE_NUEVO: set[str] = set()
+
+
+def ruta_particiones() -> Path:
+    db = Path(store.DB_FILE)
+    return db.with_name(f"{db.stem}.particiones")
+
+
+def _clave(ccte, anio) -> str:
+    return f"{'' if ccte is None else ccte}|{int(anio)}"
+
+
+def _dir_particion(ccte, anio) -> Path:
+    nombre = "__nulo__" if ccte is None else quote(str(ccte), safe="")
+    return ruta_particiones() / f"ccte={nombre}" / f"anio={int(anio)}"
+
+
+def _congelada(anio: int) -> bool:
+    """Años cerrados (el año 0 = fecha no reconocida queda siempre activo)."""
+    return 0 < int(anio) < datetime.now().year
+
+
+def leer_manifiesto() -> dict | None:
+    ruta = ruta_particiones() / MANIFIESTO
+    if not ruta.exists():
+        return None
+    try:
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_manifiesto(man: dict):
+    ruta = ruta_particiones() / MANIFIESTO
+    tmp = ruta.with_name(f"{MANIFIESTO}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(man), encoding="utf-8")
+    os.replace(tmp, ruta)
+
+
+# ============================================================
+# Escritura de una partición
+# ============================================================
+def _esquema():
+    import pyarrow as pa
+
+    texto = pa.string()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("CCTE", texto), ("Provincia", texto), ("Localidad", texto),
+        ("Resultado", pa.float64()),
+        ("Fecha", texto), ("Hora", texto), ("FechaHora", texto),
+        ("Nombre Archivo", texto), ("Expediente", texto), ("Sonda", texto),
+        ("Lat", pa.float64()), ("Lon", pa.float64()),
+        ("FechaCarga", texto),
+    ])
+
+
+def _a_arrow(df: pd.DataFrame):
+    import pyarrow as pa
+
+    esquema = _esquema()
+    df = df.reindex(columns=esquema.names)
+    for col in ("Resultado", "Lat", "Lon"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in esquema.names:
+        if esquema.field(col).type == pa.string():
+            df[col] = df[col].astype("string")
+    return pa.Table.from_pandas(df, schema=esquema, preserve_index=False)
+
+
+def _escribir_particion(tabla, ccte, anio, version: int) -> dict:
+    """Escribe la partición (archivo temporal + replace) y devuelve su entrada de manifiesto."""
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    congelada = _congelada(anio)
+    if congelada:
+        # Compactada: ordenada para que los filtros por localidad/fecha lean poco
+        tabla = tabla.sort_by([("Localidad", "ascending"), ("FechaHora", "ascending"), ("id", "ascending")])
+
+    destino = _dir_particion(ccte, anio)
+    destino.mkdir(parents=True, exist_ok=True)
+    ruta = destino / f"parte-{int(version)}.parquet"
+    tmp = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    pq.write_table(
+        tabla, tmp,
+        compression="zstd" if congelada else "snappy",
+        row_group_size=max(len(tabla), 1) if congelada else 65_536,
+    )
+    os.replace(tmp, ruta)
+
+    return {
+        "ccte": ccte,
+        "anio": int(anio),
+        "archivo": str(ruta.relative_to(ruta_particiones())),
+        "filas": int(len(tabla)),
+        "bytes": ruta.stat().st_size,
+        "congelada": congelada,
+        "version": int(version),
+        "localidades": sorted(pc.unique(tabla["Localidad"]).drop_null().to_pylist()),
+        "expedientes": sorted(pc.unique(tabla["Expediente"]).drop_null().to_pylist()),
+    }
+
+
+# ============================================================
+# Armado completo e incremental
+# ============================================================
+def _reconstruir(conn, version: int) -> dict:
+    """Una pasada por la vista, repartiendo las filas en archivos por partición."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp_dir = ruta_particiones() / f"armado.{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    writers: dict[str, tuple] = {}
+    try:
+        sql = f"SELECT *, {ANIO_SQL} AS _anio FROM {schema.VIEW_NAME}"
+        for chunk in pd.read_sql(sql, conn, chunksize=CHUNK_SQL):
+            for (ccte, anio), parte in chunk.groupby(["CCTE", "_anio"], dropna=False, sort=False):
+                ccte = None if pd.isna(ccte) else ccte
+                clave = _clave(ccte, anio)
+                if clave not in writers:
+                    ruta = tmp_dir / f"{len(writers)}.parquet"
+                    writers[clave] = (ccte, int(anio), ruta, pq.ParquetWriter(ruta, _esquema()))
+                writers[clave][3].write_table(_a_arrow(parte))
+
+        particiones = {}
+        for clave, (ccte, anio, ruta, writer) in writers.items():
+            writer.close()
+            particiones[clave] = _escribir_particion(pq.read_table(ruta), ccte, anio, version)
+        return particiones
+    finally:
+        for _, _, ruta, writer in writers.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+            ruta.unlink(missing_ok=True)
+        try:
+            tmp_dir.rmdir()
+        except OSError:
+            pass
+
+
+def _sucias(conn, man: dict, cambios: list) -> set[tuple] | None:
+    """Particiones (ccte, anio) tocadas por los cambios del log; None = rearmar todo."""
+    sucias: set[tuple] = set()
+    entradas = man["particiones"].values()
+
+    def _en_db(where: str, params: tuple):
+        sql = f"SELECT DISTINCT CCTE, {ANIO_SQL} FROM {schema.VIEW_NAME} WHERE {where}"
+        sucias.update((c, int(a)) for c, a in conn.execute(sql, params))
+
+    for _, tipo, detalle in cambios:
+        if tipo == "append":
+            _en_db("id > ? AND id <= ?", (int(detalle.get("id_desde") or 0), int(detalle["id_hasta"])))
+        elif tipo == "delete":
+            campo = {"Localidad": "localidades", "Expediente": "expedientes"}.get(detalle.get("columna"))
+            if campo is None:
+                return None
+            sucias.update((e["ccte"], e["anio"]) for e in entradas if detalle.get("valor") in e[campo])
+        elif tipo == "update_localidad":
+            viejos = {detalle.get("localidad"), detalle.get("nombre")}
+            sucias.update((e["ccte"], e["anio"]) for e in entradas if viejos & set(e["localidades"]))
+            _en_db("Localidad = ?", (detalle.get("nombre"),))
+        else:
+            return None
+    return sucias
+
+
+def actualizar_particiones() -> dict | None:
+    """Lleva las particiones a la data_version actual. Devuelve el manifiesto."""
+    if not PARTICIONES_PARQUET or not store.DB_FILE.exists():
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+
+    man = leer_manifiesto()
+    conn = store.conectar_lectura()
+    try:
+        # Todo desde la misma transacción de lectura (versión y filas consistentes)
+        conn.execute("BEGIN")
+        version = schema.leer_version(conn)
+        if man is not None and man.get("data_version") == version:
+            return man
+
+        sucias = None
+        if man is not None:
+            cambios = schema.leer_cambios(conn, int(man["data_version"]))
+            if cambios is not None:
+                sucias = _sucias(conn, man, cambios)
+
+        ruta_particiones().mkdir(parents=True, exist_ok=True)
+        if sucias is None:
+            particiones = _reconstruir(conn, version)
+        else:
+            particiones = dict(man["particiones"])
+            for ccte, anio in sucias:
+                df = pd.read_sql(
+                    f"SELECT * FROM {schema.VIEW_NAME} WHERE CCTE IS ? AND {ANIO_SQL} = ?",
+                    conn, params=(ccte, anio),
+                )
+                if df.empty:
+                    particiones.pop(_clave(ccte, anio), None)
+                else:
+                    particiones[_clave(ccte, anio)] = _escribir_particion(_a_arrow(df), ccte, anio, version)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    # Se cerró un año: las particiones que quedaron atrás se compactan una vez
+    import pyarrow.parquet as pq
+
+    for clave, e in list(particiones.items()):
+        if not e["congelada"] and _congelada(e["anio"]):
+            tabla = pq.read_table(ruta_particiones() / e["archivo"])
+            particiones[clave] = _escribir_particion(tabla, e["ccte"], e["anio"], version)
+
+    man = {"data_version": version, "particiones": particiones}
+    _escribir_manifiesto(man)
+    _limpiar(man)
+    return man
+
+
+def _limpiar(man: dict):
+    """Borra archivos que ya no están en el manifiesto (si se puede)."""
+    vigentes = {e["archivo"] for e in man["particiones"].values()}
+    raiz = ruta_particiones()
+    for ruta in raiz.glob("ccte=*/anio=*/*.parquet"):
+        if str(ruta.relative_to(raiz)) not in vigentes:
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+    for d in sorted(raiz.glob("ccte=*/anio=*"), reverse=True) + sorted(raiz.glob("ccte=*")):
+        try:
+            d.rmdir()
+        except OSError:
+            pass
+
+
+def programar_particiones():
+    """Actualiza las particiones en un hilo aparte (una corrida a la vez por DB)."""
+    if not PARTICIONES_PARQUET:
+        return
+
+    clave = str(Path(store.DB_FILE).resolve())
+    with _LOCK:
+        if clave in _EN_CURSO:
+            _DE_NUEVO.add(clave)
+            return
+        _EN_CURSO.add(clave)
+
+    def _trabajo():
+        while True:
+            try:
+                actualizar_particiones()
+            except Exception:
+                # Es solo una aceleración: sin particiones al día se lee de SQLite
+                pass
+            with _LOCK:
+                if clave in _DE_NUEVO:
+                    _DE_NUEVO.discard(clave)
+                    continue
+                _EN_CURSO.discard(clave)
+                return
+
+    threading.Thread(target=_trabajo, name="rni-particiones", daemon=True).start()
+
+
+# ============================================================
+# Lectura con poda por filtros globales
+# ============================================================
+def podar(man: dict, gf: dict | None) -> list[dict]:
+    """Entradas del manifiesto que pueden tener filas para los filtros globales."""
+    gf = gf or {}
+    cctes = {str(x) for x in (gf.get("ccte") or [])}
+    anio = gf.get("anio", "Todos")
+    out = []
+    for e in man["particiones"].values():
+        if cctes and (e["ccte"] is None or str(e["ccte"]) not in cctes):
+            continue
+        if anio and anio != "Todos" and e["anio"] != int(anio):
+            continue
+        out.append(e)
+    return sorted(out, key=lambda e: (str(e["ccte"]), e["anio"]))
+
+
+def particiones_vigentes(gf: dict | None):
+    """
+    Archivos Parquet (ya abiertos) de las particiones que pasan los filtros, si
+    el manifiesto está en la data_version actual; None = leer de SQLite.
+    """
+    if not PARTICIONES_PARQUET:
+        return None
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+
+    man = leer_manifiesto()
+    if man is None or man.get("data_version") != store.leer_data_version():
+        return None
+    try:
+        # Abiertos de entrada: si una actualización borra el archivo, la lectura sigue
+        return [pq.ParquetFile(ruta_particiones() / e["archivo"]) for e in podar(man, gf)]
+    except OSError:
+        return None
+
+
+def iter_particiones(archivos: list, gf: dict | None, chunksize: int = 50_000):
+    """Filas de las particiones en bloques; Provincia (que no particiona) se filtra acá."""
+    provs = [str(x) for x in ((gf or {}).get("provincia") or [])]
+    for pf in archivos:
+        for batch in pf.iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            if provs:
+                chunk = chunk[chunk["Provincia"].isin(provs)]
+            if not chunk.empty:
+                yield chunk.reset_index(drop=True)
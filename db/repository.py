@@ -0,0 +1,173 @@
+"""
+Operaciones de escritura puntuales sobre el esquema estrella.
+
+Cada función corre en una única transacción con DELETE/UPDATE parametrizados
+(usando los índices por localidad/archivo/expediente) y devuelve la cantidad
+de mediciones afectadas. Nada de reescribir la tabla completa.
+
+Las escrituras pasan por el escritor único (db.escritor). Con `version_esperada`
+(la data_version que vio la sesión) se rechazan si otro escribió en el medio.
+"""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+
+from db import cubo, cuantiles, geo, hotspots, schema, teselas
+from db.escritor import anotar_cambio, escribir
+import db.sqlite_store as store
+
+HECHOS = schema.FACT_TABLE
+
+
+def _contar_mediciones(conn: sqlite3.Connection, where_archivo: str, params: tuple) -> int:
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM {HECHOS} WHERE archivo_id IN (SELECT id FROM dim_archivo WHERE {where_archivo})",
+        params,
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _borrar_archivos(conn: sqlite3.Connection, where_archivo: str, params: tuple) -> int:
+    """Borra mediciones + archivos que cumplen `where_archivo`. Devuelve mediciones borradas."""
+    locs = cubo.localidades_de_archivos(conn, where_archivo, params)
+    celdas = geo.borrar_archivos(conn, where_archivo, params)
+    cur = conn.execute(
+        f"DELETE FROM {HECHOS} WHERE archivo_id IN (SELECT id FROM dim_archivo WHERE {where_archivo})",
+        params,
+    )
+    conn.execute(f"DELETE FROM dim_archivo WHERE {where_archivo}", params)
+    cubo.recalcular(conn, locs)
+    cuantiles.recalcular(conn, locs)
+    hotspots.recalcular(conn, locs)
+    teselas.actualizar_celdas(conn, celdas)
+    return cur.rowcount
+
+
+def _limpiar_dimensiones(conn: sqlite3.Connection):
+    """Quita localidades sin archivos y expedientes sin uso."""
+    conn.execute("DELETE FROM dim_localidad WHERE id NOT IN (SELECT DISTINCT localidad_id FROM dim_archivo)")
+    conn.execute("DELETE FROM dim_expediente WHERE id NOT IN (SELECT DISTINCT expediente_id FROM dim_archivo)")
+
+
+# ============================================================
+# API
+# ============================================================
+def delete_localidad(nombre: str, version_esperada: int | None = None) -> int:
+    """Elimina todas las mediciones de la localidad `nombre`. Devuelve filas borradas."""
+    if not store.DB_FILE.exists():
+        return 0
+
+    def _op(conn):
+        borradas = _borrar_archivos(
+            conn, "localidad_id IN (SELECT id FROM dim_localidad WHERE nombre=?)", (str(nombre),)
+        )
+        _limpiar_dimensiones(conn)
+        anotar_cambio("delete", columna="Localidad", valor=str(nombre))
+        return borradas
+
+    return escribir(_op, version_esperada)
+
+
+def delete_by_expediente(expediente: str, version_esperada: int | None = None) -> int:
+    """Elimina todas las mediciones cargadas bajo un expediente. Devuelve filas borradas."""
+    if not store.DB_FILE.exists():
+        return 0
+
+    def _op(conn):
+        borradas = _borrar_archivos(
+            conn, "expediente_id IN (SELECT id FROM dim_expediente WHERE numero=?)", (str(expediente).strip(),)
+        )
+        _limpiar_dimensiones(conn)
+        anotar_cambio("delete", columna="Expediente", valor=str(expediente).strip())
+        return borradas
+
+    return escribir(_op, version_esperada)
+
+
+def update_localidad_metadata(
+    localidad_actual: str,
+    nuevo_ccte: str,
+    nueva_provincia: str,
+    nueva_localidad: str,
+    nuevo_expediente: str,
+    version_esperada: int | None = None,
+) -> int:
+    """
+    Cambia CCTE/Provincia/nombre/Expediente de una localidad sin tocar la tabla de hechos:
+    un UPDATE sobre dim_localidad (y el expediente de sus archivos).
+    Si el destino ya existe como otra localidad, las fusiona.
+    Devuelve la cantidad de mediciones afectadas.
+    """
+    if not store.DB_FILE.exists():
+        return 0
+
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _op(conn):
+        loc_ids = [r[0] for r in conn.execute("SELECT id FROM dim_localidad WHERE nombre=?", (localidad_actual,))]
+        if not loc_ids:
+            return 0
+
+        afectadas = _contar_mediciones(
+            conn, f"localidad_id IN ({','.join('?' * len(loc_ids))})", tuple(loc_ids)
+        )
+
+        ccte_id = schema.id_dim(conn, "dim_ccte", "nombre", nuevo_ccte)
+        prov_id = schema.id_dim(conn, "dim_provincia", "nombre", nueva_provincia)
+        exp_id = schema.id_dim(conn, "dim_expediente", "numero", nuevo_expediente)
+        nombre = str(nueva_localidad).strip()
+
+        for loc_id in loc_ids:
+            destino = conn.execute(
+                "SELECT id FROM dim_localidad WHERE nombre=? AND ccte_id=? AND provincia_id=? AND id<>?",
+                (nombre, ccte_id, prov_id, loc_id),
+            ).fetchone()
+
+            if destino is None:
+                conn.execute(
+                    "UPDATE dim_localidad SET nombre=?, ccte_id=?, provincia_id=?, fecha_modificacion=? WHERE id=?",
+                    (nombre, ccte_id, prov_id, ahora, loc_id),
+                )
+                destino_id = loc_id
+            else:
+                destino_id = destino[0]
+                _fusionar_localidades(conn, loc_id, destino_id)
+                conn.execute("UPDATE dim_localidad SET fecha_modificacion=? WHERE id=?", (ahora, destino_id))
+
+            conn.execute("UPDATE dim_archivo SET expediente_id=? WHERE localidad_id=?", (exp_id, destino_id))
+
+        _limpiar_dimensiones(conn)
+        anotar_cambio(
+            "update_localidad",
+            localidad=localidad_actual,
+            ccte=str(nuevo_ccte).strip(),
+            provincia=str(nueva_provincia).strip(),
+            nombre=nombre,
+            expediente=str(nuevo_expediente).strip(),
+            fecha=ahora,
+        )
+        return afectadas
+
+    return escribir(_op, version_esperada)
+
+
+def _fusionar_localidades(conn: sqlite3.Connection, origen_id: int, destino_id: int):
+    """Mueve los archivos de una localidad a otra (si el archivo ya existe en destino, junta sus mediciones)."""
+    repetidos = conn.execute(
+        """
+        SELECT o.id, d.id FROM dim_archivo o
+        JOIN dim_archivo d ON d.nombre = o.nombre AND d.localidad_id = ?
+        WHERE o.localidad_id = ?
+        """,
+        (destino_id, origen_id),
+    ).fetchall()
+    for arch_origen, arch_destino in repetidos:
+        conn.execute(f"UPDATE {HECHOS} SET archivo_id=? WHERE archivo_id=?", (arch_destino, arch_origen))
+        conn.execute("DELETE FROM dim_archivo WHERE id=?", (arch_origen,))
+
+    conn.execute("UPDATE dim_archivo SET localidad_id=? WHERE localidad_id=?", (destino_id, origen_id))
+    conn.execute("DELETE FROM dim_localidad WHERE id=?", (origen_id,))
+    cubo.recalcular(conn, [origen_id, destino_id])
+    cuantiles.recalcular(conn, [origen_id, destino_id])
+    hotspots.recalcular(conn, [origen_id, destino_id])
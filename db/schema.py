@@ -0,0 +1,363 @@
+"""
+Esquema estrella de mediciones RNI.
+
+  dim_ccte / dim_provincia / dim_expediente / dim_sonda : textos repetidos -> id entero
+  dim_localidad  : nombre + CCTE + Provincia (+ fecha de última modificación)
+  dim_archivo    : Nombre Archivo por localidad, con su Expediente y FechaCarga
+  mediciones     : tabla de hechos angosta (archivo_id, sonda_id, Resultado, Fecha, Hora, Lat, Lon)
+
+Lat/Lon de la tabla de hechos son canónicas (utils.geo_utils.normalizar_coordenadas):
+sur/oeste con signo, nulas si la coordenada no es válida; `coord_valida`/`coord_nota`
+dicen qué se hizo y `lat_original`/`lon_original` guardan lo leído cuando se tocó.
+
+`mediciones_rni` queda como VISTA con las columnas "de siempre", así las consultas
+SQL existentes (diagnóstico, exportación) siguen funcionando sin cambios.
+
+La creación y los cambios de esquema se aplican con db/migrations.py.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from config import TABLE_NAME
+from utils.geo_utils import normalizar_coordenadas
+from utils.time_utils import fechahora_desde_texto
+
+VIEW_NAME = TABLE_NAME
+FACT_TABLE = "mediciones"
+
+# Columnas de la migración 7: validez de la coordenada y lo leído si se corrigió o descartó
+COLUMNAS_COORD = ["coord_valida", "coord_nota", "lat_original", "lon_original"]
+
+# Entradas del log de cambios que se conservan (una sesión más atrasada recarga todo)
+CAMBIOS_MAX = 1000
+
+DDL = [
+    # Contador de versión de datos: +1 en cada escritura (concurrencia optimista)
+    "CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO meta(clave, valor) VALUES ('data_version', 0)",
+    # Qué cambió en cada versión (para refrescar la tabla en memoria sin recargar todo)
+    "CREATE TABLE IF NOT EXISTS cambios (version INTEGER PRIMARY KEY, tipo TEXT NOT NULL, detalle TEXT, fecha TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS dim_ccte (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS dim_provincia (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS dim_expediente (id INTEGER PRIMARY KEY, numero TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS dim_sonda (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)",
+    """
+    CREATE TABLE IF NOT EXISTS dim_localidad (
+        id INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        ccte_id INTEGER NOT NULL REFERENCES dim_ccte(id),
+        provincia_id INTEGER NOT NULL REFERENCES dim_provincia(id),
+        fecha_modificacion TEXT,
+        UNIQUE (nombre, ccte_id, provincia_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dim_archivo (
+        id INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        localidad_id INTEGER NOT NULL REFERENCES dim_localidad(id),
+        expediente_id INTEGER NOT NULL REFERENCES dim_expediente(id),
+        fecha_carga TEXT,
+        UNIQUE (nombre, localidad_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {FACT_TABLE} (
+        id INTEGER PRIMARY KEY,
+        archivo_id INTEGER NOT NULL REFERENCES dim_archivo(id),
+        sonda_id INTEGER REFERENCES dim_sonda(id),
+        Resultado REAL,
+        Fecha TEXT,
+        Hora TEXT,
+        Lat REAL,
+        Lon REAL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{FACT_TABLE}_archivo ON {FACT_TABLE}(archivo_id)",
+    "CREATE INDEX IF NOT EXISTS ix_dim_archivo_localidad ON dim_archivo(localidad_id)",
+    "CREATE INDEX IF NOT EXISTS ix_dim_archivo_expediente ON dim_archivo(expediente_id)",
+    "CREATE INDEX IF NOT EXISTS ix_dim_localidad_nombre ON dim_localidad(nombre)",
+]
+
+def anio_fecha_sql(fecha: str = "m.Fecha") -> str:
+    """
+    Año de una columna Fecha texto ("yyyy-mm-dd" o "dd/mm/yyyy"; 0 si no se reconoce):
+    mismo criterio que el filtro de año en SQL. Lo usan los índices derivados y las particiones.
+    """
+    return f"""
+    CASE WHEN {fecha} LIKE '____-%' THEN CAST(substr({fecha}, 1, 4) AS INTEGER)
+         WHEN {fecha} LIKE '%/____' THEN CAST(substr({fecha}, -4) AS INTEGER)
+         ELSE 0 END
+"""
+
+
+# Sobre la tabla de hechos con alias `m`
+ANIO_FECHA_SQL = anio_fecha_sql()
+
+# Ids por sentencia en los `IN (...)` (SQLite limita los parámetros por consulta)
+LOTE_IDS = 500
+
+# FechaCarga: la más nueva entre la carga del archivo y la última edición de la localidad
+FECHA_CARGA_SQL = (
+    "CASE WHEN l.fecha_modificacion > COALESCE(a.fecha_carga, '') "
+    "THEN l.fecha_modificacion ELSE a.fecha_carga END"
+)
+
+VIEW_DDL = f"""
+CREATE VIEW {VIEW_NAME} AS
+SELECT
+    m.id AS id,
+    NULLIF(c.nombre, '') AS CCTE,
+    NULLIF(p.nombre, '') AS Provincia,
+    NULLIF(l.nombre, '') AS Localidad,
+    m.Resultado AS Resultado,
+    m.Fecha AS Fecha,
+    m.Hora AS Hora,
+    m.FechaHora AS FechaHora,
+    NULLIF(a.nombre, '') AS "Nombre Archivo",
+    NULLIF(e.numero, '') AS Expediente,
+    NULLIF(s.nombre, '') AS Sonda,
+    m.Lat AS Lat,
+    m.Lon AS Lon,
+    {FECHA_CARGA_SQL} AS FechaCarga
+FROM {FACT_TABLE} m
+JOIN dim_archivo a ON a.id = m.archivo_id
+JOIN dim_localidad l ON l.id = a.localidad_id
+JOIN dim_ccte c ON c.id = l.ccte_id
+JOIN dim_provincia p ON p.id = l.provincia_id
+JOIN dim_expediente e ON e.id = a.expediente_id
+LEFT JOIN dim_sonda s ON s.id = m.sonda_id
+"""
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> str | None:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name=?;", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def leer_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT valor FROM meta WHERE clave='data_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def incrementar_version(conn: sqlite3.Connection) -> int:
+    conn.execute("UPDATE meta SET valor = valor + 1 WHERE clave='data_version'")
+    return leer_version(conn)
+
+
+def registrar_cambio(conn: sqlite3.Connection, version: int, tipo: str, detalle: dict | None = None):
+    conn.execute(
+        "INSERT OR REPLACE INTO cambios(version, tipo, detalle, fecha) VALUES (?, ?, ?, ?)",
+        (version, tipo, json.dumps(detalle or {}, ensure_ascii=False), datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.execute("DELETE FROM cambios WHERE version <= ?", (version - CAMBIOS_MAX,))
+
+
+def leer_cambios(conn: sqlite3.Connection, desde_version: int) -> list[tuple[int, str, dict]] | None:
+    """
+    Cambios posteriores a `desde_version`, en orden. None si el log ya no llega
+    tan atrás (hay que recargar todo).
+    """
+    filas = conn.execute(
+        "SELECT version, tipo, detalle FROM cambios WHERE version > ? ORDER BY version", (desde_version,)
+    ).fetchall()
+    actual = leer_version(conn)
+    if len(filas) != actual - desde_version:
+        return None
+    return [(v, t, json.loads(d or "{}")) for v, t, d in filas]
+
+
+def max_id_hechos(conn: sqlite3.Connection) -> int:
+    row = conn.execute(f"SELECT MAX(id) FROM {FACT_TABLE}").fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def filas_por_id(conn: sqlite3.Connection, ids, columnas: str, lote: int = LOTE_IDS) -> pd.DataFrame:
+    """
+    Filas de la vista para esos ids de medición (`columnas` es el SELECT; el id
+    sale como medicion_id). Busca por clave primaria, en lotes de `lote` ids.
+    """
+    ids = [int(i) for i in ids]
+    partes = [
+        pd.read_sql(
+            f"SELECT id AS medicion_id, {columnas} FROM {VIEW_NAME} WHERE id IN ({','.join('?' * len(ids[i:i + lote]))})",
+            conn,
+            params=tuple(ids[i:i + lote]),
+        )
+        for i in range(0, len(ids), lote)
+    ]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=["medicion_id"])
+
+
+def con_conexion(fn, *args, conn: sqlite3.Connection | None = None, **kwargs) -> pd.DataFrame:
+    """fn(conn, ...) con `conn` o con una conexión de lectura propia; DataFrame vacío si no hay DB."""
+    if conn is not None:
+        return fn(conn, *args, **kwargs)
+
+    import db.sqlite_store as store
+
+    if not store.DB_FILE.exists():
+        return pd.DataFrame()
+    conn = store.conectar_lectura()
+    try:
+        return fn(conn, *args, **kwargs)
+    finally:
+        conn.close()
+
+
+def _texto_dim(s: pd.Series) -> pd.Series:
+    """Texto para dimensiones: NaN/None -> '' (la vista lo devuelve como NULL)."""
+    return s.astype(object).where(s.notna(), "").astype(str).str.strip()
+
+
+# ============================================================
+# Dimensiones (get-or-create)
+# ============================================================
+def ids_dim(conn: sqlite3.Connection, table: str, col: str, valores) -> dict:
+    """Inserta los valores que falten en una dimensión simple y devuelve {valor: id}."""
+    valores = sorted(set(valores))
+    conn.executemany(f"INSERT OR IGNORE INTO {table}({col}) VALUES (?)", [(v,) for v in valores])
+    return dict(conn.execute(f"SELECT {col}, id FROM {table}").fetchall())
+
+
+def id_dim(conn: sqlite3.Connection, table: str, col: str, valor) -> int:
+    valor = "" if valor is None or (not isinstance(valor, str) and pd.isna(valor)) else str(valor).strip()
+    conn.execute(f"INSERT OR IGNORE INTO {table}({col}) VALUES (?)", (valor,))
+    return conn.execute(f"SELECT id FROM {table} WHERE {col}=?", (valor,)).fetchone()[0]
+
+
+def insertar_mediciones(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
+    """
+    Inserta filas (formato tabla maestra, ya sanitizadas a texto/float) en el esquema estrella.
+    Crea las dimensiones que falten. No hace commit. Devuelve la cantidad de filas insertadas.
+    """
+    if df is None or df.empty:
+        return 0
+
+    d = pd.DataFrame(index=df.index)
+    for col in ["CCTE", "Provincia", "Localidad", "Expediente", "Nombre Archivo", "Sonda"]:
+        d[col] = _texto_dim(df[col]) if col in df.columns else ""
+
+    ccte_ids = ids_dim(conn, "dim_ccte", "nombre", d["CCTE"].unique())
+    prov_ids = ids_dim(conn, "dim_provincia", "nombre", d["Provincia"].unique())
+    exp_ids = ids_dim(conn, "dim_expediente", "numero", d["Expediente"].unique())
+    sonda_ids = ids_dim(conn, "dim_sonda", "nombre", d["Sonda"].unique())
+
+    d["ccte_id"] = d["CCTE"].map(ccte_ids)
+    d["provincia_id"] = d["Provincia"].map(prov_ids)
+    d["expediente_id"] = d["Expediente"].map(exp_ids)
+    d["sonda_id"] = d["Sonda"].map(sonda_ids)
+
+    # --- Localidades ---
+    locs = d[["Localidad", "ccte_id", "provincia_id"]].drop_duplicates()
+    conn.executemany(
+        "INSERT OR IGNORE INTO dim_localidad(nombre, ccte_id, provincia_id) VALUES (?, ?, ?)",
+        [(n, int(c), int(p)) for n, c, p in locs.itertuples(index=False, name=None)],
+    )
+    loc_map = pd.read_sql(
+        "SELECT id AS localidad_id, nombre AS Localidad, ccte_id, provincia_id FROM dim_localidad", conn
+    )
+    d = d.merge(loc_map, on=["Localidad", "ccte_id", "provincia_id"], how="left", sort=False)
+
+    # --- Archivos (expediente y fecha de carga por archivo) ---
+    if "FechaCarga" in df.columns:
+        d["FechaCarga"] = df["FechaCarga"].astype(object).where(df["FechaCarga"].notna(), None).to_numpy()
+    else:
+        d["FechaCarga"] = None
+
+    archs = (
+        d.groupby(["Nombre Archivo", "localidad_id"], sort=False)
+        .agg(expediente_id=("expediente_id", "first"), FechaCarga=("FechaCarga", "max"))
+        .reset_index()
+    )
+    conn.executemany(
+        """
+        INSERT INTO dim_archivo(nombre, localidad_id, expediente_id, fecha_carga) VALUES (?, ?, ?, ?)
+        ON CONFLICT(nombre, localidad_id) DO UPDATE SET
+            expediente_id = excluded.expediente_id,
+            fecha_carga = COALESCE(excluded.fecha_carga, dim_archivo.fecha_carga)
+        """,
+        [
+            (n, int(l), int(e), None if fc is None or pd.isna(fc) else str(fc))
+            for n, l, e, fc in archs.itertuples(index=False, name=None)
+        ],
+    )
+    arch_map = pd.read_sql(
+        "SELECT id AS archivo_id, nombre AS \"Nombre Archivo\", localidad_id FROM dim_archivo", conn
+    )
+    d = d.merge(arch_map, on=["Nombre Archivo", "localidad_id"], how="left", sort=False)
+
+    # --- Hechos ---
+    def _col(c):
+        return df[c].to_numpy() if c in df.columns else [None] * len(df)
+
+    columnas = ["archivo_id", "sonda_id", "Resultado", "Fecha", "Hora", "Lat", "Lon"]
+    valores = [
+        d["archivo_id"].astype(int).tolist(),
+        d["sonda_id"].astype(int).tolist(),
+        _col("Resultado"), _col("Fecha"), _col("Hora"), _col("Lat"), _col("Lon"),
+    ]
+    # FechaHora tipada (texto ISO ordenable) desde la migración 2 en adelante
+    if tiene_columna(conn, FACT_TABLE, "FechaHora"):
+        columnas.append("FechaHora")
+        valores.append(texto_fechahora(pd.Series(_col("Fecha")), pd.Series(_col("Hora"))))
+    # Coordenada canónica + validez desde la migración 7 en adelante
+    if tiene_columna(conn, FACT_TABLE, "coord_valida"):
+        coords = coordenadas_canonicas(df)
+        valores[columnas.index("Lat")] = coords["Lat"].to_numpy()
+        valores[columnas.index("Lon")] = coords["Lon"].to_numpy()
+        columnas += COLUMNAS_COORD
+        valores += [coords[c].to_numpy() for c in ["CoordValida", "CoordNota", "LatOriginal", "LonOriginal"]]
+
+    conn.executemany(
+        f"INSERT INTO {FACT_TABLE}({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+        ([_py(v) for v in fila] for fila in zip(*valores)),
+    )
+    return len(df)
+
+
+def tiene_columna(conn: sqlite3.Connection, tabla: str, columna: str) -> bool:
+    return any(r[1] == columna for r in conn.execute(f"PRAGMA table_info({tabla})"))
+
+
+def coordenadas_canonicas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lat, Lon, CoordValida, CoordNota, LatOriginal, LonOriginal de las filas. Si ya
+    vienen normalizadas (procesar_archivos) se usan tal cual; si no, se normalizan acá.
+    """
+    if {"Lat", "Lon", "CoordValida"}.issubset(df.columns):
+        out = df[[c for c in ["Lat", "Lon", "CoordValida", "CoordNota", "LatOriginal", "LonOriginal"] if c in df.columns]]
+        return out.reindex(columns=["Lat", "Lon", "CoordValida", "CoordNota", "LatOriginal", "LonOriginal"])
+    vacia = pd.Series(index=df.index, dtype="float64")
+    return normalizar_coordenadas(df.get("Lat", vacia), df.get("Lon", vacia)).set_axis(df.index)
+
+
+def texto_fechahora(fecha: pd.Series, hora: pd.Series) -> list:
+    """Fecha/Hora texto -> 'YYYY-MM-DD HH:MM:SS' (None si no se puede interpretar)."""
+    fh = fechahora_desde_texto(fecha, hora)
+    return fh.dt.strftime("%Y-%m-%d %H:%M:%S").where(fh.notna(), None).tolist()
+
+
+def _py(v):
+    """numpy/pandas -> tipos que sqlite3 sabe guardar (NaN/NA -> NULL)."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return v
+    try:
+        if pd.isna(v):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return v.item() if hasattr(v, "item") else v
+
+
+def vaciar_mediciones(conn: sqlite3.Connection):
+    """Borra hechos y dimensiones (reemplazo total). No hace commit."""
+    for t in [FACT_TABLE, "dim_archivo", "dim_localidad", "dim_sonda", "dim_expediente", "dim_provincia", "dim_ccte"]:
+        conn.execute(f"DELETE FROM {t}")
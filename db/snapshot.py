@@ -0,0 +1,128 @@
+"""
+Snapshot columnar (Arrow IPC) de la tabla maestra para arranques en frío.
+
+Se guarda al lado de la DB, un archivo por versión (`rni.snapshot.<version>.arrow`,
+con la data_version también en la metadata del esquema). El loader usa el de la
+versión actual de la DB (lectura por mmap, sin pasar por SQLite ni re-parsear
+fechas/categorías); si no existe o falta pyarrow, se vuelve a SQLite.
+Un archivo por versión evita reemplazar uno que otro proceso tiene mapeado.
+
+Se reescribe en segundo plano cada vez que la tabla compartida (db.dataset)
+avanza de versión.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+import db.sqlite_store as store
+from config import SNAPSHOT_ARROW
+
+_META_VERSION = b"data_version"
+
+_LOCK = threading.Lock()
+_PENDIENTE: dict[str, pd.DataFrame] = {}
+
+
+def ruta_snapshot(version: int) -> Path:
+    db = Path(store.DB_FILE)
+    return db.with_name(f"{db.stem}.snapshot.{int(version)}.arrow")
+
+
+def _snapshots_existentes() -> list[Path]:
+    db = Path(store.DB_FILE)
+    return sorted(db.parent.glob(f"{db.stem}.snapshot.*.arrow"))
+
+
+def leer_snapshot(version: int) -> pd.DataFrame | None:
+    """La tabla desde el snapshot de `version`; None si no hay."""
+    if not SNAPSHOT_ARROW:
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    ruta = ruta_snapshot(version)
+    if not ruta.exists():
+        return None
+    try:
+        with pa.memory_map(str(ruta), "r") as src:
+            reader = pa.ipc.open_file(src)
+            meta = reader.schema.metadata or {}
+            if meta.get(_META_VERSION) != str(version).encode():
+                return None
+            df = reader.read_all().to_pandas(split_blocks=True)
+    except (OSError, ValueError, pa.ArrowInvalid):
+        return None
+
+    df.attrs["data_version"] = version
+    return df
+
+
+def escribir_snapshot(df: pd.DataFrame) -> Path | None:
+    """Escribe el snapshot (archivo temporal + replace atómico)."""
+    if not SNAPSHOT_ARROW or df is None or df.empty or df.attrs.get("data_version") is None:
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    version = int(df.attrs["data_version"])
+    ruta = ruta_snapshot(version)
+    if not ruta.exists():
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        tabla = tabla.replace_schema_metadata({
+            **(tabla.schema.metadata or {}),
+            _META_VERSION: str(version).encode(),
+        })
+        tmp = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, tabla.schema) as writer:
+            writer.write_table(tabla)
+        os.replace(tmp, ruta)
+
+    # Versiones anteriores: se borran si se puede (en Windows puede estar mapeada por otro proceso)
+    for viejo in _snapshots_existentes():
+        v = viejo.name.split(".")[-2]
+        if v.isdigit() and int(v) < version:
+            try:
+                viejo.unlink()
+            except OSError:
+                pass
+    return ruta
+
+
+def programar_snapshot(df: pd.DataFrame):
+    """
+    Reescribe el snapshot en un hilo aparte (no demora el render).
+    Si llegan varias versiones seguidas, solo se escribe la última.
+    """
+    if not SNAPSHOT_ARROW or df is None or df.empty:
+        return
+
+    clave = str(Path(store.DB_FILE).resolve())
+    with _LOCK:
+        en_curso = clave in _PENDIENTE
+        _PENDIENTE[clave] = df
+    if en_curso:
+        return
+
+    def _trabajo():
+        while True:
+            with _LOCK:
+                actual = _PENDIENTE.get(clave)
+            try:
+                escribir_snapshot(actual)
+            except Exception:
+                # El snapshot es solo una aceleración: si falla, se sigue leyendo de SQLite
+                pass
+            with _LOCK:
+                if _PENDIENTE.get(clave) is actual:
+                    del _PENDIENTE[clave]
+                    return
+
+    threading.Thread(target=_trabajo, name="rni-snapshot", daemon=True).start()
@@ -4,79 +4,289 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-BASE_DIR = Path(__file__).resolve().parents[1]
+from config import DB_FILE, EXPECTED_COLS, TABLE_NAME
+from db import cubo, cuantiles, geo, hotspots, migrations, schema, teselas
+from utils.time_utils import parse_fecha_robusta
 
-DB_FILE = BASE_DIR / "archivosdata" / "rni.db"
-TABLE_NAME = "mediciones_rni"   
+# Tipos compactos en memoria (textos muy repetidos -> category)
+CATEGORY_COLS = ["CCTE", "Provincia", "Localidad", "Sonda", "Expediente", "Nombre Archivo"]
+FLOAT32_COLS = ["Resultado", "Lat", "Lon"]
+DATETIME_COLS = ["Fecha", "FechaCarga"]
 
-EXPECTED_COLS = [
-    "CCTE", "Provincia", "Localidad",
-    "Resultado", "Fecha", "Hora",
-    "Nombre Archivo", "Expediente",
-    "Sonda", "Lat", "Lon",
-    "FechaCarga",
-]
+
+def _normalize_column_names(columns) -> dict:
+    """Mapea nombres de columnas "raros" de la DB a los nombres esperados."""
+    col_map = {}
+    for c in columns:
+        key = str(c).strip().lower().replace("ó", "o").replace("í", "i")
+        if key == "ccte":
+            col_map[c] = "CCTE"
+        elif key == "provincia":
+            col_map[c] = "Provincia"
+        elif key == "localidad":
+            col_map[c] = "Localidad"
+        elif key in ("resultado", "resultado_con_incertidumbre"):
+            col_map[c] = "Resultado"
+        elif key == "fecha":
+            col_map[c] = "Fecha"
+        elif key in ("hora", "time"):
+            col_map[c] = "Hora"
+        elif key in ("nombrearchivo", "nombre_archivo", "archivo"):
+            col_map[c] = "Nombre Archivo"
+        elif key == "expediente":
+            col_map[c] = "Expediente"
+        elif key in ("sonda", "sonda_utilizada"):
+            col_map[c] = "Sonda"
+        elif key in ("lat", "latitud"):
+            col_map[c] = "Lat"
+        elif key in ("lon", "longitud"):
+            col_map[c] = "Lon"
+        elif key in ("fechacarga", "fecha_carga"):
+            col_map[c] = "FechaCarga"
+    return {k: v for k, v in col_map.items() if k != v}
+
+
+def _table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
+    cur = conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name=?;", (table_name,))
+    return cur.fetchone() is not None
+
+
+# Rutas de DB cuyo esquema ya se verificó en este proceso
+_ESQUEMA_OK: set[str] = set()
+
+# Espera máxima por el lock de escritura de otro proceso (busy_timeout)
+BUSY_TIMEOUT_S = 30
+
+
+def _connect() -> sqlite3.Connection:
+    """Conexión a la DB con las migraciones pendientes aplicadas (una vez por proceso)."""
+    DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_FILE), timeout=BUSY_TIMEOUT_S)
+    key = str(Path(DB_FILE).resolve())
+    if key not in _ESQUEMA_OK:
+        migrations.aplicar_migraciones(conn)
+        _ESQUEMA_OK.add(key)
+    return conn
+
+
+def conectar_lectura() -> sqlite3.Connection:
+    """
+    Conexión solo lectura (páginas, diagnóstico, exportación).
+    En WAL nunca queda bloqueada detrás de un escritor: ve el último commit.
+    """
+    if str(Path(DB_FILE).resolve()) not in _ESQUEMA_OK:
+        _connect().close()
+    conn = sqlite3.connect(Path(DB_FILE).resolve().as_uri() + "?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S)
+    conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+def leer_data_version() -> int | None:
+    """Versión de datos actual de la DB (None si no hay DB)."""
+    if not DB_FILE.exists():
+        return None
+    conn = conectar_lectura()
+    try:
+        return schema.leer_version(conn)
+    finally:
+        conn.close()
+
+
+def sql_where_from_filters(gf: dict | None) -> tuple[str, tuple]:
+    """
+    Arma WHERE SQL + params a partir de filtros globales
+    ({"ccte": [...], "provincia": [...], "anio": "Todos" | "2025"}).
+    """
+    gf = gf or {}
+
+    clauses = []
+    params: list = []
+
+    # CCTE
+    cctes = gf.get("ccte") or []
+    if cctes:
+        placeholders = ",".join(["?"] * len(cctes))
+        clauses.append(f"CCTE IN ({placeholders})")
+        params.extend([str(x) for x in cctes])
+
+    # Provincia
+    provs = gf.get("provincia") or []
+    if provs:
+        placeholders = ",".join(["?"] * len(provs))
+        clauses.append(f"Provincia IN ({placeholders})")
+        params.extend([str(x) for x in provs])
+
+    # Año (si Fecha está dd/mm/yyyy o yyyy-mm-dd)
+    anio = gf.get("anio", "Todos")
+    if anio and anio != "Todos":
+        # dd/mm/yyyy -> termina en yyyy
+        # yyyy-mm-dd -> empieza con yyyy
+        clauses.append("(Fecha LIKE ? OR Fecha LIKE ?)")
+        params.extend([f"%/{anio}", f"{anio}-%"])
+
+    where = ""
+    if clauses:
+        where = "WHERE " + " AND ".join(clauses)
+
+    return where, tuple(params)
+
+
+def iter_mediciones_chunks(gf: dict | None = None, chunksize: int = 50_000):
+    """
+    Recorre las mediciones filtradas en bloques de `chunksize` filas.
+    La memoria queda acotada al tamaño del bloque (no se arma el DF completo).
+    Si las particiones Parquet (db.particiones) están al día, se leen solo las
+    de los CCTE/año del filtro; si no, sale directo de SQLite. Es el único
+    camino con poda: load_tabla_maestra_from_db carga siempre toda la tabla.
+    """
+    from db.particiones import iter_particiones, particiones_vigentes
+
+    if not DB_FILE.exists():
+        return
+
+    archivos = particiones_vigentes(gf)
+    if archivos is not None:
+        for chunk in iter_particiones(archivos, gf, chunksize=chunksize):
+            yield chunk.reindex(columns=EXPECTED_COLS)
+        return
+
+    where, params = sql_where_from_filters(gf)
+
+    conn = conectar_lectura()
+    try:
+        for chunk in pd.read_sql(f"SELECT * FROM {TABLE_NAME} {where}", conn, params=params, chunksize=chunksize):
+            col_map = _normalize_column_names(chunk.columns)
+            if col_map:
+                chunk = chunk.rename(columns=col_map)
+            yield chunk.reindex(columns=EXPECTED_COLS)
+    finally:
+        conn.close()
 
 
 def load_tabla_maestra_from_db() -> pd.DataFrame:
-    """Carga mediciones desde SQLite. Si no existe, devuelve DF vacío."""
+    """
+    Carga mediciones desde SQLite. Si no existe, devuelve DF vacío.
+    Si el snapshot Arrow (db.snapshot) está en la versión actual, sale de ahí.
+    Si no, lee la tabla de hechos y las dimensiones por separado: los textos
+    (CCTE, Localidad, Archivo...) salen como category directo desde los ids.
+    La versión de datos leída queda en df.attrs["data_version"].
+    """
+    from db.snapshot import leer_snapshot
+
     if not DB_FILE.exists():
         return pd.DataFrame()
 
-    conn = sqlite3.connect(str(DB_FILE))
+    conn = conectar_lectura()
     try:
-        # Si existe la tabla esperada, la leemos
-        tablas = pd.read_sql(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';",
-            conn
-        )["name"].tolist()
-
-        if TABLE_NAME not in tablas:
-            return pd.DataFrame()
-
-        df = pd.read_sql(f"SELECT * FROM {TABLE_NAME}", conn)
-
-        # Normalización robusta de columnas (por si venís con nombres raros)
-        col_map = {}
-        for c in df.columns:
-            key = str(c).strip().lower().replace("ó", "o").replace("í", "i")
-            if key == "ccte":
-                col_map[c] = "CCTE"
-            elif key == "provincia":
-                col_map[c] = "Provincia"
-            elif key == "localidad":
-                col_map[c] = "Localidad"
-            elif key in ("resultado", "resultado_con_incertidumbre"):
-                col_map[c] = "Resultado"
-            elif key == "fecha":
-                col_map[c] = "Fecha"
-            elif key in ("hora", "time"):
-                col_map[c] = "Hora"
-            elif key in ("nombrearchivo", "nombre_archivo", "archivo"):
-                col_map[c] = "Nombre Archivo"
-            elif key == "expediente":
-                col_map[c] = "Expediente"
-            elif key in ("sonda", "sonda_utilizada"):
-                col_map[c] = "Sonda"
-            elif key in ("lat", "latitud"):
-                col_map[c] = "Lat"
-            elif key in ("lon", "longitud"):
-                col_map[c] = "Lon"
-            elif key in ("fechacarga", "fecha_carga"):
-                col_map[c] = "FechaCarga"
-
-        if col_map:
-            df = df.rename(columns=col_map)
-
-        # Garantiza columnas esperadas
-        for col in EXPECTED_COLS:
-            if col not in df.columns:
-                df[col] = np.nan
+        # Una sola transacción de lectura: hechos, dimensiones y versión del mismo snapshot
+        conn.execute("BEGIN")
+        version = schema.leer_version(conn)
+        df = leer_snapshot(version)
+        if df is None:
+            df = cargar_mediciones(conn)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    df.attrs["data_version"] = version
+    return df
+
+
+def cargar_mediciones(conn: sqlite3.Connection, id_desde: int | None = None, id_hasta: int | None = None) -> pd.DataFrame:
+    """Mediciones (formato tabla maestra, tipos compactos) con id en (id_desde, id_hasta]."""
+    clauses, params = [], []
+    if id_desde is not None:
+        clauses.append("id > ?")
+        params.append(int(id_desde))
+    if id_hasta is not None:
+        clauses.append("id <= ?")
+        params.append(int(id_hasta))
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    hechos = pd.read_sql(
+        f"SELECT archivo_id, sonda_id, Resultado, Fecha, Hora, Lat, Lon FROM {schema.FACT_TABLE} {where} ORDER BY id",
+        conn,
+        params=tuple(params),
+    )
+    if hechos.empty:
+        return pd.DataFrame(columns=EXPECTED_COLS)
+
+    archivos = pd.read_sql(
+        f"""
+        SELECT a.id AS archivo_id,
+               c.nombre AS CCTE, p.nombre AS Provincia, l.nombre AS Localidad,
+               a.nombre AS "Nombre Archivo", e.numero AS Expediente,
+               {schema.FECHA_CARGA_SQL} AS FechaCarga
+        FROM dim_archivo a
+        JOIN dim_localidad l ON l.id = a.localidad_id
+        JOIN dim_ccte c ON c.id = l.ccte_id
+        JOIN dim_provincia p ON p.id = l.provincia_id
+        JOIN dim_expediente e ON e.id = a.expediente_id
+        """,
+        conn,
+    )
+    sondas = pd.read_sql("SELECT id AS sonda_id, nombre AS Sonda FROM dim_sonda", conn)
+
+    df = pd.DataFrame(index=pd.RangeIndex(len(hechos)))
+    pos_arch = pd.Index(archivos["archivo_id"]).get_indexer(hechos["archivo_id"])
+    pos_sonda = pd.Index(sondas["sonda_id"]).get_indexer(hechos["sonda_id"].fillna(-1))
+
+    for col in EXPECTED_COLS:
+        if col in ("CCTE", "Provincia", "Localidad", "Nombre Archivo", "Expediente"):
+            df[col] = _categoria_por_posicion(archivos[col], pos_arch)
+        elif col == "Sonda":
+            df[col] = _categoria_por_posicion(sondas[col], pos_sonda)
+        elif col == "FechaCarga":
+            fc = parse_fecha_robusta(archivos[col])
+            df[col] = fc.to_numpy()[pos_arch]
+        else:
+            df[col] = hechos[col].to_numpy()
+
+    return compactar_tabla_maestra(df)
+
 
+def _categoria_por_posicion(valores: pd.Series, pos: np.ndarray) -> pd.Categorical:
+    """Arma un category de largo len(pos) tomando valores[pos] ('' y -1 -> NaN) sin pasar por strings."""
+    cat = pd.Categorical(valores.replace("", np.nan))
+    codes = np.where(pos >= 0, cat.codes[pos], -1)
+    return pd.Categorical.from_codes(codes, categories=cat.categories)
+
+
+def compactar_tabla_maestra(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pasa la tabla a tipos compactos: category para textos repetidos,
+    float32 para Resultado/Lat/Lon y datetime64 para Fecha/FechaCarga.
+    """
+    if df is None or df.empty:
         return df
 
-    finally:
-        conn.close()
+    for col in CATEGORY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    for col in FLOAT32_COLS:
+        if col in df.columns and df[col].dtype != np.float32:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+
+    for col in DATETIME_COLS:
+        if col in df.columns:
+            df[col] = parse_fecha_robusta(df[col])
+
+    return df
+
+
+def memoria_por_columna(df: pd.DataFrame) -> pd.DataFrame:
+    """Uso de memoria (deep) por columna, en MB."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["Columna", "Tipo", "MB"])
+
+    mem = df.memory_usage(deep=True, index=False)
+    out = pd.DataFrame({
+        "Columna": mem.index,
+        "Tipo": [str(df[c].dtype) for c in mem.index],
+        "MB": (mem.to_numpy() / (1024 * 1024)).round(2),
+    })
+    return out.sort_values("MB", ascending=False).reset_index(drop=True)
 
 
 def _sanitize_for_sqlite(df: pd.DataFrame) -> pd.DataFrame:
@@ -86,10 +296,22 @@ def _sanitize_for_sqlite(df: pd.DataFrame) -> pd.DataFrame:
 
     out = df.copy()
 
-    # Convertir columnas datetime64[ns] a texto ISO
+    # Categorías -> texto plano
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object).where(out[col].notna(), None)
+
+    # float32 -> float64 redondeado (evita guardar 0.49099999666 en lugar de 0.491)
+    for col in out.columns:
+        if out[col].dtype == np.float32:
+            out[col] = out[col].astype(np.float64).round(6)
+
+    # Convertir columnas datetime64[ns] a texto ISO (solo fecha si no hay hora)
     for col in out.columns:
         if pd.api.types.is_datetime64_any_dtype(out[col]):
-            out[col] = pd.to_datetime(out[col], errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
+            dt = pd.to_datetime(out[col], errors="coerce")
+            solo_fecha = bool((dt.dropna() == dt.dropna().dt.normalize()).all())
+            out[col] = dt.dt.strftime("%Y-%m-%d" if solo_fecha else "%Y-%m-%d %H:%M:%S")
 
     # Convertir objetos Timestamp sueltos o datetime/date/time dentro de columnas object
     def conv(x):
@@ -112,17 +334,50 @@ def _sanitize_for_sqlite(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def save_tabla_maestra_to_db(df: pd.DataFrame):
-    """Guarda toda la tabla en SQLite."""
+def save_tabla_maestra_to_db(df: pd.DataFrame, version_esperada: int | None = None):
+    """
+    Guarda toda la tabla en SQLite (reemplazo total de hechos y dimensiones).
+    Con `version_esperada`, falla con ConflictoDeVersion si otro escribió en el medio.
+    """
+    from db.escritor import escribir
+
     if df is None:
         return
 
-    DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+    df2 = _sanitize_for_sqlite(df)
+
+    def _reemplazar(conn):
+        schema.vaciar_mediciones(conn)
+        n = schema.insertar_mediciones(conn, df2)
+        cubo.recalcular(conn)
+        cuantiles.recalcular(conn)
+        hotspots.recalcular(conn)
+        geo.reconstruir(conn)
+        teselas.reconstruir(conn)
+        return n
+
+    escribir(_reemplazar, version_esperada)
+
+
+def append_mediciones_to_db(df: pd.DataFrame) -> int:
+    """Agrega mediciones nuevas (carga de planillas) sin tocar las existentes."""
+    from db.escritor import anotar_cambio, escribir
+
+    if df is None or df.empty:
+        return 0
 
     df2 = _sanitize_for_sqlite(df)
 
-    conn = sqlite3.connect(str(DB_FILE))
-    try:
-        df2.to_sql(TABLE_NAME, conn, if_exists="replace", index=False)
-    finally:
-        conn.close()
+    def _agregar(conn):
+        desde = schema.max_id_hechos(conn)
+        n = schema.insertar_mediciones(conn, df2)
+        locs = cubo.localidades_desde_id(conn, desde)
+        cubo.recalcular(conn, locs)
+        cuantiles.recalcular(conn, locs)
+        hotspots.recalcular(conn, locs)
+        geo.indexar_desde_id(conn, desde)
+        teselas.actualizar_celdas(conn, geo.celdas_desde_id(conn, desde))
+        anotar_cambio("append", id_desde=desde, id_hasta=schema.max_id_hechos(conn))
+        return n
+
+    return escribir(_agregar)
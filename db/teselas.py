@@ -0,0 +1,173 @@
+"""
+Pirámide de teselas para el mapa: agregados por grilla a varios niveles de zoom.
+
+Tabla `geo_teselas`, una fila por (nivel, fila, columna) con mediciones:
+  max_vm   máximo de Resultado dentro de la tesela
+  puntos   mediciones indexadas en la tesela
+
+El nivel 0 es la grilla del índice espacial (db.geo, 0,01°) y cada nivel junta
+FACTOR x FACTOR teselas del anterior (0,04°, 0,16°, 0,64°, 2,56°): fila y
+columna de un nivel son las del nivel 0 divididas por FACTOR**nivel. El mapa
+pide una caja Lat/Lon y recibe el nivel más fino que entra en MAX_TESELAS.
+
+Se mantiene en la transacción de cada escritura, como geo_celdas: se recalculan
+las celdas tocadas en el nivel 0 y, desde ahí, solo sus teselas madre.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from db import geo, schema
+from processing.agregados import vm_a_pct
+
+TESELAS = "geo_teselas"
+
+FACTOR = 4
+NIVELES = 5
+MAX_TESELAS = 8_000
+
+DDL_TESELAS = f"""
+CREATE TABLE IF NOT EXISTS {TESELAS} (
+    nivel INTEGER NOT NULL,
+    fila INTEGER NOT NULL,
+    columna INTEGER NOT NULL,
+    max_vm REAL,
+    puntos INTEGER NOT NULL,
+    PRIMARY KEY (nivel, fila, columna)
+) WITHOUT ROWID
+"""
+
+_NIVEL_0 = f"""
+INSERT INTO {TESELAS} (nivel, fila, columna, max_vm, puntos)
+SELECT 0, celda / {geo.COLUMNAS}, celda % {geo.COLUMNAS}, MAX(resultado), COUNT(*)
+FROM {geo.GEO} {{where}}
+GROUP BY celda
+"""
+
+_NIVEL_N = f"""
+INSERT INTO {TESELAS} (nivel, fila, columna, max_vm, puntos)
+SELECT ?, fila / {FACTOR}, columna / {FACTOR}, MAX(max_vm), SUM(puntos)
+FROM {TESELAS}
+WHERE nivel = ? {{where}}
+GROUP BY fila / {FACTOR}, columna / {FACTOR}
+"""
+
+
+def grados(nivel: int) -> float:
+    """Lado de una tesela del nivel, en grados."""
+    return geo.GRADOS_CELDA * FACTOR ** int(nivel)
+
+
+# ============================================================
+# Mantenimiento (dentro de la transacción del escritor)
+# ============================================================
+def reconstruir(conn: sqlite3.Connection):
+    """Rearma la pirámide completa desde geo_celdas. No hace commit."""
+    conn.execute(f"DELETE FROM {TESELAS}")
+    conn.execute(_NIVEL_0.format(where=""))
+    for nivel in range(1, NIVELES):
+        conn.execute(_NIVEL_N.format(where=""), (nivel, nivel - 1))
+
+
+def actualizar_celdas(conn: sqlite3.Connection, celdas):
+    """
+    Recalcula las teselas de esas celdas del índice (append, borrados) y sus
+    madres en cada nivel. Llamar con geo_celdas ya actualizada. No hace commit.
+    """
+    celdas = sorted({int(c) for c in celdas})
+    if not celdas:
+        return
+
+    conn.executemany(
+        f"DELETE FROM {TESELAS} WHERE nivel = 0 AND fila = ? AND columna = ?",
+        [(c // geo.COLUMNAS, c % geo.COLUMNAS) for c in celdas],
+    )
+    conn.executemany(_NIVEL_0.format(where="WHERE celda = ?"), [(c,) for c in celdas])
+
+    tocadas = {(c // geo.COLUMNAS, c % geo.COLUMNAS) for c in celdas}
+    for nivel in range(1, NIVELES):
+        tocadas = {(f // FACTOR, c // FACTOR) for f, c in tocadas}
+        conn.executemany(
+            f"DELETE FROM {TESELAS} WHERE nivel = ? AND fila = ? AND columna = ?",
+            [(nivel, f, c) for f, c in tocadas],
+        )
+        conn.executemany(
+            _NIVEL_N.format(
+                where=f"AND fila BETWEEN ? * {FACTOR} AND ? * {FACTOR} + {FACTOR - 1} "
+                      f"AND columna BETWEEN ? * {FACTOR} AND ? * {FACTOR} + {FACTOR - 1}"
+            ),
+            [(nivel, nivel - 1, f, f, c, c) for f, c in tocadas],
+        )
+
+
+# ============================================================
+# Lectura por caja
+# ============================================================
+def _rango(nivel: int, lat_min, lat_max, lon_min, lon_max) -> tuple[int, int, int, int]:
+    div = FACTOR ** nivel
+    return (
+        geo._fila(max(lat_min, -90.0)) // div, geo._fila(min(lat_max, 90.0)) // div,
+        geo._columna(max(lon_min, -180.0)) // div, geo._columna(min(lon_max, 180.0)) // div,
+    )
+
+
+def _contar(conn: sqlite3.Connection, nivel: int, rango) -> int:
+    f0, f1, c0, c1 = rango
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM {TESELAS} WHERE nivel = ? AND fila BETWEEN ? AND ? AND columna BETWEEN ? AND ?",
+        (nivel, f0, f1, c0, c1),
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _leer(conn, lat_min, lat_max, lon_min, lon_max, max_teselas):
+    lat_min, lat_max = sorted((float(lat_min), float(lat_max)))
+    lon_min, lon_max = sorted((float(lon_min), float(lon_max)))
+
+    # El nivel más fino que entra: primero por tamaño de la caja, después contando
+    nivel = NIVELES - 1
+    for n in range(NIVELES):
+        f0, f1, c0, c1 = rango = _rango(n, lat_min, lat_max, lon_min, lon_max)
+        if (f1 - f0 + 1) * (c1 - c0 + 1) <= max_teselas or _contar(conn, n, rango) <= max_teselas:
+            nivel = n
+            break
+
+    f0, f1, c0, c1 = _rango(nivel, lat_min, lat_max, lon_min, lon_max)
+    df = pd.read_sql(
+        f"""
+        SELECT fila, columna, max_vm, puntos FROM {TESELAS}
+        WHERE nivel = ? AND fila BETWEEN ? AND ? AND columna BETWEEN ? AND ?
+        """,
+        conn,
+        params=(nivel, f0, f1, c0, c1),
+    )
+    lado = grados(nivel)
+    df["lat_min"] = df["fila"] * lado - 90.0
+    df["lon_min"] = df["columna"] * lado - 180.0
+    df["lat"] = df["lat_min"] + lado / 2
+    df["lon"] = df["lon_min"] + lado / 2
+    df["pct"] = vm_a_pct(df["max_vm"]).round(2)
+    df.attrs["nivel"] = nivel
+    df.attrs["grados"] = lado
+    return df
+
+
+def leer_teselas(
+    lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+    max_teselas: int = MAX_TESELAS, conn: sqlite3.Connection | None = None,
+) -> pd.DataFrame:
+    """
+    Teselas con mediciones dentro de la caja, en el nivel más fino con a lo sumo
+    `max_teselas`: fila, columna, max_vm, pct, puntos, lat_min, lon_min y centro
+    (lat, lon). attrs["nivel"] y attrs["grados"] dicen el nivel y el lado elegidos.
+    """
+    return schema.con_conexion(_leer, lat_min, lat_max, lon_min, lon_max, int(max_teselas), conn=conn)
+
+
+def zoom_para(lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> float:
+    """Zoom de mapa web aproximado para que la caja entre en pantalla."""
+    span = max(abs(lat_max - lat_min), abs(lon_max - lon_min), 1e-3)
+    return float(np.clip(np.log2(360.0 / span), 2, 15))
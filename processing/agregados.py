@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from utils.time_utils import add_fechahora, calcular_tiempo_total_por_archivo, format_timedelta_long
+
+# Constante para % (Resultado V/m -> % del límite)
+K_DEN = 3770 * 0.20021
+
+
+def vm_a_pct(vm):
+    """Convierte Resultado (V/m) a % del límite."""
+    return (vm ** 2) / K_DEN * 100
+
+
+def _hours(td) -> float:
+    try:
+        return float(td.total_seconds()) / 3600.0
+    except Exception:
+        return 0.0
+
+
+# ============================================================
+# 🏠 Inicio
+# ============================================================
+def kpis_inicio(df: pd.DataFrame, sel=None, ranking=None) -> dict:
+    """
+    KPIs generales de Inicio: conteos, última carga y fila del máximo.
+    Con `ranking` (db.hotspots.leer_ranking con los mismos filtros) el máximo es su
+    primera fila; si no, con `sel` (db.columnas.Seleccion) sale del almacén columnar.
+    Con df=None todo sale de `sel`, sin la tabla filtrada.
+    """
+    if df is None:
+        locs = sel.filas_por_localidad()
+        total_reg = len(sel)
+        total_localidades = locs["Localidad"].dropna().nunique()
+        total_provincias = locs["Provincia"].dropna().nunique()
+        total_ccte = locs["CCTE"].dropna().nunique()
+        fecha_carga = sel.columna_tabla("FechaCarga") if "FechaCarga" in sel.tabla.columns else None
+    else:
+        total_reg = len(df)
+        total_localidades = df["Localidad"].dropna().nunique() if "Localidad" in df.columns else 0
+        total_provincias = df["Provincia"].dropna().nunique() if "Provincia" in df.columns else 0
+        total_ccte = df["CCTE"].dropna().nunique() if "CCTE" in df.columns else 0
+        fecha_carga = df["FechaCarga"] if "FechaCarga" in df.columns else None
+
+    ultima_carga = None
+    if fecha_carga is not None:
+        _fc = pd.to_datetime(fecha_carga, errors="coerce")
+        if _fc.notna().any():
+            ultima_carga = _fc.max()
+
+    max_row = None
+    if ranking is not None and not ranking.empty:
+        max_row = ranking.iloc[0]
+    elif sel is not None:
+        max_row = sel.fila_maxima()
+    else:
+        res = pd.to_numeric(df.get("Resultado", pd.Series(dtype=float)), errors="coerce")
+        if res.notna().any():
+            max_row = df.loc[res.idxmax()]
+
+    return {
+        "total_reg": total_reg,
+        "total_localidades": total_localidades,
+        "total_provincias": total_provincias,
+        "total_ccte": total_ccte,
+        "ultima_carga": ultima_carga,
+        "max_row": max_row,
+    }
+
+
+def top_localidades_por_maximo(df: pd.DataFrame, n: int = 5, sel=None, ranking=None) -> pd.DataFrame:
+    """Fila del máximo de cada localidad, ordenadas de mayor a menor (top n). df=None: desde sel/ranking."""
+    columnas = (sel.tabla if df is None else df).columns
+    if "Localidad" not in columnas or "Resultado" not in columnas:
+        return pd.DataFrame()
+
+    if ranking is not None and not ranking.empty:
+        # Ya viene ordenado por pico: una fila por nombre de localidad
+        top = ranking.dropna(subset=["Localidad"]).drop_duplicates("Localidad").head(n).copy()
+    elif sel is not None:
+        picos = sel.picos_por_localidad().dropna(subset=["Localidad"])
+        # Una fila por nombre de localidad (como el groupby de abajo)
+        picos = picos.drop_duplicates("Localidad").head(n)
+        top = sel.tabla.iloc[picos["fila"].to_numpy()].copy()
+    else:
+        base = df.dropna(subset=["Resultado", "Localidad"])
+        if base.empty:
+            return pd.DataFrame()
+
+        idx = base.groupby("Localidad", observed=True)["Resultado"].idxmax()
+        top = base.loc[idx].sort_values("Resultado", ascending=False).head(n).copy()
+    if top.empty:
+        return pd.DataFrame()
+
+    top["Resultado %"] = pd.to_numeric(vm_a_pct(top["Resultado"]), errors="coerce").round(2)
+    top["Resultado"] = pd.to_numeric(top["Resultado"], errors="coerce").round(2)
+    return top
+
+
+# ============================================================
+# 📊 Resumen general
+# ============================================================
+def resumen_por_localidad(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resumen por (CCTE, Provincia, Localidad): mediciones, máximo, inicio/fin,
+    expedientes, sondas y tiempo trabajado. Espera FechaHora ya calculada.
+    """
+    gb = df.groupby(["CCTE", "Provincia", "Localidad"], dropna=False, observed=True)
+
+    resumen = gb.agg(
+        Mediciones=("Resultado", "size"),
+        Resultado_Max_Vm=("Resultado", "max"),
+        Inicio=("FechaHora", "min"),
+        Fin=("FechaHora", "max"),
+    ).reset_index()
+
+    # % del máximo
+    resumen["Resultado_Max_%"] = vm_a_pct(resumen["Resultado_Max_Vm"])
+    resumen.loc[resumen["Resultado_Max_Vm"].isna(), "Resultado_Max_%"] = pd.NA
+
+    # Expedientes / Sondas (esto es lo más “caro”; lo hago controlado)
+    if "Expediente" in df.columns:
+        exp_map = gb["Expediente"].apply(
+            lambda x: ", ".join(sorted(set(x.dropna().astype(str)))))
+        resumen = resumen.merge(exp_map.rename("N° Expediente"), on=["CCTE", "Provincia", "Localidad"], how="left")
+    else:
+        resumen["N° Expediente"] = ""
+
+    if "Sonda" in df.columns:
+        sonda_map = gb["Sonda"].apply(
+            lambda x: ", ".join(sorted(set(x.dropna().astype(str)))))
+        resumen = resumen.merge(sonda_map.rename("Sonda utilizada"), on=["CCTE", "Provincia", "Localidad"], how="left")
+    else:
+        resumen["Sonda utilizada"] = ""
+
+    # Tiempo trabajado por localidad
+    # (este loop es por cantidad de localidades, no por filas -> mucho más liviano)
+    tiempos = []
+    for _, row in resumen[["CCTE", "Provincia", "Localidad"]].iterrows():
+        ccte, prov, loc = row["CCTE"], row["Provincia"], row["Localidad"]
+        g = df[(df["CCTE"] == ccte) & (df["Provincia"] == prov) & (df["Localidad"] == loc)]
+        td = calcular_tiempo_total_por_archivo(g)
+        tiempos.append(format_timedelta_long(td))
+
+    resumen["Tiempo trabajado"] = tiempos
+
+    # (Inicio/Fin pueden quedar NaT si no hubo parseo de fecha/hora)
+    resumen["Inicio"] = pd.to_datetime(resumen["Inicio"], errors="coerce")
+    resumen["Fin"] = pd.to_datetime(resumen["Fin"], errors="coerce")
+
+    # Ordenar por pico max % (o V/m) descendente
+    resumen = resumen.sort_values(["Resultado_Max_%", "Resultado_Max_Vm"], ascending=False)
+
+    return resumen.rename(columns={
+        "Resultado_Max_Vm": "Resultado Max (V/m)",
+        "Resultado_Max_%": "Resultado Max (%)",
+    })
+
+
+# ============================================================
+# 📈 Gráficos (tablero)
+# ============================================================
+def preparar_base_graficos(df0: pd.DataFrame) -> pd.DataFrame:
+    """Resultado numérico + FechaHora robusta + Fecha_dt / Mes / Resultado_pct."""
+    # Resultado numérico
+    if "Resultado" in df0.columns:
+        df0["Resultado"] = pd.to_numeric(df0["Resultado"], errors="coerce")
+    else:
+        df0["Resultado"] = np.nan
+
+    # FechaHora robusta si existen Fecha y Hora
+    if "Fecha" in df0.columns and "Hora" in df0.columns:
+        df0 = add_fechahora(df0, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
+    else:
+        df0["FechaHora"] = pd.NaT
+
+    fh = pd.to_datetime(df0["FechaHora"], errors="coerce")
+    df0["Fecha_dt"] = fh.dt.date
+    df0["Mes"] = fh.dt.to_period("M").astype("string")
+
+    # Resultado %
+    df0["Resultado_pct"] = np.where(
+        df0["Resultado"].notna(),
+        vm_a_pct(df0["Resultado"]),
+        np.nan,
+    )
+    return df0
+
+
+def agregados_operativo(df: pd.DataFrame) -> dict:
+    """
+    Agregados del tab Operativo. Espera 'Fecha_dt' y 'Mes' ya calculados.
+    Devuelve DFs listos para graficar (o None si faltan columnas).
+    """
+    out = {"puntos_ccte": None, "localidades_prov_ccte": None, "horas_ccte": None, "dias_ccte": None, "mensual": None}
+
+    if "CCTE" in df.columns and df["CCTE"].notna().any():
+        out["puntos_ccte"] = df.groupby("CCTE", observed=True).size().reset_index(name="Puntos")
+
+        filas = []
+        for ccte, g in df.groupby("CCTE", observed=True):
+            td = calcular_tiempo_total_por_archivo(g)
+            filas.append({"CCTE": str(ccte), "Horas": round(_hours(td), 2)})
+        out["horas_ccte"] = pd.DataFrame(filas).sort_values("Horas", ascending=False)
+
+    if {"Provincia", "CCTE", "Localidad"}.issubset(df.columns):
+        out["localidades_prov_ccte"] = (
+            df.groupby(["Provincia", "CCTE"], observed=True)["Localidad"]
+            .nunique()
+            .reset_index(name="Localidades")
+        )
+
+    if "CCTE" in df.columns and df["Fecha_dt"].notna().any():
+        out["dias_ccte"] = (
+            df.dropna(subset=["Fecha_dt"])
+            .groupby("CCTE", observed=True)["Fecha_dt"].nunique()
+            .reset_index(name="Días con medición")
+            .sort_values("Días con medición", ascending=False)
+        )
+
+    if df["Mes"].notna().any():
+        out["mensual"] = df.groupby("Mes").size().reset_index(name="Puntos").sort_values("Mes")
+
+    return out
+
+
+def kpis_cubo(cubo: pd.DataFrame) -> dict:
+    """KPIs del tablero sumando las celdas del cubo (db.cubo) en vez de recorrer filas."""
+    con_fecha = cubo[cubo["puntos_fecha"] > 0]
+    return {
+        "total_reg": int(cubo["puntos"].sum()),
+        "total_localidades": int(cubo["Localidad"].dropna().nunique()),
+        "total_provincias": int(cubo["Provincia"].dropna().nunique()),
+        "total_ccte": int(cubo["CCTE"].dropna().nunique()),
+        "dias_medidos": int(len(con_fecha[["anio", "mes", "dia"]].drop_duplicates())),
+        "horas_total": float(cubo["segundos"].sum()) / 3600.0,
+    }
+
+
+def agregados_operativo_cubo(cubo: pd.DataFrame) -> dict:
+    """Mismos agregados que agregados_operativo, como rollup de las celdas del cubo."""
+    out = {"puntos_ccte": None, "localidades_prov_ccte": None, "horas_ccte": None, "dias_ccte": None, "mensual": None}
+
+    if cubo["CCTE"].notna().any():
+        por_ccte = cubo.groupby("CCTE")
+        out["puntos_ccte"] = por_ccte["puntos"].sum().reset_index(name="Puntos")
+        out["horas_ccte"] = (
+            (por_ccte["segundos"].sum() / 3600.0).round(2)
+            .reset_index(name="Horas")
+            .sort_values("Horas", ascending=False)
+        )
+
+    out["localidades_prov_ccte"] = (
+        cubo.groupby(["Provincia", "CCTE"])["Localidad"]
+        .nunique()
+        .reset_index(name="Localidades")
+    )
+
+    con_fecha = cubo[cubo["puntos_fecha"] > 0]
+    if not con_fecha.empty:
+        dias = con_fecha.drop_duplicates(["CCTE", "anio", "mes", "dia"])
+        out["dias_ccte"] = (
+            dias.groupby("CCTE").size()
+            .reset_index(name="Días con medición")
+            .sort_values("Días con medición", ascending=False)
+        )
+
+        mes = con_fecha["anio"].astype(str).str.zfill(4) + "-" + con_fecha["mes"].astype(str).str.zfill(2)
+        out["mensual"] = (
+            con_fecha.groupby(mes)["puntos_fecha"].sum()
+            .rename_axis("Mes").reset_index(name="Puntos")
+            .sort_values("Mes")
+        )
+
+    return out
+
+
+def hotspots_por_localidad(df: pd.DataFrame, sel=None, ranking=None) -> pd.DataFrame:
+    """
+    Máximo (% y V/m) por localidad, con CCTE/Provincia y cantidad de puntos.
+    Con `ranking` (db.hotspots) o `sel` (db.columnas) parte de los picos ya calculados.
+    """
+    if ranking is not None and not ranking.empty:
+        base = ranking[["CCTE", "Provincia", "Localidad", "MaxVm", "Puntos"]].dropna(subset=["Localidad"])
+    elif sel is not None:
+        base = sel.picos_por_localidad().dropna(subset=["Localidad"])
+    else:
+        base = None
+
+    if base is not None:
+        if base.empty:
+            return pd.DataFrame()
+        base["MaxPct"] = vm_a_pct(base["MaxVm"].astype("float64"))
+        return (
+            base.groupby(["Localidad"], as_index=False)
+            .agg(
+                MaxPct=("MaxPct", "max"),
+                MaxVm=("MaxVm", "max"),
+                CCTE=("CCTE", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
+                Provincia=("Provincia", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
+                Puntos=("Puntos", "sum"),
+            )
+            .sort_values("MaxPct", ascending=False)
+        )
+
+    base = df.dropna(subset=["Localidad", "Resultado_pct"])
+    if base.empty:
+        return pd.DataFrame()
+
+    return (
+        base.groupby(["Localidad"], as_index=False, observed=True)
+        .agg(
+            MaxPct=("Resultado_pct", "max"),
+            MaxVm=("Resultado", "max"),
+            CCTE=("CCTE", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
+            Provincia=("Provincia", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
+            Puntos=("Resultado_pct", "count"),
+        )
+        .sort_values("MaxPct", ascending=False)
+    )
+
+
+# ============================================================
+# 🗂️ Gestión de localidades
+# ============================================================
+def calcular_resumen_diario(df_localidad: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por día. Espera FechaHora válida y columna 'Fecha' (date)."""
+    filas = []
+    for fecha, g_dia in df_localidad.groupby("Fecha"):
+        tiempo_total = calcular_tiempo_total_por_archivo(g_dia)
+        inicio_dt = g_dia["FechaHora"].min()
+        fin_dt = g_dia["FechaHora"].max()
+        filas.append({
+            "Fecha de medición": fecha,
+            "Hora de inicio": inicio_dt.strftime("%H:%M:%S") if pd.notna(inicio_dt) else "-",
+            "Hora de fin": fin_dt.strftime("%H:%M:%S") if pd.notna(fin_dt) else "-",
+            "Tiempo total trabajado": format_timedelta_long(tiempo_total),
+            "Cantidad de puntos medidos": len(g_dia),
+            "Localidades trabajadas (por día)": ", ".join(sorted(g_dia["Localidad"].dropna().unique())),
+        })
+    return pd.DataFrame(filas)
+
+
+def calcular_resumen_mensual(df_localidad: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por mes con horas trabajadas (num + texto). Espera FechaHora y 'Mes'."""
+    resumen = df_localidad.groupby("Mes").agg({
+        "FechaHora": ["min", "max"],
+        "Localidad": lambda x: ", ".join(sorted(x.dropna().unique())),
+        "Resultado": "count"
+    }).reset_index()
+    resumen.columns = ["Mes", "Hora inicio", "Hora fin", "Localidades trabajadas", "Cantidad puntos"]
+
+    filas_tiempo_mes = []
+    for mes, g_mes in df_localidad.groupby("Mes"):
+        td_mes = calcular_tiempo_total_por_archivo(g_mes)
+        filas_tiempo_mes.append({
+            "Mes": str(mes),
+            "Horas trabajadas num": _hours(td_mes),
+            "Horas trabajadas": format_timedelta_long(td_mes),
+        })
+    tiempo_por_mes = pd.DataFrame(filas_tiempo_mes)
+
+    return resumen.merge(tiempo_por_mes, on="Mes", how="left")
@@ -3,7 +3,7 @@ import pandas as pd
 import streamlit as st
 
 from utils.excel_utils import find_index_column, extract_numeric_from_text
-from utils.geo_utils import parse_dms_to_decimal
+from utils.geo_utils import normalizar_coordenadas
 
 
 def procesar_archivos(uploaded_files, ccte, provincia, localidad, expediente):
@@ -59,10 +59,11 @@ def procesar_archivos(uploaded_files, ccte, provincia, localidad, expediente):
         # Limpieza y formateo de campos
         if "Resultado" in df.columns:
             df["Resultado"] = extract_numeric_from_text(df["Resultado"])
-        if "Lat" in df.columns:
-            df["Lat"] = df["Lat"].apply(parse_dms_to_decimal)
-        if "Lon" in df.columns:
-            df["Lon"] = df["Lon"].apply(parse_dms_to_decimal)
+        if "Lat" in df.columns or "Lon" in df.columns:
+            # Coordenada canónica (sur/oeste, con validez y nota) una sola vez, al cargar
+            vacia = pd.Series(index=df.index, dtype="float64")
+            coords = normalizar_coordenadas(df.get("Lat", vacia), df.get("Lon", vacia))
+            df[coords.columns] = coords.set_axis(df.index)
         df.drop(columns=["_idx_num"], errors="ignore", inplace=True)
 
         lista_procesados.append(df)
@@ -70,7 +71,8 @@ def procesar_archivos(uploaded_files, ccte, provincia, localidad, expediente):
             "archivo": file.name,
             "expediente": df["Expediente"].iloc[0],
             "total mediciones": total_mediciones,
-            "max_resultado": df["Resultado"].max() if "Resultado" in df.columns else None
+            "max_resultado": df["Resultado"].max() if "Resultado" in df.columns else None,
+            "coords inválidas": int((~df["CoordValida"]).sum()) if "CoordValida" in df.columns else None,
         })
 
     if lista_procesados:
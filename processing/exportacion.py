@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from config import BASE_DIR, EXPECTED_COLS
+from db.sqlite_store import iter_mediciones_chunks
+
+EXPORT_DIR = BASE_DIR / "archivosdata" / "exports"
+
+# Excel no admite más de 1.048.576 filas por hoja (incluye encabezado)
+XLSX_MAX_FILAS_HOJA = 1_048_575
+
+FORMATOS = {
+    "CSV (.csv)": "csv",
+    "Parquet (.parquet)": "parquet",
+    "Excel (.xlsx)": "xlsx",
+}
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/octet-stream",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _celda_xlsx(v):
+    """openpyxl no acepta NaN/NaT/numpy: lo llevamos a tipos Python simples."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if hasattr(v, "item"):
+        return v.item()
+    return v
+
+
+def _exportar_csv(chunks, destino: Path) -> int:
+    filas = 0
+    # utf-8-sig para que Excel abra bien los acentos
+    with open(destino, "w", encoding="utf-8-sig", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            filas += len(chunk)
+        if filas == 0:
+            pd.DataFrame(columns=EXPECTED_COLS).to_csv(f, index=False)
+    return filas
+
+
+def _exportar_parquet(chunks, destino: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Para exportar a Parquet hace falta instalar 'pyarrow'.") from e
+
+    # Esquema fijo: todo texto salvo los numéricos (evita choques de tipos entre bloques)
+    schema = pa.schema([
+        (c, pa.float64() if c in ("Resultado", "Lat", "Lon") else pa.string())
+        for c in EXPECTED_COLS
+    ])
+
+    filas = 0
+    with pq.ParquetWriter(str(destino), schema, compression="snappy") as writer:
+        for chunk in chunks:
+            chunk = chunk.copy()
+            for c in EXPECTED_COLS:
+                if c in ("Resultado", "Lat", "Lon"):
+                    chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+                else:
+                    chunk[c] = chunk[c].astype("string")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            filas += len(chunk)
+    return filas
+
+
+def _exportar_xlsx(chunks, destino: Path) -> int:
+    from openpyxl import Workbook
+
+    # write_only: las filas se vuelcan a disco a medida que se agregan
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Mediciones")
+    ws.append(EXPECTED_COLS)
+    filas_hoja = 0
+    hojas = 1
+
+    filas = 0
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            if filas_hoja >= XLSX_MAX_FILAS_HOJA:
+                hojas += 1
+                ws = wb.create_sheet(f"Mediciones_{hojas}")
+                ws.append(EXPECTED_COLS)
+                filas_hoja = 0
+            ws.append([_celda_xlsx(v) for v in row])
+            filas_hoja += 1
+        filas += len(chunk)
+
+    wb.save(str(destino))
+    return filas
+
+
+def exportar_mediciones(gf: dict | None, formato: str, chunksize: int = 50_000) -> tuple[Path, int]:
+    """
+    Exporta las mediciones que cumplen los filtros globales a un archivo en disco,
+    leyendo SQLite por bloques. Devuelve (ruta, cantidad de filas).
+    """
+    if formato not in MIME_TYPES:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    # EXPORT_DIR es compartido entre sesiones: sufijo único aunque dos exporten en el mismo segundo
+    nombre = f"Mediciones_RNI_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.{formato}"
+    destino = EXPORT_DIR / nombre
+    # Se escribe aparte y se renombra al final: nunca queda a la vista un archivo a medias
+    tmp = EXPORT_DIR / f".{nombre}.tmp"
+
+    chunks = iter_mediciones_chunks(gf, chunksize=chunksize)
+    try:
+        if formato == "csv":
+            filas = _exportar_csv(chunks, tmp)
+        elif formato == "parquet":
+            filas = _exportar_parquet(chunks, tmp)
+        else:
+            filas = _exportar_xlsx(chunks, tmp)
+        os.replace(tmp, destino)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    return destino, filas
@@ -0,0 +1,246 @@
+"""
+Mapa de calor nacional: máximo % por celda de grilla, rasterizado a PNG.
+
+Cada celda de TESELAS_NIVEL (0,04° ≈ 4 km) es un píxel con el color del semáforo
+del máximo medido adentro; el PNG se recorta a la zona con datos y se guarda al
+lado de la DB, uno por (filtros globales, data_version):
+
+    rni.mapas_calor/calor-<version>-<filtros>.png  (+ .json con la caja Lat/Lon)
+
+Se arma en un hilo aparte (programar_mapa_calor); la página lo muestra en cuanto
+existe, sin leer mediciones. Sin filtros sale de la pirámide de teselas (db.teselas);
+con filtros, de un GROUP BY por celda sobre la vista.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import TABLE_NAME
+from processing.agregados import vm_a_pct
+
+TESELAS_NIVEL = 1
+MARGEN_PX = 4
+
+_LOCK = threading.Lock()
+_PENDIENTE: dict[str, dict | None] = {}
+_ERRORES: dict[str, str] = {}
+
+
+def _filtros(gf: dict | None) -> dict:
+    gf = gf or {}
+    return {
+        "ccte": sorted(str(x) for x in gf.get("ccte") or []),
+        "provincia": sorted(str(x) for x in gf.get("provincia") or []),
+        "anio": str(gf.get("anio") or "Todos"),
+    }
+
+
+def _clave(gf: dict | None) -> str:
+    texto = json.dumps(_filtros(gf), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def ruta_mapas_calor() -> Path:
+    import db.sqlite_store as store
+
+    db = Path(store.DB_FILE)
+    return db.with_name(f"{db.stem}.mapas_calor")
+
+
+def _ruta(gf: dict | None, version: int) -> Path:
+    return ruta_mapas_calor() / f"calor-{int(version)}-{_clave(gf)}.png"
+
+
+# ============================================================
+# Celdas y raster
+# ============================================================
+def _celdas(conn, gf: dict | None) -> pd.DataFrame:
+    """fila, columna, max_vm, puntos por celda de TESELAS_NIVEL con los filtros aplicados."""
+    from db import teselas
+    from db.sqlite_store import sql_where_from_filters
+
+    f = _filtros(gf)
+    if not f["ccte"] and not f["provincia"] and f["anio"] == "Todos":
+        return pd.read_sql(
+            f"SELECT fila, columna, max_vm, puntos FROM {teselas.TESELAS} WHERE nivel = ? AND max_vm IS NOT NULL",
+            conn,
+            params=(TESELAS_NIVEL,),
+        )
+
+    paso = teselas.grados(TESELAS_NIVEL)
+    where, params = sql_where_from_filters(gf)
+    return pd.read_sql(
+        f"""
+        SELECT CAST((Lat + 90.0) / {paso} AS INTEGER) AS fila,
+               CAST((Lon + 180.0) / {paso} AS INTEGER) AS columna,
+               MAX(Resultado) AS max_vm, COUNT(*) AS puntos
+        FROM {TABLE_NAME}
+        {where} {"AND" if where else "WHERE"} Lat IS NOT NULL AND Lon IS NOT NULL AND Resultado IS NOT NULL
+        GROUP BY 1, 2
+        """,
+        conn,
+        params=params,
+    )
+
+
+def rasterizar(celdas: pd.DataFrame) -> tuple[np.ndarray, dict] | None:
+    """
+    Celdas -> imagen RGBA (norte arriba, transparente donde no hay datos) y
+    metadatos: caja Lat/Lon de la imagen, celdas, puntos y máximo %.
+    """
+    from db import teselas
+    from sections.semaforo_mapa import colores_semaforo
+
+    if celdas is None or celdas.empty:
+        return None
+
+    paso = teselas.grados(TESELAS_NIVEL)
+    f0 = int(celdas["fila"].min()) - MARGEN_PX
+    f1 = int(celdas["fila"].max()) + MARGEN_PX
+    c0 = int(celdas["columna"].min()) - MARGEN_PX
+    c1 = int(celdas["columna"].max()) + MARGEN_PX
+
+    img = np.zeros((f1 - f0 + 1, c1 - c0 + 1, 4), dtype=np.uint8)
+    pct = vm_a_pct(celdas["max_vm"].to_numpy(dtype="float64"))
+    filas = f1 - celdas["fila"].to_numpy()  # fila 0 de la imagen = norte
+    cols = celdas["columna"].to_numpy() - c0
+    img[filas, cols, :3] = colores_semaforo(pct)
+    img[filas, cols, 3] = 255
+
+    meta = {
+        "lat_min": f0 * paso - 90.0, "lat_max": (f1 + 1) * paso - 90.0,
+        "lon_min": c0 * paso - 180.0, "lon_max": (c1 + 1) * paso - 180.0,
+        "ancho": int(img.shape[1]), "alto": int(img.shape[0]),
+        "km_celda": round(paso * 111.2, 1),
+        "celdas": int(len(celdas)),
+        "puntos": int(celdas["puntos"].sum()),
+        "max_pct": round(float(np.nanmax(pct)), 2),
+    }
+    return img, meta
+
+
+# ============================================================
+# Generación (en segundo plano) y lectura
+# ============================================================
+def generar_mapa_calor(gf: dict | None) -> Path | None:
+    """Arma el PNG de los filtros con la versión actual de la DB. Devuelve la ruta (None sin DB)."""
+    from PIL import Image
+
+    import db.sqlite_store as store
+    from db import schema
+
+    if not store.DB_FILE.exists():
+        return None
+
+    conn = store.conectar_lectura()
+    try:
+        # Celdas y versión del mismo snapshot de lectura
+        conn.execute("BEGIN")
+        version = schema.leer_version(conn)
+        celdas = _celdas(conn, gf)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    ruta = _ruta(gf, version)
+    hecho = rasterizar(celdas)
+    if hecho is None:
+        # Sin coordenadas con esos filtros: se guarda igual, para no volver a intentarlo
+        hecho = np.zeros((1, 1, 4), dtype=np.uint8), {"celdas": 0, "puntos": 0}
+    img, meta = hecho
+    meta.update(version=version, filtros=_filtros(gf))
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+    Image.fromarray(img, mode="RGBA").save(tmp, format="PNG", optimize=True)
+    ruta.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, ruta)
+
+    # Versiones anteriores de cualquier filtro: ya no sirven
+    for viejo in ruta.parent.glob("calor-*"):
+        v = viejo.name.split("-")[1]
+        if v.isdigit() and int(v) < version:
+            try:
+                viejo.unlink()
+            except OSError:
+                pass
+    return ruta
+
+
+def leer_mapa_calor(gf: dict | None, version: int) -> dict | None:
+    """Metadatos + bytes del PNG de esos filtros en `version` (o una posterior); None si no está."""
+    carpeta = ruta_mapas_calor()
+    if not carpeta.exists():
+        return None
+    clave = _clave(gf)
+    candidatos = sorted(
+        (int(p.name.split("-")[1]), p) for p in carpeta.glob(f"calor-*-{clave}.png")
+        if p.name.split("-")[1].isdigit() and int(p.name.split("-")[1]) >= int(version)
+    )
+    for _, png in reversed(candidatos):
+        try:
+            meta = json.loads(png.with_suffix(".json").read_text(encoding="utf-8"))
+            meta["png"] = png.read_bytes()
+            return meta
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def programar_mapa_calor(gf: dict | None):
+    """Arma el mapa de esos filtros en un hilo aparte (uno por combinación de filtros a la vez)."""
+    import db.sqlite_store as store
+
+    clave = f"{Path(store.DB_FILE).resolve()}|{_clave(gf)}"
+    with _LOCK:
+        if clave in _PENDIENTE:
+            return
+        _PENDIENTE[clave] = gf
+        _ERRORES.pop(clave, None)
+
+    def _trabajo():
+        try:
+            generar_mapa_calor(gf)
+        except Exception as e:
+            # Es solo una vista previa: la página sigue sin el mapa
+            with _LOCK:
+                _ERRORES[clave] = str(e)
+        finally:
+            with _LOCK:
+                _PENDIENTE.pop(clave, None)
+
+    threading.Thread(target=_trabajo, name="rni-mapa-calor", daemon=True).start()
+
+
+def estado_mapa_calor(gf: dict | None) -> str:
+    """'generando', 'error' o '' (nada en curso)."""
+    import db.sqlite_store as store
+
+    clave = f"{Path(store.DB_FILE).resolve()}|{_clave(gf)}"
+    with _LOCK:
+        if clave in _PENDIENTE:
+            return "generando"
+        return "error" if clave in _ERRORES else ""
+
+
+def png_para_informe(meta: dict, lado_min: int = 600) -> BytesIO:
+    """PNG sobre fondo blanco y agrandado sin suavizar (cada celda sigue siendo un bloque)."""
+    from PIL import Image
+
+    img = Image.open(BytesIO(meta["png"])).convert("RGBA")
+    escala = max(1, int(np.ceil(lado_min / max(img.size))))
+    img = img.resize((img.width * escala, img.height * escala), Image.NEAREST)
+    fondo = Image.new("RGBA", img.size, (245, 245, 245, 255))
+    fondo.alpha_composite(img)
+    out = BytesIO()
+    fondo.convert("RGB").save(out, format="PNG")
+    out.seek(0)
+    return out
@@ -0,0 +1,83 @@
+"""
+Pool de procesos para los agregados por bloques (processing.streaming).
+
+Se arranca una sola vez por proceso, con `spawn`, y se reutiliza en cada llamada:
+
+- `fork` dentro del servidor copia el proceso con los hilos de fondo a mitad de
+  camino (escritor, snapshot, columnas, particiones, precalentado): un hijo puede
+  heredar un lock tomado y quedarse trabado. En Windows además no existe.
+- Con `spawn` el hijo importa el `__main__` del padre, y Streamlit corre app.py
+  como `__main__`: el hijo volvería a ejecutar la página. Mientras arranca cada
+  hijo, `__main__` pasa a ser este módulo, que no importa Streamlit.
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import sys
+import threading
+from multiprocessing.pool import Pool
+
+_CTX = multiprocessing.get_context("spawn")
+
+_LOCK = threading.Lock()
+_MAIN_LOCK = threading.Lock()
+_POOL: Pool | None = None
+_TAMANIO = 0
+
+
+class _Proceso(_CTX.Process):
+    def start(self):
+        # spawn toma __main__ al lanzar el hijo: durante el arranque, este módulo
+        propio = sys.modules[__name__]
+        with _MAIN_LOCK:
+            main = sys.modules.get("__main__")
+            sys.modules["__main__"] = propio
+            try:
+                super().start()
+            finally:
+                if sys.modules.get("__main__") is propio:
+                    sys.modules["__main__"] = main
+
+
+class _Pool(Pool):
+    # También los hijos que el pool relanza si alguno muere
+    @staticmethod
+    def Process(ctx, *args, **kwds):
+        return _Proceso(*args, **kwds)
+
+
+def _tarea(por, gf, chunksize, distintos, db_file):
+    """En un hijo: agrega las mediciones de `gf` de la misma DB que el proceso que la pidió."""
+    from pathlib import Path
+
+    import db.sqlite_store as store
+    from processing.streaming import acumular
+
+    store.DB_FILE = Path(db_file)
+    return acumular(por, gf, chunksize, distintos)
+
+
+def _pool(procesos: int) -> Pool:
+    global _POOL, _TAMANIO
+    with _LOCK:
+        if _POOL is None or _TAMANIO < procesos:
+            if _POOL is not None:
+                # Termina lo que tenga en cola y se apaga
+                _POOL.close()
+            _POOL = _Pool(procesos, context=_CTX)
+            _TAMANIO = procesos
+        return _POOL
+
+
+def repartir(por, filtros: list[dict], chunksize, distintos, db_file, procesos: int) -> list:
+    """Un AgregadoStreaming por cada filtro de `filtros`, en ese orden, calculados en el pool."""
+    tareas = [(por, gf, chunksize, distintos, str(db_file)) for gf in filtros]
+    return _pool(procesos).starmap(_tarea, tareas)
+
+
+@atexit.register
+def _cerrar():
+    with _LOCK:
+        if _POOL is not None:
+            _POOL.terminate()
@@ -0,0 +1,198 @@
+"""
+Precalentado de cachés al arrancar el servidor.
+
+La primera sesión del proceso dispara (programar_precalentado) un hilo que, con
+los filtros por defecto ("Todos"), deja armado lo que más tarda en la primera visita:
+
+  tabla              tabla maestra compartida (db.dataset: DB/snapshot + FechaHora)
+  kpis_inicio        KPIs de 🏠 Inicio
+  resumen_localidad  resumen por localidad de 📊 Resumen general
+  base_graficos      base del tablero (Resultado numérico, FechaHora, Fecha_dt, Mes, %)
+  cubo_graficos      cubo de agregados de 📊 Gráficos
+
+Cada resultado queda en memoria del proceso asociado a la data_version con la que
+se armó; las páginas lo usan solo si coincide con la de la sesión y los filtros son
+los de por defecto. Si la DB cambia, el siguiente rerun vuelve a programarlo.
+Mientras corre, las páginas muestran el aviso de sections.precalentado en vez de
+calcular lo mismo en paralelo.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+FILTROS_TODOS = {"ccte": [], "provincia": [], "anio": "Todos"}
+
+_LOCK = threading.Lock()
+# clave DB -> {"programada", "version", "hechos": {paso: valor}, "paso", "activo", "error"}
+_ESTADO: dict[str, dict] = {}
+
+
+def _clave() -> str:
+    import db.sqlite_store as store
+
+    return str(Path(store.DB_FILE).resolve())
+
+
+def filtros_por_defecto(gf: dict | None) -> bool:
+    """True si los filtros globales son los de arranque (todo el país, todos los años)."""
+    gf = gf or {}
+    return not gf.get("ccte") and not gf.get("provincia") and str(gf.get("anio") or "Todos") == "Todos"
+
+
+# ============================================================
+# Pasos
+# ============================================================
+def _kpis_inicio(tabla: pd.DataFrame):
+    from db.columnas import seleccion_global
+    from db.hotspots import leer_ranking
+    from processing.agregados import kpis_inicio
+
+    df = tabla.copy()
+    df["Resultado"] = pd.to_numeric(df.get("Resultado"), errors="coerce")
+    return kpis_inicio(df, seleccion_global(tabla, FILTROS_TODOS), leer_ranking(FILTROS_TODOS))
+
+
+def _resumen_localidad(tabla: pd.DataFrame):
+    from config import PROCESOS_AGREGADOS, RESUMEN_STREAMING_FILAS
+    from processing.agregados import resumen_por_localidad
+    from processing.streaming import resumen_por_localidad_streaming
+    from utils.time_utils import add_fechahora
+
+    # Mismo camino que 📊 Resumen general sin filtros
+    if len(tabla) >= RESUMEN_STREAMING_FILAS:
+        return resumen_por_localidad_streaming(FILTROS_TODOS, procesos=PROCESOS_AGREGADOS)
+
+    df = tabla.copy()
+    df["Resultado"] = pd.to_numeric(df.get("Resultado"), errors="coerce")
+    df = add_fechahora(df, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
+    resumen = resumen_por_localidad(df)
+    resumen.attrs["fechahora_valida"] = int(df["FechaHora"].notna().sum())
+    resumen.attrs["filas"] = len(df)
+    return resumen
+
+
+def _base_graficos(tabla: pd.DataFrame):
+    from processing.agregados import preparar_base_graficos
+
+    return preparar_base_graficos(tabla.copy())
+
+
+def _cubo_graficos(tabla: pd.DataFrame):
+    from db.cubo import leer_cubo
+
+    return leer_cubo(FILTROS_TODOS)
+
+
+PASOS = {
+    "kpis_inicio": ("KPIs de Inicio", _kpis_inicio),
+    "resumen_localidad": ("resumen por localidad", _resumen_localidad),
+    "base_graficos": ("base de gráficos", _base_graficos),
+    "cubo_graficos": ("agregados de gráficos", _cubo_graficos),
+}
+
+
+def precalentar(clave: str | None = None) -> int | None:
+    """Carga la tabla compartida y arma todos los pasos. Devuelve la data_version usada."""
+    from db.dataset import obtener_tabla_maestra
+    from processing.mapa_calor import programar_mapa_calor
+
+    clave = clave or _clave()
+    with _LOCK:
+        estado = _ESTADO.setdefault(
+            clave, {"programada": None, "version": None, "hechos": {}, "activo": False, "error": None}
+        )
+        estado["paso"] = "tabla maestra"
+
+    tabla = obtener_tabla_maestra()
+    version = tabla.attrs.get("data_version")
+    with _LOCK:
+        estado["version"], estado["hechos"] = version, {}
+    if tabla.empty:
+        return version
+
+    for nombre, (etiqueta, armar) in PASOS.items():
+        with _LOCK:
+            estado["paso"] = etiqueta
+        valor = armar(tabla)
+        with _LOCK:
+            estado["hechos"][nombre] = valor
+
+    # El mapa de exposición sin filtros tiene su propio hilo y su caché en disco
+    programar_mapa_calor(FILTROS_TODOS)
+    return version
+
+
+# ============================================================
+# Programación (en segundo plano) y lectura
+# ============================================================
+def programar_precalentado():
+    """Arranca el precalentado en un hilo aparte si no corre ya y no se programó para la versión actual."""
+    import db.sqlite_store as store
+
+    version = store.leer_data_version()
+    if version is None:
+        return
+
+    clave = _clave()
+    with _LOCK:
+        estado = _ESTADO.get(clave)
+        # Una vez por versión: si falló, no se reintenta en cada rerun
+        if estado is not None and (estado["activo"] or estado["programada"] == version):
+            return
+        estado = _ESTADO[clave] = {
+            "programada": version, "version": None, "hechos": {}, "paso": None, "activo": True, "error": None,
+        }
+
+    def _trabajo():
+        try:
+            precalentar(clave)
+        except Exception as e:
+            # Las páginas calculan por su cuenta, como sin precalentado
+            with _LOCK:
+                estado["error"] = str(e)
+        finally:
+            with _LOCK:
+                estado["activo"], estado["paso"] = False, None
+
+    threading.Thread(target=_trabajo, name="rni-precalentado", daemon=True).start()
+
+
+def estado_precalentado() -> dict | None:
+    """{"activo", "paso", "hechos" (cantidad), "total", "version", "error"} o None si nunca corrió."""
+    with _LOCK:
+        estado = _ESTADO.get(_clave())
+        if estado is None:
+            return None
+        return {
+            "activo": estado["activo"],
+            "paso": estado.get("paso"),
+            "hechos": len(estado["hechos"]),
+            "total": len(PASOS),
+            "version": estado["version"],
+            "error": estado["error"],
+        }
+
+
+def leer_precalentado(nombre: str, version: int | None):
+    """Resultado del paso `nombre` si se armó con esa data_version; None si no."""
+    if version is None:
+        return None
+    with _LOCK:
+        estado = _ESTADO.get(_clave())
+        if estado is None or estado["version"] != version:
+            return None
+        return estado["hechos"].get(nombre)
+
+
+def esperando(nombre: str, version: int | None) -> bool:
+    """True si el hilo está armando (o por armar) ese paso para esa versión: conviene esperarlo."""
+    with _LOCK:
+        estado = _ESTADO.get(_clave())
+        if estado is None or not estado["activo"] or estado["error"]:
+            return False
+        if estado["version"] is not None and estado["version"] != version:
+            return False
+        return nombre not in estado["hechos"]
@@ -0,0 +1,322 @@
+"""
+Agregados por grupo recorriendo las mediciones por bloques (sin la tabla entera en memoria).
+
+Cada bloque (db.sqlite_store.iter_mediciones_chunks: SQLite o particiones Parquet)
+se reduce a agregados parciales por grupo que se combinan con los acumulados:
+
+  Mediciones / Con_resultado   suma de conteos
+  Inicio / Fin                 mínimo / máximo de FechaHora
+  fila del máximo              la de mayor Resultado (en empate, la primera leída)
+  distintos (Expediente, ...)  pares (grupo, valor) sin repetir
+  tiempo trabajado             mín/máx de FechaHora por (grupo, archivo, día); al
+                               final se suma (fin - inicio), como
+                               calcular_tiempo_total_por_archivo
+
+La memoria pico depende de la cantidad de grupos (y de archivo-día), no de filas.
+Como los parciales se combinan igual vengan de un bloque o de otro proceso, con
+procesos > 1 cada CCTE (o provincia) se agrega en un proceso aparte y los
+resultados se combinan en orden de partición: mismo resultado que en serie.
+"""
+from __future__ import annotations
+
+import pandas as pd
+
+from utils.time_utils import add_fechahora, format_timedelta_long
+
+CHUNK_FILAS = 50_000
+
+# Columnas que se guardan de la fila del máximo de cada grupo
+COLUMNAS_MAXIMO = ["Resultado", "FechaHora", "Fecha", "Hora", "Nombre Archivo", "Expediente", "Sonda", "Lat", "Lon"]
+
+# Claves derivadas de FechaHora (además de cualquier columna de la tabla)
+CLAVES_FECHA = ("Dia", "Mes")
+
+
+def _texto(s: pd.Series) -> pd.Series:
+    # Claves como object: los bloques pueden traer categorías distintas
+    return s.astype(object).where(s.notna(), None)
+
+
+class AgregadoStreaming:
+    """
+    Acumula bloques con agregar() (o parciales de otro proceso con combinar()) y
+    devuelve una fila por grupo con resultado().
+    """
+
+    def __init__(self, por: list[str], distintos: tuple[str, ...] = ("Expediente", "Sonda")):
+        self.por = list(por)
+        self.distintos = tuple(distintos)
+        self.filas = 0
+        self._base: pd.DataFrame | None = None
+        self._maximo: pd.DataFrame | None = None
+        self._valores: dict[str, pd.DataFrame] = {}
+        self._tramos: pd.DataFrame | None = None
+
+    # ------------------------------------------------------------
+    def _preparar(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        d = add_fechahora(chunk, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
+        d["Resultado"] = pd.to_numeric(d.get("Resultado"), errors="coerce")
+        if "Dia" in self.por:
+            d["Dia"] = _texto(d["FechaHora"].dt.date)
+        if "Mes" in self.por:
+            d["Mes"] = _texto(d["FechaHora"].dt.strftime("%Y-%m"))
+        for c in self.por + [c for c in ("Nombre Archivo", *self.distintos) if c in d.columns]:
+            if c not in CLAVES_FECHA:
+                d[c] = _texto(d[c])
+        return d
+
+    def agregar(self, chunk: pd.DataFrame):
+        """Suma un bloque de mediciones (columnas de la tabla maestra) a los acumulados."""
+        if chunk is None or chunk.empty:
+            return
+        d = self._preparar(chunk)
+        por = self.por
+
+        parcial = AgregadoStreaming(por, self.distintos)
+        parcial.filas = len(d)
+        parcial._base = d.groupby(por, dropna=False, sort=False).agg(
+            Mediciones=("Resultado", "size"),
+            Con_resultado=("Resultado", "count"),
+            Inicio=("FechaHora", "min"),
+            Fin=("FechaHora", "max"),
+        ).reset_index()
+
+        validas = d.dropna(subset=["Resultado"])
+        if not validas.empty:
+            cols = por + [c for c in COLUMNAS_MAXIMO if c in validas.columns and c not in por]
+            idx = validas.groupby(por, dropna=False, sort=False)["Resultado"].idxmax()
+            parcial._maximo = validas.loc[idx, cols]
+
+        for col in self.distintos:
+            if col in d.columns:
+                parcial._valores[col] = d[por + [col]].dropna(subset=[col]).drop_duplicates()
+
+        # Tiempo trabajado: mín/máx por (grupo, archivo, día); sin FechaHora no cuenta
+        con_fh = d.dropna(subset=["FechaHora"])
+        if not con_fh.empty:
+            parcial._tramos = con_fh.assign(_Dia=con_fh["FechaHora"].dt.normalize()).groupby(
+                self._claves_tramo(con_fh.columns)
+            ).agg(t0=("FechaHora", "min"), t1=("FechaHora", "max")).reset_index()
+
+        self.combinar(parcial)
+
+    def _claves_tramo(self, columnas, por: list[str] | None = None) -> list[str]:
+        por = self.por if por is None else por
+        return por + (["Nombre Archivo"] if "Nombre Archivo" in columnas else []) + ["_Dia"]
+
+    # ------------------------------------------------------------
+    def combinar(self, otro: "AgregadoStreaming"):
+        """Suma los acumulados de `otro` (mismo `por`); en empates de máximo gana lo ya acumulado."""
+        por = self.por
+        self.filas += otro.filas
+
+        if otro._base is not None:
+            self._base = otro._base if self._base is None else (
+                pd.concat([self._base, otro._base], ignore_index=True)
+                .groupby(por, dropna=False, sort=False)
+                .agg(Mediciones=("Mediciones", "sum"), Con_resultado=("Con_resultado", "sum"),
+                     Inicio=("Inicio", "min"), Fin=("Fin", "max"))
+                .reset_index()
+            )
+
+        if otro._maximo is not None:
+            maximo = otro._maximo if self._maximo is None else pd.concat([self._maximo, otro._maximo], ignore_index=True)
+            self._maximo = (
+                maximo.sort_values("Resultado", ascending=False, kind="stable")
+                .drop_duplicates(por, keep="first")
+                .reset_index(drop=True)
+            )
+
+        for col, pares in otro._valores.items():
+            if col in self._valores:
+                pares = pd.concat([self._valores[col], pares], ignore_index=True).drop_duplicates()
+            self._valores[col] = pares.reset_index(drop=True)
+
+        if otro._tramos is not None:
+            tramos = otro._tramos
+            if self._tramos is not None:
+                tramos = (
+                    pd.concat([self._tramos, tramos], ignore_index=True)
+                    .groupby(self._claves_tramo(tramos.columns))
+                    .agg(t0=("t0", "min"), t1=("t1", "max"))
+                    .reset_index()
+                )
+            self._tramos = tramos
+
+    # ------------------------------------------------------------
+    def resultado(self, por: list[str] | None = None) -> pd.DataFrame:
+        """
+        Una fila por grupo: Mediciones, Con_resultado, Inicio, Fin, Tiempo (timedelta),
+        Max_<col> de la fila del máximo y <col>_distintos (texto "a, b, c").
+        Con `por` (subconjunto de las claves) se devuelve el rollup a esas claves.
+        """
+        por = self.por if por is None else list(por)
+        if not set(por) <= set(self.por):
+            raise ValueError(f"Las claves {por} no están entre las acumuladas {self.por}")
+        if self._base is None:
+            return pd.DataFrame(columns=por + ["Mediciones", "Con_resultado", "Inicio", "Fin", "Tiempo"])
+
+        out = self._base
+        if por != self.por:
+            out = out.groupby(por, dropna=False, sort=False).agg(
+                Mediciones=("Mediciones", "sum"), Con_resultado=("Con_resultado", "sum"),
+                Inicio=("Inicio", "min"), Fin=("Fin", "max"),
+            ).reset_index()
+        out = out.copy()
+
+        if self._maximo is not None:
+            maximo = self._maximo
+            if por != self.por:
+                maximo = (
+                    maximo.sort_values("Resultado", ascending=False, kind="stable")
+                    .drop_duplicates(por, keep="first")
+                    .drop(columns=[c for c in self.por if c not in por])
+                )
+            out = out.merge(
+                maximo.rename(columns={c: f"Max_{c}" for c in maximo.columns if c not in por}),
+                on=por, how="left",
+            )
+        else:
+            out["Max_Resultado"] = float("nan")
+
+        for col, pares in self._valores.items():
+            textos = pares[por + [col]].drop_duplicates().groupby(por, dropna=False, sort=False)[col].agg(
+                lambda x: ", ".join(sorted(set(str(v) for v in x)))
+            )
+            out = out.merge(textos.rename(f"{col}_distintos").reset_index(), on=por, how="left")
+            out[f"{col}_distintos"] = out[f"{col}_distintos"].fillna("")
+
+        out["Tiempo"] = pd.Timedelta(0)
+        if self._tramos is not None:
+            tramos = self._tramos
+            if por != self.por:
+                tramos = tramos.groupby(self._claves_tramo(tramos.columns, por)).agg(
+                    t0=("t0", "min"), t1=("t1", "max")
+                ).reset_index()
+            dur = (tramos["t1"] - tramos["t0"]).rename("Tiempo")
+            tiempo = pd.concat([tramos[por], dur], axis=1).groupby(por).agg(Tiempo=("Tiempo", "sum")).reset_index()
+            out = out.drop(columns="Tiempo").merge(tiempo, on=por, how="left")
+            out["Tiempo"] = out["Tiempo"].fillna(pd.Timedelta(0))
+        # Orden e índice fijos: no dependen del orden en que se combinaron los parciales
+        return out.sort_values(por, kind="stable", na_position="last").reset_index(drop=True)
+
+
+# ============================================================
+# Recorrido de la DB (en serie o repartido en procesos)
+# ============================================================
+def acumular(por, gf, chunksize=CHUNK_FILAS, distintos=("Expediente", "Sonda")) -> AgregadoStreaming:
+    """Recorre en serie las mediciones de `gf` (store.DB_FILE) y las acumula."""
+    import db.sqlite_store as store
+
+    agg = AgregadoStreaming(por, distintos=distintos)
+    for chunk in store.iter_mediciones_chunks(gf, chunksize=chunksize):
+        agg.agregar(chunk)
+    return agg
+
+
+def _particiones(gf: dict | None, columna: str) -> list[str] | None:
+    """Valores de `columna` con los filtros; None si hay filas sin valor (no se pueden repartir)."""
+    import db.sqlite_store as store
+    from config import TABLE_NAME
+
+    where, params = store.sql_where_from_filters(gf)
+    conn = store.conectar_lectura()
+    try:
+        valores = [r[0] for r in conn.execute(f"SELECT DISTINCT {columna} FROM {TABLE_NAME} {where}", params)]
+    finally:
+        conn.close()
+    if any(v is None or str(v) == "" for v in valores):
+        return None
+    return sorted(str(v) for v in valores)
+
+
+def agregar_por_bloques(por: list[str], gf: dict | None = None, chunksize: int = CHUNK_FILAS,
+                        distintos: tuple[str, ...] = ("Expediente", "Sonda"),
+                        procesos: int = 1, particion: str = "CCTE") -> AgregadoStreaming:
+    """
+    AgregadoStreaming sobre las mediciones de los filtros globales, leídas de a `chunksize`.
+    Con procesos > 1 se reparte por `particion` ("CCTE" o "Provincia") en el pool de
+    processing.pool_agregados (se arma una vez y se reutiliza).
+    """
+    import db.sqlite_store as store
+
+    if not store.DB_FILE.exists():
+        return AgregadoStreaming(por, distintos=distintos)
+
+    clave = {"CCTE": "ccte", "Provincia": "provincia"}[particion]
+    partes = _particiones(gf, particion) if procesos > 1 else None
+    if not partes or len(partes) < 2:
+        return acumular(por, gf, chunksize, distintos)
+
+    from processing.pool_agregados import repartir
+
+    gf = dict(gf or {})
+    parciales = repartir(
+        por, [{**gf, clave: [p]} for p in partes], chunksize, distintos, store.DB_FILE, procesos,
+    )
+    # En orden de partición (no de llegada): el resultado no depende de qué proceso termina antes
+    agg = AgregadoStreaming(por, distintos=distintos)
+    for parcial in parciales:
+        agg.combinar(parcial)
+    return agg
+
+
+def resumen_por_localidad_streaming(gf: dict | None = None, chunksize: int = CHUNK_FILAS,
+                                    procesos: int = 1) -> pd.DataFrame:
+    """Mismo resultado que agregados.resumen_por_localidad, sin cargar la tabla."""
+    from processing.agregados import vm_a_pct
+
+    por = ["CCTE", "Provincia", "Localidad"]
+    agg = agregar_por_bloques(por, gf, chunksize=chunksize, procesos=procesos)
+    r = agg.resultado()
+
+    resumen = pd.DataFrame({
+        **{c: r[c] for c in por},
+        "Mediciones": r["Mediciones"].astype("int64"),
+        "Resultado Max (V/m)": r["Max_Resultado"],
+        "Inicio": pd.to_datetime(r["Inicio"], errors="coerce"),
+        "Fin": pd.to_datetime(r["Fin"], errors="coerce"),
+        "Resultado Max (%)": vm_a_pct(r["Max_Resultado"]),
+        "N° Expediente": r.get("Expediente_distintos", ""),
+        "Sonda utilizada": r.get("Sonda_distintos", ""),
+        "Tiempo trabajado": [format_timedelta_long(t.to_pytimedelta()) for t in r["Tiempo"]],
+    })
+    resumen = resumen.sort_values(
+        ["Resultado Max (%)", "Resultado Max (V/m)"], ascending=False, kind="stable"
+    ).reset_index(drop=True)
+    resumen.attrs["filas"] = agg.filas
+    return resumen
+
+
+def resumenes_gestion_streaming(gf: dict | None = None, chunksize: int = CHUNK_FILAS,
+                                procesos: int = 1) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (diario, mensual) con las mismas columnas que agregados.calcular_resumen_diario /
+    calcular_resumen_mensual, en una pasada: se agrega por (Mes, Dia) y el mensual
+    es el rollup a Mes. Solo cuentan filas con FechaHora válida, como en Gestión.
+    """
+    from processing.agregados import _hours
+
+    agg = agregar_por_bloques(["Mes", "Dia"], gf, chunksize=chunksize, distintos=("Localidad",), procesos=procesos)
+
+    d = agg.resultado().dropna(subset=["Dia"]).sort_values("Dia")
+    diario = pd.DataFrame({
+        "Fecha de medición": d["Dia"].to_numpy(),
+        "Hora de inicio": d["Inicio"].dt.strftime("%H:%M:%S").fillna("-").to_numpy(),
+        "Hora de fin": d["Fin"].dt.strftime("%H:%M:%S").fillna("-").to_numpy(),
+        "Tiempo total trabajado": [format_timedelta_long(t.to_pytimedelta()) for t in d["Tiempo"]],
+        "Cantidad de puntos medidos": d["Mediciones"].astype("int64").to_numpy(),
+        "Localidades trabajadas (por día)": d.get("Localidad_distintos", pd.Series("", index=d.index)).to_numpy(),
+    })
+
+    m = agg.resultado(por=["Mes"]).dropna(subset=["Mes"]).sort_values("Mes")
+    mensual = pd.DataFrame({
+        "Mes": m["Mes"].to_numpy(),
+        "Hora inicio": m["Inicio"].to_numpy(),
+        "Hora fin": m["Fin"].to_numpy(),
+        "Localidades trabajadas": m.get("Localidad_distintos", pd.Series("", index=m.index)).to_numpy(),
+        "Cantidad puntos": m["Con_resultado"].astype("int64").to_numpy(),
+        "Horas trabajadas num": [_hours(t.to_pytimedelta()) for t in m["Tiempo"]],
+        "Horas trabajadas": [format_timedelta_long(t.to_pytimedelta()) for t in m["Tiempo"]],
+    })
+    return diario, mensual
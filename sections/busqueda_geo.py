@@ -0,0 +1,68 @@
+import pandas as pd
+import streamlit as st
+
+from db.geo import cercanas, en_caja
+from sections.tabla_paginada import render_tabla_paginada
+from utils.perfilado import fragmento
+
+# Tope de filas con detalle (la cantidad total dentro del área se informa igual)
+MAX_FILAS_DETALLE = 5_000
+
+
+def _centro(df_localidad: pd.DataFrame | None) -> tuple[float, float]:
+    """Centro por defecto: mediana de las coordenadas de la localidad elegida (o CABA)."""
+    if df_localidad is not None and not df_localidad.empty and {"Lat", "Lon"}.issubset(df_localidad.columns):
+        lat = pd.to_numeric(df_localidad["Lat"], errors="coerce")
+        lon = pd.to_numeric(df_localidad["Lon"], errors="coerce")
+        if lat.notna().any() and lon.notna().any():
+            return float(lat.median()), float(lon.median())
+    return -34.6037, -58.3816
+
+
+@fragmento("cerca de un punto")
+def render_busqueda_cercania(df_localidad: pd.DataFrame | None = None):
+    # ============================================================
+    # 📍 MEDICIONES CERCA DE UN PUNTO (índice espacial)
+    # ============================================================
+    with st.expander("📍 Mediciones cerca de un punto / dentro de un área", expanded=False):
+        st.caption(
+            "Busca en toda la base (sin filtros globales) usando el índice espacial. "
+            "Coordenadas en grados decimales; el signo no importa (se toman sur y oeste)."
+        )
+
+        modo = st.radio("Buscar", ["Radio alrededor de un punto", "Caja Lat/Lon"], horizontal=True, key="geo_modo")
+        lat0, lon0 = _centro(df_localidad)
+
+        if modo.startswith("Radio"):
+            c1, c2, c3 = st.columns(3)
+            lat = c1.number_input("Latitud", value=lat0, format="%.6f", key="geo_lat")
+            lon = c2.number_input("Longitud", value=lon0, format="%.6f", key="geo_lon")
+            radio = c3.number_input("Radio (m)", min_value=10, max_value=100_000, value=500, step=50, key="geo_radio")
+            res = cercanas(lat, lon, radio, limite=MAX_FILAS_DETALLE)
+            ambito = f"a menos de {int(radio):,} m".replace(",", ".")
+        else:
+            c1, c2, c3, c4 = st.columns(4)
+            lat_min = c1.number_input("Lat mín", value=lat0 - 0.01, format="%.6f", key="geo_lat_min")
+            lat_max = c2.number_input("Lat máx", value=lat0 + 0.01, format="%.6f", key="geo_lat_max")
+            lon_min = c3.number_input("Lon mín", value=lon0 - 0.01, format="%.6f", key="geo_lon_min")
+            lon_max = c4.number_input("Lon máx", value=lon0 + 0.01, format="%.6f", key="geo_lon_max")
+            res = en_caja(lat_min, lat_max, lon_min, lon_max, limite=MAX_FILAS_DETALLE)
+            ambito = "dentro de la caja"
+
+        if res.empty:
+            st.info(f"No hay mediciones {ambito}.")
+            return
+
+        total = res.attrs.get("total", len(res))
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Mediciones", f"{total:,}".replace(",", "."))
+        m2.metric("Máximo (%)", f"{res['Resultado %'].max():.2f}")
+        m3.metric("Expedientes", f"{res['Expediente'].nunique():,}".replace(",", "."))
+        if total > len(res):
+            st.caption(
+                f"Detalle de las {len(res):,} {'más cercanas' if modo.startswith('Radio') else 'de mayor Resultado'} "
+                f"(de {total:,}).".replace(",", ".")
+            )
+
+        st.map(res.rename(columns={"Lat": "lat", "Lon": "lon"})[["lat", "lon"]], size=4)
+        render_tabla_paginada(res.drop(columns=["medicion_id"]), key="geo_tabla", tamanio=25, hide_index=True)
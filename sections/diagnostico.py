@@ -2,30 +2,26 @@
 from __future__ import annotations
 
 import sqlite3
-from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 
-
-# ============================================================
-# DB: toma la ruta real si existe en sqlite_store, si no fallback
-# ============================================================
-try:
-    from db.sqlite_store import DB_FILE as _DB_FILE, TABLE_NAME as _TABLE_NAME
-    DB_FILE = Path(_DB_FILE)
-    TABLE_NAME = str(_TABLE_NAME)
-except Exception:
-    DB_FILE = Path("archivosdata") / "rni.db"
-    TABLE_NAME = "mediciones_rni"
+from config import DB_FILE, TABLE_NAME
+from db.hotspots import leer_ranking
+from db.schema import FACT_TABLE
+from db.particiones import leer_manifiesto, podar
+from db.sqlite_store import conectar_lectura, leer_data_version, memoria_por_columna, sql_where_from_filters
+from processing.agregados import vm_a_pct
+from utils.perfilado import perfilado, registrar_filas
 
 
 # ============================================================
 # Helpers DB
 # ============================================================
 def _table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
-    q = "SELECT name FROM sqlite_master WHERE type='table' AND name=?;"
+    # mediciones_rni es una vista sobre el esquema estrella
+    q = "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name=?;"
     cur = conn.execute(q, (table_name,))
     return cur.fetchone() is not None
 
@@ -39,6 +35,24 @@ def _safe_scalar(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> int
         return None
 
 
+def _estado_coordenadas(conn: sqlite3.Connection, where: str, params: tuple) -> pd.DataFrame:
+    """Filas por nota de normalización de coordenadas (Estado, Valida, Filas); vacío si la DB es vieja."""
+    filtro = f"WHERE id IN (SELECT id FROM {TABLE_NAME} {where})" if where else ""
+    try:
+        return pd.read_sql(
+            f"""
+            SELECT COALESCE(coord_nota, 'ok') AS Estado, coord_valida AS Valida, COUNT(*) AS Filas
+            FROM {FACT_TABLE} {filtro}
+            GROUP BY 1, 2
+            ORDER BY Filas DESC
+            """,
+            conn,
+            params=params if where else (),
+        )
+    except Exception:
+        return pd.DataFrame(columns=["Estado", "Valida", "Filas"])
+
+
 # ============================================================
 # Parseo suelto SOLO para diagnóstico de “parseabilidad”
 # (No es para cálculo de horas; eso lo hace time_utils)
@@ -113,44 +127,13 @@ def _sql_where_from_global_filters() -> tuple[str, tuple]:
     Arma WHERE SQL + params según filtros globales (si existen).
     Compatible con columnas textuales.
     """
-    gf = _try_get_global_filters()
-
-    clauses = []
-    params: list = []
-
-    # CCTE
-    cctes = gf.get("ccte") or []
-    if cctes:
-        placeholders = ",".join(["?"] * len(cctes))
-        clauses.append(f"CCTE IN ({placeholders})")
-        params.extend([str(x) for x in cctes])
-
-    # Provincia
-    provs = gf.get("provincia") or []
-    if provs:
-        placeholders = ",".join(["?"] * len(provs))
-        clauses.append(f"Provincia IN ({placeholders})")
-        params.extend([str(x) for x in provs])
-
-    # Año (si Fecha está dd/mm/yyyy o yyyy-mm-dd)
-    anio = gf.get("anio", "Todos")
-    if anio != "Todos":
-        # Intento simple: matchear por substring del año
-        # dd/mm/yyyy -> termina en yyyy
-        # yyyy-mm-dd -> empieza con yyyy
-        clauses.append("(Fecha LIKE ? OR Fecha LIKE ?)")
-        params.extend([f"%/{anio}", f"{anio}-%"])
-
-    where = ""
-    if clauses:
-        where = "WHERE " + " AND ".join(clauses)
-
-    return where, tuple(params)
+    return sql_where_from_filters(_try_get_global_filters())
 
 
 # ============================================================
 # UI principal
 # ============================================================
+@perfilado("render_diagnostico")
 def render_diagnostico():
     st.header("🧪 Diagnóstico / Salud de datos")
     st.caption(_filters_caption())
@@ -159,7 +142,7 @@ def render_diagnostico():
         st.warning(f"No encuentro la base en: {DB_FILE}")
         return
 
-    conn = sqlite3.connect(str(DB_FILE))
+    conn = conectar_lectura()  # solo lectura: no espera a los escritores (WAL)
     try:
         if not _table_exists(conn, TABLE_NAME):
             st.warning(f"La tabla '{TABLE_NAME}' no existe dentro de {DB_FILE.name}.")
@@ -172,6 +155,7 @@ def render_diagnostico():
         if int(total_rows) == 0:
             st.info("La tabla existe, pero con los filtros actuales quedó vacía.")
             return
+        registrar_filas(int(total_rows))
 
         distinct_loc = _safe_scalar(conn, f"SELECT COUNT(DISTINCT Localidad) FROM {TABLE_NAME} {where};", params) or 0
         distinct_prov = _safe_scalar(conn, f"SELECT COUNT(DISTINCT Provincia) FROM {TABLE_NAME} {where};", params) or 0
@@ -238,11 +222,6 @@ def render_diagnostico():
             lat = pd.to_numeric(sample.get("Lat"), errors="coerce")
             lon = pd.to_numeric(sample.get("Lon"), errors="coerce")
 
-            # rango amplio para no “castigar” cargas que vengan positivas
-            lat_ok = lat.notna() & ((lat.between(-60, -15)) | (lat.abs().between(15, 60)))
-            lon_ok = lon.notna() & ((lon.between(-80, -40)) | (lon.abs().between(40, 80)))
-            pct_coords_ok = float((lat_ok & lon_ok).mean() * 100.0)
-
             res = pd.to_numeric(sample.get("Resultado"), errors="coerce")
             pct_res_ok = float(res.notna().mean() * 100.0)
 
@@ -251,9 +230,13 @@ def render_diagnostico():
             if not tmp.empty:
                 dup_coords = int(tmp.duplicated().sum())
         else:
-            pct_dt_ok = pct_coords_ok = pct_res_ok = 0.0
+            pct_dt_ok = pct_res_ok = 0.0
             dup_coords = 0
 
+        # Coordenadas: la validez se decide al cargar (bandera en la tabla de hechos)
+        estados = _estado_coordenadas(conn, where, params)
+        coords_ok = int(estados.loc[estados["Valida"] == 1, "Filas"].sum())
+
         # --- UI KPIs ---
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Registros", f"{int(total_rows):,}".replace(",", "."))
@@ -269,7 +252,7 @@ def render_diagnostico():
 
         c9, c10, c11, c12 = st.columns(4)
         c9.metric("FechaHora parseable (muestra)", f"{pct_dt_ok:.1f}%")
-        c10.metric("Coords válidas (muestra)", f"{pct_coords_ok:.1f}%")
+        c10.metric("Coords válidas (SQL)", f"{(coords_ok/total_rows*100):.1f}%")
         c11.metric("Resultado numérico (muestra)", f"{pct_res_ok:.1f}%")
         c12.metric("Duplicados coords (muestra)", f"{dup_coords:,}".replace(",", "."))
 
@@ -283,29 +266,13 @@ def render_diagnostico():
         # --- TOP 10 localidades por pico ---
         st.subheader("🔥 Top localidades por pico (máximo)")
 
-        top_sql = f"""
-            SELECT
-              CCTE,
-              Provincia,
-              Localidad,
-              MAX(CAST(Resultado AS REAL)) AS max_vm,
-              COUNT(*) AS puntos
-            FROM {TABLE_NAME}
-            {where}
-            {"AND" if where else "WHERE"} Resultado IS NOT NULL AND TRIM(Resultado)<>''
-
-            GROUP BY CCTE, Provincia, Localidad
-            ORDER BY max_vm DESC
-            LIMIT 10;
-        """
-        top = pd.read_sql(top_sql, conn, params=params)
+        # Del índice de hotspots (una fila por localidad, ya ordenado por pico)
+        top = leer_ranking(_try_get_global_filters(), k=10, conn=conn)
         if top.empty:
             st.info("No pude calcular el top (Resultado vacío o no numérico).")
         else:
-            top["max_vm"] = pd.to_numeric(top["max_vm"], errors="coerce")
-            top["Resultado Max (V/m)"] = top["max_vm"].round(2)
-            top["Resultado Max (%)"] = ((top["max_vm"] ** 2) / 3770 / 0.20021 * 100).round(2)
-            top = top.rename(columns={"puntos": "Puntos"})
+            top["Resultado Max (V/m)"] = top["MaxVm"].round(2)
+            top["Resultado Max (%)"] = vm_a_pct(top["MaxVm"]).round(2)
             show = top[["CCTE", "Provincia", "Localidad", "Resultado Max (V/m)", "Resultado Max (%)", "Puntos"]]
             st.dataframe(show, width="stretch", hide_index=True)
 
@@ -320,6 +287,8 @@ def render_diagnostico():
             ("Hora vacía", int(total_rows - nn_hora)),
             ("Lat/Lon vacías", int(total_rows - nn_latlon)),
             ("Hora con AM/PM", int(nn_ampm)),
+        ] + [
+            (f"Coordenadas: {e}", int(n)) for e, n in zip(estados["Estado"], estados["Filas"]) if e != "ok"
         ]
         dfp = pd.DataFrame(problems, columns=["Señal", "Conteo"]).sort_values("Conteo", ascending=False)
         st.dataframe(dfp, width="stretch", hide_index=True)
@@ -328,9 +297,56 @@ def render_diagnostico():
             st.write(
                 "- **FechaHora parseable baja** suele venir de Hora tipo `10:08:09 a.m.` o textos raros.\n"
                 "- **Lat/Lon vacías** → mapa queda vacío o pesado.\n"
+                "- **Coordenadas: ...** → al cargar se corrigen signo y Lat/Lon cruzadas; las de fuera de "
+                "Argentina, ilegibles o en 0,0 quedan sin coordenada (el valor leído se guarda aparte).\n"
                 "- **Muchos duplicados** no está “mal”, pero puede inflar el JSON del mapa si hay miles.\n"
                 "- Para el futuro: al cargar, guardar `FechaHora` en ISO en DB evita dolores de 2026."
             )
 
+        st.markdown("---")
+
+        # --- Particiones (CCTE, año) ---
+        st.subheader("🗂️ Particiones por CCTE y año")
+        man = leer_manifiesto()
+        if man is None:
+            st.info("Todavía no se armaron las particiones (se generan en segundo plano).")
+        else:
+            leidas = {(e["ccte"], e["anio"]) for e in podar(man, _try_get_global_filters())}
+            part = pd.DataFrame([
+                {
+                    "CCTE": e["ccte"],
+                    "Año": e["anio"] or "sin fecha",
+                    "Filas": e["filas"],
+                    "MB": round(e["bytes"] / 1024**2, 2),
+                    "Estado": "congelada" if e["congelada"] else "activa",
+                    "Con filtros": "✅" if (e["ccte"], e["anio"]) in leidas else "",
+                }
+                for e in man["particiones"].values()
+            ]).sort_values(["CCTE", "Año"], key=lambda s: s.astype(str))
+            al_dia = man.get("data_version") == leer_data_version()
+            st.caption(
+                f"{len(leidas)} de {len(part)} particiones se leen con los filtros actuales"
+                + ("" if al_dia else " · ⏳ actualizándose (mientras tanto se lee de SQLite)")
+            )
+            st.dataframe(part, width="stretch", hide_index=True)
+
+        st.markdown("---")
+
+        # --- Memoria de la tabla en sesión ---
+        st.subheader("🧮 Memoria de la tabla en sesión")
+        df_mem = st.session_state.get("tabla_maestra", pd.DataFrame())
+        if df_mem is None or df_mem.empty:
+            st.info("No hay tabla cargada en memoria.")
+        else:
+            mem = memoria_por_columna(df_mem)
+            # Miles con punto y decimales con coma: se intercambian pasando por un comodín
+            total_mb = f"{mem['MB'].sum():,.1f}".replace(",", "_").replace(".", ",").replace("_", ".")
+            filas = f"{len(df_mem):,}".replace(",", ".")
+            st.caption(
+                f"Total: **{total_mb} MB** para {filas} filas "
+                "(textos repetidos como category, Resultado/Lat/Lon en float32)."
+            )
+            st.dataframe(mem, width="stretch", hide_index=True)
+
     finally:
         conn.close()
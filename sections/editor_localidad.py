@@ -1,24 +1,22 @@
-from datetime import datetime
 import pandas as pd
 import streamlit as st
 
-from db.sqlite_store import save_tabla_maestra_to_db
+from db.escritor import ConflictoDeVersion
+from db.repository import delete_localidad, update_localidad_metadata
+from state import sincronizar_tabla_maestra, version_sesion
 
 
 def render_editor_localidad(localidad_seleccionada, df_localidad):
     # -------------------- Edición de información (plegable) --------------------
     if localidad_seleccionada:
-        # >>> CAMBIO SQLITE: aseguramos que FechaCarga sea datetime antes de usar strftime
-        if "FechaCarga" in st.session_state["tabla_maestra"].columns:
-            st.session_state["tabla_maestra"]["FechaCarga"] = pd.to_datetime(
-                st.session_state["tabla_maestra"]["FechaCarga"], errors="coerce"
-            )
-
         ultima_fecha = None
         if "FechaCarga" in st.session_state["tabla_maestra"].columns:
             mask_fecha = st.session_state["tabla_maestra"]["Localidad"] == localidad_seleccionada
             if mask_fecha.any():
-                ultima_fecha = st.session_state["tabla_maestra"].loc[mask_fecha, "FechaCarga"].max()
+                # La tabla es compartida entre sesiones: se convierte una copia, no la columna
+                ultima_fecha = pd.to_datetime(
+                    st.session_state["tabla_maestra"].loc[mask_fecha, "FechaCarga"], errors="coerce"
+                ).max()
 
         expander_title = f"✏️ Editar información de {localidad_seleccionada}"
         if ultima_fecha is not None and pd.notna(ultima_fecha):
@@ -47,38 +45,37 @@ def render_editor_localidad(localidad_seleccionada, df_localidad):
             nueva_localidad = st.text_input("Localidad", value=localidad_actual)
             nuevo_expediente = st.text_input("Expediente", value=expediente_actual)
 
-            if "FechaCarga" not in st.session_state["tabla_maestra"].columns:
-                st.session_state["tabla_maestra"]["FechaCarga"] = pd.NaT
-
             def guardar_cambios():
-                mask = st.session_state["tabla_maestra"]["Localidad"] == localidad_actual
-                st.session_state["tabla_maestra"].loc[mask, "CCTE"] = nuevo_ccte
-                st.session_state["tabla_maestra"].loc[mask, "Provincia"] = nueva_provincia
-                st.session_state["tabla_maestra"].loc[mask, "Localidad"] = nueva_localidad
-                st.session_state["tabla_maestra"].loc[mask, "Expediente"] = nuevo_expediente
-                st.session_state["tabla_maestra"].loc[mask, "FechaCarga"] = datetime.now()
-
+                version_previa = version_sesion()
                 try:
-                    # >>> CAMBIO SQLITE: guardamos en DB
-                    save_tabla_maestra_to_db(st.session_state["tabla_maestra"])
+                    # UPDATE puntual en la DB; la tabla en sesión toma el cambio del log
+                    update_localidad_metadata(
+                        localidad_actual, nuevo_ccte, nueva_provincia, nueva_localidad, nuevo_expediente,
+                        version_esperada=version_previa,
+                    )
+                    sincronizar_tabla_maestra()
                     st.success("Cambios guardados correctamente")
+                except ConflictoDeVersion as e:
+                    sincronizar_tabla_maestra()
+                    st.warning(f"{e} Se recargan los datos.")
                 except Exception as e:
                     st.error(f"No se pudieron guardar los cambios: {e}")
 
             st.button("💾 Guardar cambios", on_click=guardar_cambios)
 
             def eliminar_localidad_cb():
-                mask = st.session_state["tabla_maestra"]["Localidad"] == localidad_actual
-                if mask.any():
-                    st.session_state["tabla_maestra"] = st.session_state["tabla_maestra"].loc[~mask]
-                    try:
-                        # >>> CAMBIO SQLITE: guardamos en DB
-                        save_tabla_maestra_to_db(st.session_state["tabla_maestra"])
-                        st.success(f"Localidad '{localidad_actual}' eliminada correctamente")
-                        st.experimental_rerun()  # recarga la app para reflejar cambios
-                    except Exception as e:
-                        st.error(f"No se pudo eliminar la localidad: {e}")
-                else:
-                    st.warning("No se encontró la localidad para eliminar.")
+                version_previa = version_sesion()
+                try:
+                    borradas = delete_localidad(localidad_actual, version_esperada=version_previa)
+                    sincronizar_tabla_maestra()
+                    if borradas:
+                        st.success(f"Localidad '{localidad_actual}' eliminada correctamente ({borradas} registros)")
+                    else:
+                        st.warning("No se encontró la localidad para eliminar.")
+                except ConflictoDeVersion as e:
+                    sincronizar_tabla_maestra()
+                    st.warning(f"{e} Se recargan los datos.")
+                except Exception as e:
+                    st.error(f"No se pudo eliminar la localidad: {e}")
 
             st.button("🗑️ Eliminar localidad", on_click=eliminar_localidad_cb)
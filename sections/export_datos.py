@@ -0,0 +1,70 @@
+import streamlit as st
+
+from config import EXPORT_DESCARGA_MAX_BYTES
+from processing.exportacion import FORMATOS, MIME_TYPES, exportar_mediciones
+from state import init_global_filters, global_filters_human_label
+from utils.perfilado import fragmento
+
+
+@fragmento("exportar datos")
+def render_export_datos():
+    # ============================================================
+    # ⬇️ EXPORTACIÓN DE MEDICIONES CRUDAS (filtros globales)
+    # ============================================================
+
+    with st.expander("⬇️ Descargar mediciones filtradas (CSV / Parquet / Excel)", expanded=False):
+        st.caption(global_filters_human_label())
+        st.caption(
+            "Se exportan las filas que cumplen los filtros globales, leídas directo de la base "
+            "en bloques (no se arma la tabla completa en memoria). La descarga desde el navegador "
+            f"llega hasta {EXPORT_DESCARGA_MAX_BYTES // (1024 * 1024)} MB por archivo."
+        )
+
+        etiqueta = st.radio("Formato", list(FORMATOS.keys()), horizontal=True, key="export_datos_formato")
+        formato = FORMATOS[etiqueta]
+
+        if st.button("📦 Preparar archivo", key="export_datos_btn"):
+            init_global_filters()
+            gf = st.session_state["global_filters"]
+
+            # Borramos el export anterior de esta sesión para no acumular archivos
+            previo = st.session_state.get("export_datos_path")
+            if previo is not None and previo.exists():
+                try:
+                    previo.unlink()
+                except OSError:
+                    pass
+
+            try:
+                with st.spinner("Exportando mediciones..."):
+                    ruta, filas = exportar_mediciones(gf, formato)
+            except Exception as e:
+                st.error(f"No se pudo exportar: {e}")
+                return
+
+            st.session_state["export_datos_path"] = ruta
+            st.session_state["export_datos_filas"] = filas
+
+        ruta = st.session_state.get("export_datos_path")
+        if ruta is not None and ruta.exists():
+            filas = st.session_state.get("export_datos_filas", 0)
+            tamanio = ruta.stat().st_size
+            mb = f"{tamanio / (1024 * 1024):.1f}".replace(".", ",")
+            st.success(f"Archivo listo: {filas:,} filas".replace(",", ".") + f" ({mb} MB).")
+            if tamanio > EXPORT_DESCARGA_MAX_BYTES:
+                # El botón lo cargaría entero en la memoria del servidor (uno por descarga)
+                st.warning(
+                    f"El archivo supera el tope de descarga desde el navegador "
+                    f"({EXPORT_DESCARGA_MAX_BYTES // (1024 * 1024)} MB): quedó en el servidor en "
+                    f"`{ruta}`. Para bajarlo desde acá, acotá los filtros globales o elegí Parquet "
+                    "(comprimido)."
+                )
+                return
+            with open(ruta, "rb") as f:
+                st.download_button(
+                    label=f"⬇️ Descargar {ruta.name}",
+                    data=f,
+                    file_name=ruta.name,
+                    mime=MIME_TYPES.get(ruta.suffix.lstrip("."), "application/octet-stream"),
+                    key="export_datos_download",
+                )
@@ -13,9 +13,15 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RL
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
 
+from processing.agregados import vm_a_pct
+from processing.mapa_calor import leer_mapa_calor, png_para_informe, programar_mapa_calor
+from state import version_sesion
 from utils.time_utils import calcular_tiempo_total_por_archivo, format_timedelta_long
+from utils.perfilado import fragmento, perfilado, registrar_filas
 
 
+@fragmento("informe PDF / Word")
+@perfilado("render_export_informes")
 def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionada, titulo_scope):
     # ============================================================
     # 🖨️ EXPORTACIÓN DE INFORMES PDF / WORD
@@ -32,6 +38,8 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
             if df_export.empty:
                 df_export = st.session_state["tabla_maestra"].copy()
 
+            registrar_filas(len(df_export))
+
             # ========= ESTADÍSTICAS PARA EL RELATO =========
             df_export["Resultado"] = pd.to_numeric(df_export.get("Resultado", np.nan), errors="coerce")
 
@@ -41,7 +49,7 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
             fecha_hora_max = None
 
             if pd.notna(max_resultado):
-                max_resultado_pct = max_resultado**2 / 3770 / 0.20021 * 100
+                max_resultado_pct = vm_a_pct(max_resultado)
 
                 fila_max = df_export.loc[df_export["Resultado"].idxmax()]
                 localidad_max = fila_max.get("Localidad", "N/D")
@@ -107,7 +115,7 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
             # ========= TABLA DE EXPEDIENTES =========
             expedientes_df = pd.DataFrame()
             if "Expediente" in df_export.columns:
-                expedientes_df = df_export.groupby("Expediente").agg(
+                expedientes_df = df_export.groupby("Expediente", observed=True).agg(
                     Cantidad_puntos=("Resultado", "count"),
                     CCTE=("CCTE", lambda x: ", ".join(sorted(x.dropna().unique()))),
                     Provincias=("Provincia", lambda x: ", ".join(sorted(x.dropna().unique()))),
@@ -121,7 +129,7 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
             if {"Provincia", "CCTE", "Localidad"}.issubset(df_graf_export.columns):
                 resumen_export = (
                     df_graf_export
-                    .groupby(["Provincia", "CCTE"])["Localidad"]
+                    .groupby(["Provincia", "CCTE"], observed=True)["Localidad"]
                     .nunique()
                     .reset_index(name="CantidadLocalidades")
                 )
@@ -150,6 +158,20 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
                 localidad_nombre = localidad_seleccionada or "General"
                 fecha_str = datetime.now().strftime("%Y%m%d_%H%M")
 
+                # Mapa de exposición precalculado (filtros globales); si no está listo, se omite
+                mapa_calor = None
+                gf = st.session_state.get("global_filters")
+                if version_sesion() is not None:
+                    mapa_calor = leer_mapa_calor(gf, version_sesion())
+                    if mapa_calor is None:
+                        programar_mapa_calor(gf)
+                    elif not mapa_calor.get("celdas"):
+                        mapa_calor = None
+                leyenda_mapa = (
+                    f"Panorama de exposición: máximo % por celda de ~{mapa_calor['km_celda']} km "
+                    f"(filtros globales, colores del semáforo)." if mapa_calor else ""
+                )
+
                 # ============================================================
                 # 🧾 WORD (sin header azul, con logo y tablas)
                 # ============================================================
@@ -206,6 +228,10 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
                         doc.add_picture(img_bytes, width=Inches(5.5))
                         doc.add_paragraph("Gráfico de Localidades por Provincia y CCTE (ámbito del informe).")
 
+                    if mapa_calor:
+                        doc.add_picture(png_para_informe(mapa_calor), width=Inches(5.5))
+                        doc.add_paragraph(leyenda_mapa)
+
                     # --- Desglose por mes (tabla) ---
                     if not resumen_mensual_export.empty:
                         doc.add_heading("Desglose por mes", level=2)
@@ -331,6 +357,13 @@ def render_export_informes(df_localidad, df_filtrado_prov, localidad_seleccionad
                         story.append(Paragraph("Gráfico de Localidades por Provincia y CCTE (ámbito del informe)", styles["Italic"]))
                         story.append(Spacer(1, 16))
 
+                    if mapa_calor:
+                        img_mapa = png_para_informe(mapa_calor)
+                        ancho, alto = mapa_calor.get("ancho"), mapa_calor.get("alto")
+                        story.append(RLImage(img_mapa, width=400, height=400 * alto / ancho if ancho and alto else 400))
+                        story.append(Paragraph(leyenda_mapa, styles["Italic"]))
+                        story.append(Spacer(1, 16))
+
                     # Desglose mensual (en texto)
                     if not resumen_mensual_export.empty:
                         story.append(Paragraph("<b>Desglose por mes</b>", style_sub))
@@ -1,17 +1,37 @@
 import pandas as pd
 import streamlit as st
 
+from config import PROCESOS_AGREGADOS, RESUMEN_STREAMING_FILAS
+from db.columnas import seleccion
+from processing.agregados import calcular_resumen_diario, calcular_resumen_mensual, vm_a_pct
+from processing.streaming import resumenes_gestion_streaming
+from sections.tabla_paginada import render_tabla_paginada
 from utils.time_utils import (
     calcular_tiempo_total_por_archivo,
     format_timedelta_long,
     add_fechahora,
 )
+from state import version_sesion
+from utils.perfilado import perfilado, registrar_filas
 
 
+def _resumenes_por_bloques(gf: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Diario y mensual de todo el país desde la DB (pool de procesos); en sesión por (filtros, data_version)."""
+    clave = (repr(sorted(gf.items())), version_sesion())
+    guardado = st.session_state.get("_gestion_streaming")
+    if guardado is not None and guardado[0] == clave:
+        return guardado[1]
+    resumenes = resumenes_gestion_streaming(gf, procesos=PROCESOS_AGREGADOS)
+    st.session_state["_gestion_streaming"] = (clave, resumenes)
+    return resumenes
+
+
+@perfilado("render_gestion_localidades")
 def render_gestion_localidades():
     st.header("📊 Gestión de Localidades")
 
-    df_base = st.session_state.get("tabla_maestra", pd.DataFrame()).copy()
+    # Solo lectura: la tabla compartida no se modifica, los filtros arman frames nuevos
+    df_base = st.session_state.get("tabla_maestra", pd.DataFrame())
 
     columnas_necesarias = {"CCTE", "Provincia", "Localidad"}
     if df_base.empty or not columnas_necesarias.issubset(df_base.columns):
@@ -23,30 +43,29 @@ def render_gestion_localidades():
         localidad_seleccionada = ""
         provincia_filtro = "Todas"
         ccte_filtro = "Todos"
+        año_filtro = "Todos"
     else:
         col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
 
         with col1:
             lista_ccte = sorted(df_base["CCTE"].dropna().unique().tolist())
             ccte_filtro = st.selectbox("Filtrar CCTE", ["Todos"] + lista_ccte, key="gestion_ccte")
-            df_filtrado_ccte = df_base.copy() if ccte_filtro == "Todos" else df_base[df_base["CCTE"] == ccte_filtro].copy()
+            df_filtrado_ccte = df_base if ccte_filtro == "Todos" else df_base[df_base["CCTE"] == ccte_filtro]
 
         with col2:
             lista_prov = sorted(df_filtrado_ccte["Provincia"].dropna().unique().tolist())
             provincia_filtro = st.selectbox("Filtrar Provincia", ["Todas"] + lista_prov, key="gestion_provincia")
-            df_filtrado_prov = df_filtrado_ccte.copy() if provincia_filtro == "Todas" else df_filtrado_ccte[df_filtrado_ccte["Provincia"] == provincia_filtro].copy()
+            df_filtrado_prov = df_filtrado_ccte if provincia_filtro == "Todas" else df_filtrado_ccte[df_filtrado_ccte["Provincia"] == provincia_filtro]
 
         with col4:
             año_filtro = "Todos"
             if not df_filtrado_prov.empty and "Fecha" in df_filtrado_prov.columns:
                 _años = pd.to_datetime(df_filtrado_prov["Fecha"], dayfirst=True, errors="coerce").dt.year
-                df_filtrado_prov["_Año"] = _años
-                años_disponibles = sorted(df_filtrado_prov["_Año"].dropna().astype(int).unique().tolist(), reverse=True)
+                años_disponibles = sorted(_años.dropna().astype(int).unique().tolist(), reverse=True)
                 opciones_año = ["Todos"] + [str(a) for a in años_disponibles]
                 año_filtro = st.selectbox("📅 Año", opciones_año, index=0, key="gestion_año")
                 if año_filtro != "Todos":
-                    df_filtrado_prov = df_filtrado_prov[df_filtrado_prov["_Año"] == int(año_filtro)]
-                df_filtrado_prov = df_filtrado_prov.drop(columns=["_Año"])
+                    df_filtrado_prov = df_filtrado_prov[_años == int(año_filtro)]
 
         with col3:
             localidades_cargadas = df_filtrado_prov["Localidad"].dropna().unique().tolist() if not df_filtrado_prov.empty else []
@@ -62,6 +81,17 @@ def render_gestion_localidades():
     else:
         df_localidad = df_filtrado_prov.copy()
 
+    registrar_filas(len(df_localidad))
+
+    # Mismas filas en el almacén columnar (para el mapa); None si no está armado
+    sel_localidad = seleccion(
+        df_base,
+        ccte=[ccte_filtro] if ccte_filtro != "Todos" else None,
+        provincia=[provincia_filtro] if provincia_filtro != "Todas" else None,
+        anio=año_filtro,
+        localidad=[localidad_seleccionada] if localidad_seleccionada else None,
+    )
+
     # Normalizar Resultado (por las dudas)
     if "Resultado" in df_localidad.columns:
         df_localidad["Resultado"] = pd.to_numeric(df_localidad["Resultado"], errors="coerce")
@@ -95,7 +125,7 @@ def render_gestion_localidades():
     tiempo_total_localidad = calcular_tiempo_total_por_archivo(df_localidad)
     total_puntos = len(df_localidad)
     max_resultado = df_localidad["Resultado"].max() if "Resultado" in df_localidad.columns else None
-    max_resultado_pct = (max_resultado**2) / 3770 / 0.20021 * 100 if pd.notna(max_resultado) else None
+    max_resultado_pct = vm_a_pct(max_resultado) if pd.notna(max_resultado) else None
     sondas = df_localidad["Sonda"].dropna().unique().tolist() if "Sonda" in df_localidad.columns else []
 
     st.write(f"Cantidad total de puntos medidos: {total_puntos}")
@@ -116,6 +146,7 @@ def render_gestion_localidades():
             "titulo_scope": titulo_scope,
             "max_resultado": max_resultado,
             "max_resultado_pct": max_resultado_pct,
+            "seleccion": sel_localidad,
         }
 
     df_localidad["FechaHora"] = pd.to_datetime(df_localidad["FechaHora"], errors="coerce")
@@ -132,31 +163,21 @@ def render_gestion_localidades():
             "titulo_scope": titulo_scope,
             "max_resultado": max_resultado,
             "max_resultado_pct": max_resultado_pct,
+            "seleccion": sel_localidad,
         }
 
     df_localidad["Fecha"] = df_localidad["FechaHora"].dt.date
     df_localidad["Mes"] = df_localidad["FechaHora"].dt.to_period("M").astype(str)
 
-    # --- Resumen diario ---
-    def resumen_por_dia(df_dia):
-        tiempo_total = calcular_tiempo_total_por_archivo(df_dia)
-        inicio_dt = df_dia["FechaHora"].min()
-        fin_dt = df_dia["FechaHora"].max()
-        return {
-            "Hora de inicio": inicio_dt.strftime("%H:%M:%S") if pd.notna(inicio_dt) else "-",
-            "Hora de fin": fin_dt.strftime("%H:%M:%S") if pd.notna(fin_dt) else "-",
-            "Tiempo total trabajado": format_timedelta_long(tiempo_total),
-            "Cantidad de puntos medidos": len(df_dia),
-            "Localidades trabajadas (por día)": ", ".join(sorted(df_dia["Localidad"].dropna().unique())),
-        }
-
-    filas_resumen_dias = []
-    for fecha, g_dia in df_localidad.groupby("Fecha"):
-        info = resumen_por_dia(g_dia)
-        info["Fecha de medición"] = fecha
-        filas_resumen_dias.append(info)
+    nacional = not localidad_seleccionada and provincia_filtro == "Todas" and ccte_filtro == "Todos"
+    if nacional and len(df_localidad) >= RESUMEN_STREAMING_FILAS and version_sesion() is not None:
+        # Todo el país: por bloques desde la DB, repartido por CCTE en procesos
+        resumen_dias, resumen_mensual = _resumenes_por_bloques({"ccte": [], "provincia": [], "anio": año_filtro})
+    else:
+        resumen_dias = calcular_resumen_diario(df_localidad)
+        resumen_mensual = calcular_resumen_mensual(df_localidad)
 
-    resumen_dias = pd.DataFrame(filas_resumen_dias)
+    # --- Resumen diario ---
     if not resumen_dias.empty:
         resumen_dias = resumen_dias[
             [
@@ -169,43 +190,16 @@ def render_gestion_localidades():
             ]
         ]
 
-    # --- Resumen mensual base ---
-    resumen_mensual = df_localidad.groupby("Mes").agg({
-        "FechaHora": ["min", "max"],
-        "Localidad": lambda x: ", ".join(sorted(x.dropna().unique())),
-        "Resultado": "count"
-    }).reset_index()
-    resumen_mensual.columns = ["Mes", "Hora inicio", "Hora fin", "Localidades trabajadas", "Cantidad puntos"]
-
-    # Horas trabajadas por mes (NUM + TEXTO)
-    def td_to_hours(td):
-        try:
-            return float(td.total_seconds()) / 3600.0
-        except Exception:
-            return 0.0
-
-    filas_tiempo_mes = []
-    for mes, g_mes in df_localidad.groupby("Mes"):
-        td_mes = calcular_tiempo_total_por_archivo(g_mes)
-        filas_tiempo_mes.append({
-            "Mes": str(mes),
-            "Horas trabajadas num": td_to_hours(td_mes),
-            "Horas trabajadas": format_timedelta_long(td_mes),
-        })
-    tiempo_por_mes = pd.DataFrame(filas_tiempo_mes)
-
-    resumen_mensual = resumen_mensual.merge(tiempo_por_mes, on="Mes", how="left")
-
     # Tabs
     tab1, tab2, tab3 = st.tabs(["📅 Resumen Diario", "🗓️ Resumen Mensual", "📊 Gráfico"])
 
     with tab1:
         st.markdown(f"### ⏱️ Tiempo trabajado por día en {titulo_scope}")
-        st.dataframe(resumen_dias, width="stretch")
+        render_tabla_paginada(resumen_dias, key="gestion_diario")
 
     with tab2:
         st.markdown(f"### 📅 Mediciones Totales por mes en {titulo_scope}")
-        st.dataframe(resumen_mensual, width="stretch")
+        render_tabla_paginada(resumen_mensual, key="gestion_mensual")
 
     with tab3:
         if not resumen_mensual.empty:
@@ -255,4 +249,5 @@ def render_gestion_localidades():
         "titulo_scope": titulo_scope,
         "max_resultado": max_resultado,
         "max_resultado_pct": max_resultado_pct,
+        "seleccion": sel_localidad,
     }
@@ -4,10 +4,73 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 
-from utils.time_utils import add_fechahora, calcular_tiempo_total_por_archivo
-from state import get_df_filtrado_global
+from db.columnas import seleccion_global
+from db.cubo import leer_cubo
+from db.cuantiles import leer_percentiles
+from db.hotspots import leer_ranking
+from processing.agregados import (
+    agregados_operativo,
+    agregados_operativo_cubo,
+    hotspots_por_localidad,
+    kpis_cubo,
+    preparar_base_graficos,
+)
+from processing.precalentado import esperando, filtros_por_defecto, leer_precalentado
+from sections.precalentado import aviso_esperando
+from sections.tabla_paginada import render_tabla_paginada
+from utils.time_utils import calcular_tiempo_total_por_archivo
+from state import get_df_filtrado_global, version_sesion
 from state import global_filters_human_label
+from utils.perfilado import fragmento, perfilado, registrar_filas
+
+@fragmento("hotspots")
+def _top_hotspots(agg: pd.DataFrame):
+    """Top N de hotspots: mover el slider re-ejecuta solo este bloque."""
+    topN = st.slider("Top N localidades", 5, 50, 10, step=5)
+    view = agg.head(topN).copy()
+    view["MaxPct"] = view["MaxPct"].round(2)
+    view["MaxVm"] = view["MaxVm"].round(2)
+
+    st.dataframe(view, width="stretch")
+
+    fig = px.bar(
+        view.sort_values("MaxPct"),
+        x="MaxPct",
+        y="Localidad",
+        orientation="h",
+        title=f"Top {topN} localidades por máximo Resultado (%)",
+        hover_data=["Provincia", "CCTE", "Puntos", "MaxVm"],
+    )
+    st.plotly_chart(fig, width="stretch")
+
+
+@fragmento("percentiles")
+def _percentiles(gf: dict, cubo: pd.DataFrame):
+    """p50/p90/p99 de Resultado % desde los bins precalculados + localidades y días (cubo)."""
+    st.markdown("#### 📐 Percentiles de Resultado (%)")
+    opcion = st.radio("Agrupar por", ["Total", "CCTE", "Provincia", "Año"], horizontal=True, key="percentiles_por")
+    por = None if opcion == "Total" else opcion
+
+    tabla = leer_percentiles(gf, por=por)
+    if tabla.empty:
+        st.info("No hay Resultado numérico para calcular percentiles.")
+        return
+
+    if not cubo.empty:
+        clave = {"Total": None, "CCTE": "CCTE", "Provincia": "Provincia", "Año": "anio"}[opcion]
+        base = cubo.assign(_g="Total") if clave is None else cubo.assign(_g=cubo[clave])
+        con_fecha = base[(base["puntos_fecha"] > 0) & (base["mes"] > 0)]
+        distintos = pd.DataFrame({
+            "Localidades": base.groupby("_g", dropna=False)["Localidad"].nunique(),
+            "Días": con_fecha.drop_duplicates(["_g", "anio", "mes", "dia"]).groupby("_g", dropna=False).size(),
+        }).fillna(0).astype("int64")
+        tabla = tabla.merge(distintos, left_on=por or "Ámbito", right_index=True, how="left")
+
+    st.dataframe(tabla, width="stretch", hide_index=True)
+    st.caption("Percentiles aproximados (error relativo ~2 %), combinando los bins por localidad y año.")
+
 
+@perfilado("render_graficos")
 def render_graficos():
     st.header("📊 Tablero de comando")
     st.caption(global_filters_human_label())
@@ -18,7 +81,14 @@ def render_graficos():
         st.info("No hay datos cargados todavía.")
         return
 
-    df0 = get_df_filtrado_global(df_all).copy()
+    # Sin filtros, la base armada al arrancar (processing.precalentado) si es de esta versión
+    sin_filtros = filtros_por_defecto(st.session_state["global_filters"])
+    base = leer_precalentado("base_graficos", version_sesion()) if sin_filtros else None
+    if sin_filtros and base is None and esperando("base_graficos", version_sesion()):
+        aviso_esperando("el tablero")
+        return
+
+    df0 = base if base is not None else get_df_filtrado_global(df_all)
     if df0.empty:
         st.warning("Con los filtros globales actuales no quedaron datos para graficar.")
         return
@@ -39,9 +109,6 @@ def render_graficos():
     # =========================
     # Helpers
     # =========================
-    def _to_num(s):
-        return pd.to_numeric(s, errors="coerce")
-
     def _hours(td):
         try:
             return float(td.total_seconds()) / 3600.0
@@ -49,30 +116,10 @@ def render_graficos():
             return 0.0
 
     # =========================
-    # Preprocesado mínimo
+    # Preprocesado mínimo (Resultado numérico, FechaHora, Fecha_dt, Mes, %)
     # =========================
-    # Resultado numérico
-    if "Resultado" in df0.columns:
-        df0["Resultado"] = _to_num(df0["Resultado"])
-    else:
-        df0["Resultado"] = np.nan
-
-    # FechaHora robusta si existen Fecha y Hora
-    if "Fecha" in df0.columns and "Hora" in df0.columns:
-        df0 = add_fechahora(df0, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
-    else:
-        df0["FechaHora"] = pd.NaT
-
-    fh = pd.to_datetime(df0["FechaHora"], errors="coerce")
-    df0["Fecha_dt"] = fh.dt.date
-    df0["Mes"] = fh.dt.to_period("M").astype("string")
-
-    # Resultado %
-    df0["Resultado_pct"] = np.where(
-        df0["Resultado"].notna(),
-        (df0["Resultado"] ** 2) / 3770 / 0.20021 * 100,
-        np.nan,
-    )
+    if base is None:
+        df0 = preparar_base_graficos(df0)
 
     # Muestreo (si está gigante)
     df = df0
@@ -84,17 +131,27 @@ def render_graficos():
         )
 
     st.caption(f"Filas en análisis (con filtros globales): {len(df):,}".replace(",", "."))
+    registrar_filas(len(df))
 
     # =========================
     # KPIs
     # =========================
-    total_reg = int(len(df))
-    total_localidades = int(df["Localidad"].dropna().nunique()) if "Localidad" in df.columns else 0
-    total_provincias = int(df["Provincia"].dropna().nunique()) if "Provincia" in df.columns else 0
-    total_ccte = int(df["CCTE"].dropna().nunique()) if "CCTE" in df.columns else 0
+    # Del cubo de agregados (todas las filas filtradas, sin recorrerlas); si no hay, desde df
+    cubo = leer_precalentado("cubo_graficos", version_sesion()) if sin_filtros else None
+    if cubo is None:
+        cubo = leer_cubo(st.session_state["global_filters"])
+    if not cubo.empty:
+        k = kpis_cubo(cubo)
+        total_reg, dias_medidos, horas_total = k["total_reg"], k["dias_medidos"], k["horas_total"]
+        total_localidades, total_provincias, total_ccte = k["total_localidades"], k["total_provincias"], k["total_ccte"]
+    else:
+        total_reg = int(len(df))
+        total_localidades = int(df["Localidad"].dropna().nunique()) if "Localidad" in df.columns else 0
+        total_provincias = int(df["Provincia"].dropna().nunique()) if "Provincia" in df.columns else 0
+        total_ccte = int(df["CCTE"].dropna().nunique()) if "CCTE" in df.columns else 0
 
-    dias_medidos = int(df["Fecha_dt"].dropna().nunique()) if df["Fecha_dt"].notna().any() else 0
-    horas_total = _hours(calcular_tiempo_total_por_archivo(df)) if total_reg else 0.0
+        dias_medidos = int(df["Fecha_dt"].dropna().nunique()) if df["Fecha_dt"].notna().any() else 0
+        horas_total = _hours(calcular_tiempo_total_por_archivo(df)) if total_reg else 0.0
 
     k1, k2, k3, k4, k5 = st.columns(5)
     k1.metric("Puntos", f"{total_reg:,}".replace(",", "."))
@@ -114,27 +171,23 @@ def render_graficos():
     with tabs[0]:
         st.markdown("#### Operación y cobertura")
 
+        agg_op = agregados_operativo_cubo(cubo) if not cubo.empty else agregados_operativo(df)
+
         c1, c2 = st.columns(2)
 
         # Puntos por CCTE
         with c1:
-            if "CCTE" in df.columns and df["CCTE"].notna().any():
-                df_pie = df.groupby("CCTE").size().reset_index(name="Puntos")
-                fig = px.pie(df_pie, names="CCTE", values="Puntos", title="Puntos medidos por CCTE")
+            if agg_op["puntos_ccte"] is not None:
+                fig = px.pie(agg_op["puntos_ccte"], names="CCTE", values="Puntos", title="Puntos medidos por CCTE")
                 st.plotly_chart(fig, width="stretch")
             else:
                 st.info("Falta CCTE para este gráfico.")
 
         # Localidades por Provincia y CCTE
         with c2:
-            if {"Provincia", "CCTE", "Localidad"}.issubset(df.columns):
-                res = (
-                    df.groupby(["Provincia", "CCTE"])["Localidad"]
-                    .nunique()
-                    .reset_index(name="Localidades")
-                )
+            if agg_op["localidades_prov_ccte"] is not None:
                 fig = px.bar(
-                    res,
+                    agg_op["localidades_prov_ccte"],
                     x="Provincia",
                     y="Localidades",
                     color="CCTE",
@@ -153,13 +206,8 @@ def render_graficos():
 
         # Horas trabajadas por CCTE
         with c3:
-            if "CCTE" in df.columns and df["CCTE"].notna().any():
-                filas = []
-                for ccte, g in df.groupby("CCTE"):
-                    td = calcular_tiempo_total_por_archivo(g)
-                    filas.append({"CCTE": str(ccte), "Horas": round(_hours(td), 2)})
-
-                df_h = pd.DataFrame(filas).sort_values("Horas", ascending=False)
+            if agg_op["horas_ccte"] is not None:
+                df_h = agg_op["horas_ccte"]
                 fig = px.bar(df_h, x="CCTE", y="Horas", text="Horas", title="Horas trabajadas por CCTE")
                 st.plotly_chart(fig, width="stretch")
             else:
@@ -167,13 +215,8 @@ def render_graficos():
 
         # Días con medición por CCTE
         with c4:
-            if "CCTE" in df.columns and df["Fecha_dt"].notna().any():
-                dd = (
-                    df.dropna(subset=["Fecha_dt"])
-                    .groupby("CCTE")["Fecha_dt"].nunique()
-                    .reset_index(name="Días con medición")
-                    .sort_values("Días con medición", ascending=False)
-                )
+            if agg_op["dias_ccte"] is not None:
+                dd = agg_op["dias_ccte"]
                 fig = px.bar(dd, x="CCTE", y="Días con medición", text="Días con medición", title="Días con medición por CCTE")
                 st.plotly_chart(fig, width="stretch")
             else:
@@ -182,8 +225,8 @@ def render_graficos():
         st.markdown("---")
 
         # Tendencia mensual
-        if df["Mes"].notna().any():
-            mes = df.groupby("Mes").size().reset_index(name="Puntos").sort_values("Mes")
+        if agg_op["mensual"] is not None:
+            mes = agg_op["mensual"]
             fig = px.line(mes, x="Mes", y="Puntos", markers=True, title="Tendencia mensual: puntos medidos")
             st.plotly_chart(fig, width="stretch")
 
@@ -220,6 +263,8 @@ def render_graficos():
                 fig = px.box(basep, x="CCTE", y="Resultado_pct", points="outliers", title="Outliers (Resultado %) por CCTE")
                 st.plotly_chart(fig, width="stretch")
 
+        _percentiles(st.session_state["global_filters"], cubo)
+
         # Top picos
         st.markdown("#### ⚡ Top picos (puntos individuales)")
         top = df.dropna(subset=["Resultado"]).sort_values("Resultado", ascending=False).head(10).copy()
@@ -238,38 +283,13 @@ def render_graficos():
         if "Localidad" not in df.columns:
             st.info("Falta columna Localidad.")
         else:
-            base = df.dropna(subset=["Localidad", "Resultado_pct"]).copy()
-            if base.empty:
+            # Del índice de hotspots (o del almacén columnar): todas las filas, sin muestreo ni copias
+            gf = st.session_state["global_filters"]
+            agg = hotspots_por_localidad(df, seleccion_global(df_all, gf), leer_ranking(gf))
+            if agg.empty:
                 st.info("No hay datos suficientes para hotspots.")
             else:
-                agg = (
-                    base.groupby(["Localidad"], as_index=False)
-                    .agg(
-                        MaxPct=("Resultado_pct", "max"),
-                        MaxVm=("Resultado", "max"),
-                        CCTE=("CCTE", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
-                        Provincia=("Provincia", lambda x: ", ".join(sorted(pd.Series(x).dropna().astype(str).unique())[:3])),
-                        Puntos=("Resultado_pct", "count"),
-                    )
-                    .sort_values("MaxPct", ascending=False)
-                )
-
-                topN = st.slider("Top N localidades", 5, 50, 10, step=5)
-                view = agg.head(topN).copy()
-                view["MaxPct"] = view["MaxPct"].round(2)
-                view["MaxVm"] = view["MaxVm"].round(2)
-
-                st.dataframe(view, width="stretch")
-
-                fig = px.bar(
-                    view.sort_values("MaxPct"),
-                    x="MaxPct",
-                    y="Localidad",
-                    orientation="h",
-                    title=f"Top {topN} localidades por máximo Resultado (%)",
-                    hover_data=["Provincia", "CCTE", "Puntos", "MaxVm"],
-                )
-                st.plotly_chart(fig, width="stretch")
+                _top_hotspots(agg)
 
     # -------------------------------------------------
     # TAB 4: CALIDAD DE DATOS
@@ -292,21 +312,20 @@ def render_graficos():
 
         st.markdown("---")
 
-        # Duplicados de coordenadas
+        # Duplicados de coordenadas (solo las dos columnas, sin copiar la tabla)
         if {"Lat", "Lon"}.issubset(df.columns):
-            tmp = df.copy()
-            tmp["Lat_n"] = pd.to_numeric(tmp["Lat"], errors="coerce")
-            tmp["Lon_n"] = pd.to_numeric(tmp["Lon"], errors="coerce")
-            tmp = tmp.dropna(subset=["Lat_n", "Lon_n"])
-            if not tmp.empty:
-                dup = tmp.duplicated(subset=["Lat_n", "Lon_n"]).sum()
+            lat = pd.to_numeric(df["Lat"], errors="coerce")
+            lon = pd.to_numeric(df["Lon"], errors="coerce")
+            ok = lat.notna() & lon.notna()
+            if ok.any():
+                conteo = pd.DataFrame({"Lat_n": lat[ok], "Lon_n": lon[ok]}).groupby(["Lat_n", "Lon_n"]).size()
+                dup = int(ok.sum()) - len(conteo)
                 st.write(f"Coordenadas repetidas (Lat/Lon): **{int(dup):,}**".replace(",", "."))
                 rep = (
-                    tmp.groupby(["Lat_n", "Lon_n"]).size()
+                    conteo[conteo > 1]
+                    .sort_values(ascending=False)
                     .reset_index(name="Repeticiones")
-                    .sort_values("Repeticiones", ascending=False)
-                    .head(10)
                 )
-                st.dataframe(rep, width="stretch")
+                render_tabla_paginada(rep, key="graficos_coords_rep", tamanio=25)
             else:
                 st.info("No hay coordenadas válidas para analizar duplicados.")
@@ -2,18 +2,24 @@ from datetime import datetime
 import pandas as pd
 import streamlit as st
 
+from db.hotspots import leer_ranking
+from processing.agregados import vm_a_pct
+
 
 def render_highlight_global():
     # ------------------- HIGHLIGHT GLOBAL ------------------
     if "tabla_maestra" in st.session_state and not st.session_state["tabla_maestra"].empty:
-        df = st.session_state["tabla_maestra"].copy()
-        df["Resultado"] = pd.to_numeric(df["Resultado"], errors="coerce")
-        idx_max = df["Resultado"].idxmax()
-        fila_max = df.loc[idx_max]
+        # Top 1 nacional del índice de hotspots; sin índice, idxmax sobre la tabla
+        top = leer_ranking(k=1)
+        if not top.empty:
+            fila_max = top.iloc[0]
+        else:
+            df = st.session_state["tabla_maestra"]
+            fila_max = df.loc[pd.to_numeric(df["Resultado"], errors="coerce").idxmax()]
 
         localidad_top = fila_max.get("Localidad", "N/A")
         resultado_top = fila_max["Resultado"]
-        resultado_top_pct = resultado_top**2 / 3770 / 0.20021 * 100 if pd.notna(resultado_top) else None
+        resultado_top_pct = vm_a_pct(resultado_top) if pd.notna(resultado_top) else None
 
         # Fecha/Hora asociada
         fecha_top = None
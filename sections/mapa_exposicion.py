@@ -0,0 +1,64 @@
+import base64
+
+import pydeck as pdk
+import streamlit as st
+
+from processing.mapa_calor import estado_mapa_calor, leer_mapa_calor, programar_mapa_calor
+from utils.perfilado import fragmento
+
+
+@fragmento("esperando mapa de exposición", run_every=1, registrar=False)
+def _esperar_mapa(gf: dict, version: int):
+    # Mientras el hilo trabaja se re-ejecuta solo este bloque; al terminar, la página
+    if leer_mapa_calor(gf, version) is not None or estado_mapa_calor(gf) == "error":
+        st.rerun()
+    st.caption("⏳ Generando el mapa de exposición en segundo plano…")
+
+
+def render_mapa_exposicion(gf: dict, version: int):
+    # ============================================================
+    # 🌡️ MAPA DE EXPOSICIÓN (raster precalculado, filtros globales)
+    # ============================================================
+    st.subheader("🌡️ Mapa de exposición (máximo % por celda)")
+
+    meta = leer_mapa_calor(gf, version)
+    if meta is None:
+        if estado_mapa_calor(gf) == "error":
+            st.caption("No se pudo generar el mapa de exposición.")
+            return
+        programar_mapa_calor(gf)
+        _esperar_mapa(gf, version)
+        return
+
+    if not meta.get("celdas"):
+        st.info("No hay mediciones con coordenadas válidas para los filtros actuales.")
+        return
+
+    caja = (meta["lat_min"], meta["lat_max"], meta["lon_min"], meta["lon_max"])
+    imagen = "data:image/png;base64," + base64.b64encode(meta["png"]).decode("ascii")
+
+    from db.teselas import zoom_para
+
+    mapa = pdk.Deck(
+        map_style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
+        initial_view_state=pdk.ViewState(
+            latitude=(caja[0] + caja[1]) / 2,
+            longitude=(caja[2] + caja[3]) / 2,
+            zoom=zoom_para(*caja),
+            pitch=0,
+        ),
+        layers=[
+            pdk.Layer(
+                "BitmapLayer",
+                data=None,
+                image=f"'{imagen}'",  # entre comillas: pydeck lo pasa como texto, no como expresión
+                bounds=[caja[2], caja[0], caja[3], caja[1]],
+                opacity=0.85,
+            )
+        ],
+    )
+    st.pydeck_chart(mapa, width="stretch")
+    st.caption(
+        f"{meta['puntos']:,} mediciones en {meta['celdas']:,} celdas de ~{meta['km_celda']} km · "
+        f"máximo {meta['max_pct']:.2f} % · colores del semáforo".replace(",", ".")
+    )
@@ -0,0 +1,58 @@
+import streamlit as st
+
+from state import is_admin
+from utils.perfilado import SECCIONES, comparar_fragmentos, leer_registros, resumen_percentiles
+
+
+def render_perfilado_panel():
+    # ============================================================
+    # ⏱️ PERFILADO DE SECCIONES (solo admin)
+    # ============================================================
+    if not is_admin():
+        return
+
+    st.markdown("---")
+    st.subheader("⏱️ Rendimiento por sección (admin)")
+
+    regs = leer_registros()
+    if regs.empty:
+        st.info("Todavía no hay registros de perfilado.")
+    else:
+        st.caption(
+            f"Últimos {len(regs):,} renders registrados. ".replace(",", ".")
+            + "RSS Δ es cuánto cambió la memoria residente del proceso durante el render "
+            "(se mide siempre; incluye lo que hagan a la vez otras sesiones y hilos). "
+            "El pico de tracemalloc es más preciso pero frena las páginas: viene apagado y "
+            "solo se mide con RNI_PERF_MEMORIA=1, un render a la vez."
+        )
+        st.dataframe(resumen_percentiles(regs), width="stretch", hide_index=True)
+
+        # Reruns parciales: cuánto cuesta un widget dentro de un fragmento vs. re-ejecutar toda la app
+        frag = comparar_fragmentos(regs)
+        if not frag.empty:
+            st.markdown("**⚡ Reruns parciales (fragmentos) vs. rerun completo de la página**")
+            st.dataframe(frag, width="stretch", hide_index=True)
+
+        with st.expander("Últimos renders", expanded=False):
+            st.dataframe(regs.tail(50).iloc[::-1], width="stretch", hide_index=True)
+
+    # --- cProfile de un único rerun ---
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        seccion = st.selectbox("Sección a perfilar con cProfile", SECCIONES, key="perf_cprofile_seccion")
+    with c2:
+        st.write("")
+        if st.button("🔬 Capturar en el próximo render", key="perf_cprofile_btn"):
+            st.session_state["perf_cprofile_proximo"] = seccion
+
+    armado = st.session_state.get("perf_cprofile_proximo")
+    if armado:
+        st.caption(f"Captura pendiente: el próximo render de **{armado}** se perfila con cProfile.")
+
+    ultimo = st.session_state.get("perf_cprofile_ultimo")
+    if ultimo:
+        with st.expander(
+            f"Reporte cProfile — {ultimo['seccion']} ({ultimo['ts']}, {ultimo['wall_s']:.2f} s)",
+            expanded=False,
+        ):
+            st.code(ultimo["reporte"], language="text")
@@ -0,0 +1,29 @@
+import streamlit as st
+
+from processing.precalentado import estado_precalentado
+from utils.perfilado import fragmento
+
+
+@fragmento("esperando precalentado", run_every=1, registrar=False)
+def _esperar(hechos: int):
+    # Se re-ejecuta solo este aviso; cada paso terminado recarga la página para que lo use
+    estado = estado_precalentado()
+    if estado is None or not estado["activo"] or estado["hechos"] != hechos:
+        st.rerun()
+    st.caption(
+        f"🔥 Preparando datos en segundo plano ({estado['hechos']}/{estado['total']}): "
+        f"{estado['paso'] or 'iniciando'}…"
+    )
+
+
+def render_precalentado():
+    """Aviso mientras corre el precalentado de arranque (processing.precalentado)."""
+    estado = estado_precalentado()
+    if estado is None or not estado["activo"]:
+        return
+    _esperar(estado["hechos"])
+
+
+def aviso_esperando(que: str):
+    """Lo que muestra una página cuyo resultado se está armando en el precalentado."""
+    st.info(f"⏳ Se está preparando {que} en segundo plano; aparece solo en cuanto esté listo.")
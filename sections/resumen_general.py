@@ -3,16 +3,29 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
-from utils.time_utils import (
-    add_fechahora,
-    calcular_tiempo_total_por_archivo,
-    format_timedelta_long,
-)
-
-# Constante para % (la misma que venís usando)
-K_DEN = 3770 * 0.20021
-
-
+from config import PROCESOS_AGREGADOS, RESUMEN_STREAMING_FILAS
+from processing.agregados import resumen_por_localidad
+from processing.precalentado import esperando, leer_precalentado
+from processing.streaming import resumen_por_localidad_streaming
+from sections.precalentado import aviso_esperando
+from sections.tabla_paginada import render_tabla_paginada
+from utils.time_utils import add_fechahora
+from state import version_sesion
+from utils.perfilado import perfilado, registrar_filas
+
+
+def _resumen_por_bloques(gf: dict) -> pd.DataFrame:
+    """Resumen recorriendo la DB por bloques; se guarda en sesión por (filtros, data_version)."""
+    clave = (repr(sorted(gf.items())), version_sesion())
+    guardado = st.session_state.get("_resumen_streaming")
+    if guardado is not None and guardado[0] == clave:
+        return guardado[1]
+    resumen = resumen_por_localidad_streaming(gf, procesos=PROCESOS_AGREGADOS)
+    st.session_state["_resumen_streaming"] = (clave, resumen)
+    return resumen
+
+
+@perfilado("render_resumen_general")
 def render_resumen_general():
     st.header("📊 Resumen general de mediciones")
 
@@ -59,81 +72,62 @@ def render_resumen_general():
         st.warning("Con esos filtros no quedaron registros.")
         return
 
-    # --------- Construir FechaHora robusta (sin apply por fila) ---------
-    df = add_fechahora(df, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
-
-    valid_fh = df["FechaHora"].notna().sum() if "FechaHora" in df.columns else 0
-    st.caption(
-        f"FechaHora válida: {valid_fh:,}/{len(df):,} "
-        f"({(valid_fh/len(df)*100 if len(df) else 0):.1f}%)"
-        .replace(",", ".")
-    )
+    registrar_filas(len(df))
 
-    # --------- Resumen por localidad (vectorizado y con bucles chicos) ---------
     # Columnas mínimas para agrupar
     needed = ["CCTE", "Provincia", "Localidad"]
     if not all(c in df.columns for c in needed):
         st.error("Faltan columnas necesarias (CCTE/Provincia/Localidad) en la tabla.")
         return
 
-    # Base de agregados rápidos
-    gb = df.groupby(["CCTE", "Provincia", "Localidad"], dropna=False)
-
-    resumen = gb.agg(
-        Mediciones=("Resultado", "size"),
-        Resultado_Max_Vm=("Resultado", "max"),
-        Inicio=("FechaHora", "min"),
-        Fin=("FechaHora", "max"),
-    ).reset_index()
-
-    # % del máximo
-    resumen["Resultado_Max_%"] = (resumen["Resultado_Max_Vm"] ** 2) / K_DEN * 100
-    resumen.loc[resumen["Resultado_Max_Vm"].isna(), "Resultado_Max_%"] = pd.NA
-
-    # Expedientes / Sondas (esto es lo más “caro”; lo hago controlado)
-    if "Expediente" in df.columns:
-        exp_map = gb["Expediente"].apply(
-            lambda x: ", ".join(sorted(set(x.dropna().astype(str)))))
-        resumen = resumen.merge(exp_map.rename("N° Expediente"), on=["CCTE", "Provincia", "Localidad"], how="left")
-    else:
-        resumen["N° Expediente"] = ""
+    sin_filtros = ccte_sel == "Todos" and prov_sel == "Todas" and anio_sel == "Todos"
+    precalentado = leer_precalentado("resumen_localidad", version_sesion()) if sin_filtros else None
+    if sin_filtros and precalentado is None and esperando("resumen_localidad", version_sesion()):
+        aviso_esperando("el resumen por localidad")
+        return
 
-    if "Sonda" in df.columns:
-        sonda_map = gb["Sonda"].apply(
-            lambda x: ", ".join(sorted(set(x.dropna().astype(str)))))
-        resumen = resumen.merge(sonda_map.rename("Sonda utilizada"), on=["CCTE", "Provincia", "Localidad"], how="left")
+    if precalentado is not None:
+        # --------- Armado al arrancar (processing.precalentado) ---------
+        resumen = precalentado
+        if "fechahora_valida" in resumen.attrs:
+            valid_fh, filas = resumen.attrs["fechahora_valida"], resumen.attrs["filas"]
+            st.caption(
+                f"FechaHora válida: {valid_fh:,}/{filas:,} ({(valid_fh/filas*100 if filas else 0):.1f}%)"
+                .replace(",", ".")
+            )
+        else:
+            st.caption(
+                f"Resumen calculado por bloques desde la base ({resumen.attrs.get('filas', 0):,} mediciones)."
+                .replace(",", ".")
+            )
+    elif len(df) >= RESUMEN_STREAMING_FILAS and version_sesion() is not None:
+        # --------- Tabla grande: agregados parciales por bloques (memoria según grupos) ---------
+        gf = {
+            "ccte": [] if ccte_sel == "Todos" else [ccte_sel],
+            "provincia": [] if prov_sel == "Todas" else [prov_sel],
+            "anio": anio_sel,
+        }
+        resumen = _resumen_por_bloques(gf)
+        st.caption(
+            f"Resumen calculado por bloques desde la base ({resumen.attrs.get('filas', 0):,} mediciones)."
+            .replace(",", ".")
+        )
     else:
-        resumen["Sonda utilizada"] = ""
-
-    # Tiempo trabajado por localidad
-    # (este loop es por cantidad de localidades, no por filas -> mucho más liviano)
-    tiempos = []
-    for _, row in resumen[["CCTE", "Provincia", "Localidad"]].iterrows():
-        ccte, prov, loc = row["CCTE"], row["Provincia"], row["Localidad"]
-        g = df[(df["CCTE"] == ccte) & (df["Provincia"] == prov) & (df["Localidad"] == loc)]
-        td = calcular_tiempo_total_por_archivo(g)
-        tiempos.append(format_timedelta_long(td))
-
-    resumen["Tiempo trabajado"] = tiempos
-
-    # Formatos finales
-    # (Inicio/Fin pueden quedar NaT si no hubo parseo de fecha/hora)
-    if "Inicio" in resumen.columns:
-        resumen["Inicio"] = pd.to_datetime(resumen["Inicio"], errors="coerce")
-    if "Fin" in resumen.columns:
-        resumen["Fin"] = pd.to_datetime(resumen["Fin"], errors="coerce")
-
-    # Ordenar por pico max % (o V/m) descendente
-    resumen = resumen.sort_values(["Resultado_Max_%", "Resultado_Max_Vm"], ascending=False)
-
-    # Renombres “lindos”
-    resumen = resumen.rename(columns={
-        "Resultado_Max_Vm": "Resultado Max (V/m)",
-        "Resultado_Max_%": "Resultado Max (%)",
-    })
-
-    # Mostrar
-    st.dataframe(
+        # --------- Construir FechaHora robusta (sin apply por fila) ---------
+        df = add_fechahora(df, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora")
+
+        valid_fh = df["FechaHora"].notna().sum() if "FechaHora" in df.columns else 0
+        st.caption(
+            f"FechaHora válida: {valid_fh:,}/{len(df):,} "
+            f"({(valid_fh/len(df)*100 if len(df) else 0):.1f}%)"
+            .replace(",", ".")
+        )
+
+        # --------- Resumen por localidad (vectorizado y con bucles chicos) ---------
+        resumen = resumen_por_localidad(df)
+
+    # Mostrar (paginado: al navegador va solo la página visible)
+    render_tabla_paginada(
         resumen[[
             "CCTE", "Provincia", "Localidad",
             "Inicio", "Fin",
@@ -144,5 +138,5 @@ def render_resumen_general():
             "N° Expediente",
             "Sonda utilizada",
         ]],
-        width="stretch"
+        key="resumen_tabla",
     )
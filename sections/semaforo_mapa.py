@@ -3,6 +3,10 @@ import pandas as pd
 import pydeck as pdk
 import streamlit as st
 
+from processing.agregados import vm_a_pct
+from utils.perfilado import perfilado, registrar_filas
+
+
 def render_semaforo(max_resultado_pct, df_localidad):
     # ---------------- Semáforo ----------------
     if max_resultado_pct and not df_localidad.empty:
@@ -18,40 +22,144 @@ def render_semaforo(max_resultado_pct, df_localidad):
         st.image("assets/mapa_color.png", caption="Escala de colores para interpretar los resultados", width="stretch")
 
 
-def render_mapa(df_localidad):
+# Bandas del semáforo para el mapa (% del límite): desde, hasta, color RGB
+RANGOS_COLORES_MAPA = [
+    (0, 1, [132, 194, 245]),
+    (1, 2, [72, 157, 255]),
+    (2, 4, [0, 107, 214]),
+    (4, 8, [169, 231, 169]),
+    (8, 15, [137, 221, 137]),
+    (15, 20, [77, 150, 35]),
+    (20, 35, [217, 255, 0]),
+    (35, 50, [243, 154, 109]),
+    (50, 100, [230, 130, 0]),
+    (100, float("inf"), [204, 0, 0])
+]
+COLOR_SIN_DATO = [200, 200, 200]
+
+MAX_PUNTOS_MAPA = 12000  # ajustable (8000-20000 según la PC)
+
+
+def colores_semaforo(pct) -> np.ndarray:
+    """Color RGB (uint8, una fila por valor) de cada % según las bandas del semáforo."""
+    pct = np.asarray(pct, dtype="float64")
+    bordes = np.array([low for low, _, _ in RANGOS_COLORES_MAPA[1:]])
+    paleta = np.array([c for _, _, c in RANGOS_COLORES_MAPA] + [COLOR_SIN_DATO], dtype=np.uint8)
+    banda = np.searchsorted(bordes, pct, side="right")
+    banda[np.isnan(pct)] = len(RANGOS_COLORES_MAPA)
+    return paleta[banda]
+
+
+def _mapa_base(lat0: float, lon0: float, zoom: float, layers, tooltip) -> pdk.Deck:
+    return pdk.Deck(
+        map_style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
+        initial_view_state=pdk.ViewState(latitude=lat0, longitude=lon0, zoom=zoom, pitch=0),
+        layers=layers,
+        tooltip=tooltip,
+    )
+
+
+def _render_teselas(caja: tuple[float, float, float, float], total_puntos: int) -> bool:
+    """
+    Mapa por teselas (máximo % y cantidad por celda de grilla) para la caja
+    (lat_min, lat_max, lon_min, lon_max). False si no hay teselas (DB vieja o vacía).
+    """
+    from db.teselas import leer_teselas, zoom_para
+
+    tes = leer_teselas(*caja)
+    if tes.empty:
+        return False
+
+    lado = tes.attrs["grados"]
+    tes["color"] = colores_semaforo(tes["pct"]).tolist()
+    tes["poligono"] = [
+        [[lo, la], [lo + lado, la], [lo + lado, la + lado], [lo, la + lado]]
+        for la, lo in zip(tes["lat_min"].round(5), tes["lon_min"].round(5))
+    ]
+    tes = tes[["poligono", "pct", "puntos", "color"]]
+
+    registrar_filas(total_puntos)
+    st.subheader("🗺️ Mapa Semaforizado (%)")
+    st.caption(
+        f"{total_puntos:,} mediciones agregadas en {len(tes):,} celdas de {lado * 111:.1f} km "
+        f"(máximo % de cada celda). Incluye todas las mediciones del área; "
+        f"elegí una localidad para ver los puntos."
+        .replace(",", ".")
+    )
+
+    lat_min, lat_max, lon_min, lon_max = caja
+    mapa = _mapa_base(
+        (lat_min + lat_max) / 2, (lon_min + lon_max) / 2, zoom_para(*caja),
+        [
+            pdk.Layer(
+                "PolygonLayer",
+                data=tes,
+                get_polygon="poligono",
+                get_fill_color="color",
+                opacity=0.7,
+                stroked=False,
+                pickable=True,
+            )
+        ],
+        {"text": "Máximo (%): {pct}\nMediciones: {puntos}"},
+    )
+    st.pydeck_chart(mapa, width="stretch")
+    return True
+
+
+@perfilado("render_mapa")
+def render_mapa(df_localidad, sel=None):
     # ------------------- MAPA INTERACTIVO ------------------
     if df_localidad is None or df_localidad.empty:
         return
     if "Lat" not in df_localidad.columns or "Lon" not in df_localidad.columns:
         return
 
-    MAX_PUNTOS_MAPA = 12000  # ajustable (8000-20000 según la PC)
-
-    # 1) Tomar SOLO columnas mínimas
-    cols = [c for c in ["Lat", "Lon", "Resultado"] if c in df_localidad.columns]
-    coords = df_localidad[cols].dropna(subset=["Lat", "Lon"]).copy()
-    if coords.empty:
-        return
-
-    # 2) Asegurar numéricos
-    coords["Lat"] = pd.to_numeric(coords["Lat"], errors="coerce")
-    coords["Lon"] = pd.to_numeric(coords["Lon"], errors="coerce")
-    coords["Resultado"] = pd.to_numeric(coords["Resultado"], errors="coerce")
-    coords = coords.dropna(subset=["Lat", "Lon", "Resultado"])
-    if coords.empty:
-        return
+    if sel is not None:
+        # Almacén columnar: se muestrea sobre los arrays y solo las filas elegidas pasan a pandas
+        lat, lon, res = sel.valores("lat"), sel.valores("lon"), sel.valores("resultado")
+        idx = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon) & np.isfinite(res))
+        total_puntos = len(idx)
+        if total_puntos == 0:
+            return
+        caja = (float(lat[idx].min()), float(lat[idx].max()), float(lon[idx].min()), float(lon[idx].max()))
+        # Muchos puntos (país, CCTE, provincia): teselas agregadas en vez de muestra
+        if total_puntos > MAX_PUNTOS_MAPA and _render_teselas(caja, total_puntos):
+            return
+        if total_puntos > MAX_PUNTOS_MAPA:
+            idx = np.sort(np.random.default_rng(42).choice(idx, MAX_PUNTOS_MAPA, replace=False))
+        coords = pd.DataFrame({"Lat": lat[idx], "Lon": lon[idx], "Resultado": res[idx]})
+    else:
+        # 1) Tomar SOLO columnas mínimas
+        cols = [c for c in ["Lat", "Lon", "Resultado"] if c in df_localidad.columns]
+        coords = df_localidad[cols].dropna(subset=["Lat", "Lon"]).copy()
+        if coords.empty:
+            return
+
+        # 2) Asegurar numéricos
+        coords["Lat"] = pd.to_numeric(coords["Lat"], errors="coerce")
+        coords["Lon"] = pd.to_numeric(coords["Lon"], errors="coerce")
+        coords["Resultado"] = pd.to_numeric(coords["Resultado"], errors="coerce")
+        coords = coords.dropna(subset=["Lat", "Lon", "Resultado"])
+        if coords.empty:
+            return
+
+        total_puntos = len(coords)
+        caja = (coords["Lat"].min(), coords["Lat"].max(), coords["Lon"].min(), coords["Lon"].max())
+        if total_puntos > MAX_PUNTOS_MAPA and _render_teselas(caja, total_puntos):
+            return
+        if total_puntos > MAX_PUNTOS_MAPA:
+            coords = coords.sample(n=MAX_PUNTOS_MAPA, random_state=42)
 
     # 3) Convertir a % y quedarnos con eso
-    coords["pct"] = (coords["Resultado"] ** 2) / 3770 / 0.20021 * 100
+    coords["pct"] = vm_a_pct(coords["Resultado"])
 
-    # 4) Forzar coordenadas negativas (Argentina)
-    coords["lat"] = coords["Lat"].abs() * -1
-    coords["lon"] = coords["Lon"].abs() * -1
+    # 4) Lat/Lon ya vienen canónicas desde la carga (inválidas = nulas, quedaron afuera arriba)
+    coords = coords.rename(columns={"Lat": "lat", "Lon": "lon"})
 
-    # 5) 🔥 Si hay demasiados puntos: SAMPLE automático
-    total_puntos = len(coords)
+    # 5) Muestra solo si no hay teselas para agregar (hecho arriba)
+    registrar_filas(total_puntos)
     if total_puntos > MAX_PUNTOS_MAPA:
-        coords = coords.sample(n=MAX_PUNTOS_MAPA, random_state=42)
         st.info(
             f"🗺️ Mapa: mostrando una muestra de {MAX_PUNTOS_MAPA:,} puntos "
             f"(de {total_puntos:,}). Filtrá por provincia/CCTE/localidad para ver el detalle completo."
@@ -59,28 +167,7 @@ def render_mapa(df_localidad):
         )
 
     # 6) Colores por % (semaforizado)
-    rangos_colores_map = [
-        (0, 1, [132, 194, 245]),
-        (1, 2, [72, 157, 255]),
-        (2, 4, [0, 107, 214]),
-        (4, 8, [169, 231, 169]),
-        (8, 15, [137, 221, 137]),
-        (15, 20, [77, 150, 35]),
-        (20, 35, [217, 255, 0]),
-        (35, 50, [243, 154, 109]),
-        (50, 100, [230, 130, 0]),
-        (100, float("inf"), [204, 0, 0])
-    ]
-
-    def color_semaforo_pct(valor_pct):
-        if pd.isna(valor_pct):
-            return [200, 200, 200]
-        for low, high, color in rangos_colores_map:
-            if low <= valor_pct < high:
-                return color
-        return [0, 0, 0]
-
-    coords["color"] = coords["pct"].apply(color_semaforo_pct)
+    coords["color"] = colores_semaforo(coords["pct"]).tolist()
 
     # 7) SOLO lo que viaja al JSON del mapa
     coords = coords[["lon", "lat", "pct", "color"]].copy()
@@ -92,15 +179,9 @@ def render_mapa(df_localidad):
     lat0 = float(coords["lat"].mean()) if np.isfinite(coords["lat"].mean()) else -34.61
     lon0 = float(coords["lon"].mean()) if np.isfinite(coords["lon"].mean()) else -58.38
 
-    mapa = pdk.Deck(
-        map_style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
-        initial_view_state=pdk.ViewState(
-            latitude=lat0,
-            longitude=lon0,
-            zoom=6,
-            pitch=0,
-        ),
-        layers=[
+    mapa = _mapa_base(
+        lat0, lon0, 6,
+        [
             pdk.Layer(
                 "ScatterplotLayer",
                 data=coords,
@@ -110,7 +191,7 @@ def render_mapa(df_localidad):
                 pickable=True,
             )
         ],
-        tooltip={"text": "Resultado (%): {pct}"}
+        {"text": "Resultado (%): {pct}"},
     )
 
     st.pydeck_chart(mapa, width="stretch")
@@ -0,0 +1,77 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from processing.agregados import vm_a_pct
+from utils.downsampling import reducir_serie
+from utils.perfilado import fragmento
+
+# Tope de puntos que viajan al navegador (la serie completa se usa para reducir)
+MAX_PUNTOS_SERIE = 3_000
+
+TODOS_LOS_ARCHIVOS = "Todos los archivos"
+
+
+@fragmento("serie temporal")
+def render_serie_temporal(df_localidad: pd.DataFrame | None):
+    # ============================================================
+    # 📈 RESULTADO EN EL TIEMPO (localidad o archivo)
+    # ============================================================
+    st.subheader("📈 Resultado en el tiempo")
+
+    if df_localidad is None or df_localidad.empty or not {"FechaHora", "Resultado"}.issubset(df_localidad.columns):
+        st.info("No hay mediciones con Fecha/Hora válidas para graficar.")
+        return
+
+    archivos = []
+    if "Nombre Archivo" in df_localidad.columns:
+        archivos = sorted(df_localidad["Nombre Archivo"].dropna().astype(str).unique())
+
+    c1, c2 = st.columns([3, 2])
+    archivo = c1.selectbox("Archivo", [TODOS_LOS_ARCHIVOS] + archivos, key="serie_archivo")
+    metodo = c2.radio(
+        "Reducción", ["LTTB", "Mín/máx por tramo"], horizontal=True, key="serie_metodo",
+        help="Con muchas mediciones se grafica una muestra que conserva la forma y los picos.",
+    )
+
+    d = df_localidad
+    if archivo != TODOS_LOS_ARCHIVOS:
+        d = d[d["Nombre Archivo"].astype(str) == archivo]
+
+    serie = pd.DataFrame({
+        "FechaHora": pd.to_datetime(d["FechaHora"], errors="coerce"),
+        "Resultado": pd.to_numeric(d["Resultado"], errors="coerce"),
+        "Nombre Archivo": d["Nombre Archivo"] if "Nombre Archivo" in d.columns else "",
+    }).dropna(subset=["FechaHora", "Resultado"]).sort_values("FechaHora", kind="stable")
+
+    if serie.empty:
+        st.info("No hay mediciones con Fecha/Hora válidas para graficar.")
+        return
+
+    x = serie["FechaHora"].to_numpy(dtype="datetime64[ns]").astype("int64")
+    idx = reducir_serie(
+        x, serie["Resultado"].to_numpy(), MAX_PUNTOS_SERIE, metodo="lttb" if metodo == "LTTB" else "minmax"
+    )
+    vista = serie.iloc[idx].copy()
+    vista["Resultado %"] = vm_a_pct(vista["Resultado"]).round(2)
+
+    fig = px.line(
+        vista, x="FechaHora", y="Resultado", markers=len(vista) <= 500,
+        hover_data={"Resultado %": True, "Nombre Archivo": True},
+        title=f"Resultado (V/m) en el tiempo — {archivo}",
+    )
+
+    pico = serie.loc[serie["Resultado"].idxmax()]
+    pico_pct = vm_a_pct(pico["Resultado"])
+    fig.add_scatter(
+        x=[pico["FechaHora"]], y=[pico["Resultado"]], mode="markers", name="Máximo",
+        marker=dict(color="red", size=11, symbol="star"),
+    )
+    fig.update_layout(template="plotly_white", showlegend=False)
+    st.plotly_chart(fig, width="stretch")
+
+    st.caption(
+        f"{len(vista):,} de {len(serie):,} puntos graficados. ".replace(",", ".")
+        + f"Máximo: {pico['Resultado']:.2f} V/m ({pico_pct:.2f} %) el "
+        f"{pico['FechaHora'].strftime('%d/%m/%Y %H:%M:%S')} · {pico['Nombre Archivo']}"
+    )
@@ -1,11 +1,11 @@
 from datetime import datetime
-import pandas as pd
 import streamlit as st
 from streamlit import rerun
 
-from admin.actions import eliminar_localidad
-from db.sqlite_store import save_tabla_maestra_to_db
+from admin.actions import eliminar_expediente, eliminar_localidad
+from db.sqlite_store import append_mediciones_to_db
 from processing.excel_processor import procesar_archivos
+from state import sincronizar_tabla_maestra
 
 
 def render_sidebar(sb=None):
@@ -54,9 +54,9 @@ def render_sidebar(sb=None):
             df_proc, resumen_df = procesar_archivos(files, ccte, provincia, localidad, expediente)
             if not df_proc.empty:
                 df_proc["FechaCarga"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                st.session_state["tabla_maestra"] = pd.concat([st.session_state["tabla_maestra"], df_proc], ignore_index=True)
-                # >>> CAMBIO SQLITE: guardamos en DB
-                save_tabla_maestra_to_db(st.session_state["tabla_maestra"])
+                # Solo se agregan las filas nuevas: no pisa lo que cargaron otras sesiones
+                append_mediciones_to_db(df_proc)
+                sincronizar_tabla_maestra()
                 sb.success(f"{len(files)} archivos procesados y agregados.")
                 sb.dataframe(resumen_df)
                 st.session_state["uploader_key"] += 1
@@ -72,3 +72,9 @@ def render_sidebar(sb=None):
 
         if sb.button("❌ Eliminar localidad") and localidad_a_borrar:
             eliminar_localidad(localidad_a_borrar)
+
+        expedientes_unicos = sorted(st.session_state["tabla_maestra"]["Expediente"].dropna().astype(str).unique().tolist())
+        expediente_a_borrar = sb.selectbox("Seleccionar expediente a eliminar", [""] + expedientes_unicos)
+
+        if sb.button("❌ Eliminar expediente") and expediente_a_borrar:
+            eliminar_expediente(expediente_a_borrar)
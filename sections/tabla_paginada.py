@@ -0,0 +1,117 @@
+"""
+Tabla paginada para resultados grandes.
+
+Búsqueda, orden y corte se hacen acá (en el servidor) y al navegador viaja solo
+la página visible, no el DataFrame entero en cada rerun. Los controles de la
+tabla re-ejecutan solo la tabla (fragmento), no la página.
+"""
+from __future__ import annotations
+
+import math
+
+import pandas as pd
+import streamlit as st
+
+from utils.perfilado import fragmento
+
+TAMANIOS_PAGINA = (25, 50, 100, 250)
+SIN_ORDEN = "(sin orden)"
+
+
+def _buscar(df: pd.DataFrame, texto: str) -> pd.DataFrame:
+    """Filas donde alguna columna contiene `texto` (sin distinguir mayúsculas)."""
+    texto = (texto or "").strip().lower()
+    if not texto or df.empty:
+        return df
+
+    mask = pd.Series(False, index=df.index)
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Se busca en las categorías (pocas) y no en cada fila
+            cats = s.cat.categories.astype(str).str.lower().str.contains(texto, regex=False)
+            mask |= s.isin(s.cat.categories[cats])
+        else:
+            mask |= s.astype(str).str.lower().str.contains(texto, regex=False, na=False)
+    return df[mask]
+
+
+def paginar(
+    df: pd.DataFrame,
+    orden: str | None = None,
+    ascendente: bool = True,
+    busqueda: str = "",
+    offset: int = 0,
+    limite: int = 50,
+) -> tuple[pd.DataFrame, int]:
+    """Página [offset, offset + limite) de df buscado y ordenado. Devuelve (página, total tras la búsqueda)."""
+    df = _buscar(df, busqueda)
+    total = len(df)
+
+    if orden in df.columns and total:
+        s = df[orden].reset_index(drop=True)
+        try:
+            pos = s.sort_values(ascending=ascendente, kind="stable", na_position="last").index
+        except TypeError:
+            # Columnas con tipos mezclados: orden por texto
+            pos = s.astype(str).sort_values(ascending=ascendente, kind="stable").index
+        return df.iloc[pos[offset:offset + limite]], total
+
+    return df.iloc[offset:offset + limite], total
+
+
+def _volver_a_primera(key: str):
+    st.session_state[f"{key}_pagina"] = 1
+
+
+@fragmento("tabla paginada")
+def render_tabla_paginada(df: pd.DataFrame, key: str, tamanio: int = 50, **kwargs):
+    """
+    st.dataframe con búsqueda, orden y páginas; `kwargs` van a st.dataframe.
+    Es un fragmento: buscar o cambiar de página re-ejecuta solo la tabla.
+    """
+    if df is None or df.empty:
+        st.dataframe(df, width="stretch", **kwargs)
+        return
+
+    c1, c2, c3, c4, c5 = st.columns([2.2, 1.6, 0.9, 0.8, 0.8])
+    busqueda = c1.text_input(
+        "🔎 Buscar", key=f"{key}_buscar", placeholder="Texto en cualquier columna",
+        on_change=_volver_a_primera, args=(key,),
+    )
+    orden = c2.selectbox(
+        "Ordenar por", [SIN_ORDEN] + [str(c) for c in df.columns], key=f"{key}_orden",
+        on_change=_volver_a_primera, args=(key,),
+    )
+    sentido = c3.selectbox("Sentido", ["↑ Asc", "↓ Desc"], key=f"{key}_sentido", on_change=_volver_a_primera, args=(key,))
+    limite = c4.selectbox(
+        "Filas", TAMANIOS_PAGINA, index=TAMANIOS_PAGINA.index(tamanio) if tamanio in TAMANIOS_PAGINA else 1,
+        key=f"{key}_filas", on_change=_volver_a_primera, args=(key,),
+    )
+
+    # El total depende de la búsqueda: la página pedida puede haber quedado fuera de rango
+    filtrado = _buscar(df, busqueda)
+    total = len(filtrado)
+    paginas = max(1, math.ceil(total / limite))
+    clave_pagina = f"{key}_pagina"
+    if st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = paginas
+    pagina = c5.number_input("Página", min_value=1, max_value=paginas, step=1, key=clave_pagina)
+
+    offset = (int(pagina) - 1) * limite
+    vista, _ = paginar(
+        filtrado,
+        orden=None if orden == SIN_ORDEN else orden,
+        ascendente=sentido.startswith("↑"),
+        offset=offset,
+        limite=limite,
+    )
+
+    st.dataframe(vista, width="stretch", **kwargs)
+    if total:
+        st.caption(
+            f"Filas {offset + 1:,}–{offset + len(vista):,} de {total:,} · página {int(pagina)} de {paginas}"
+            .replace(",", ".")
+        )
+    else:
+        st.caption("Sin coincidencias para la búsqueda.")
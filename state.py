@@ -1,7 +1,11 @@
+import hmac
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from db.sqlite_store import load_tabla_maestra_from_db
+from config import ADMIN_KEY
+from db.dataset import obtener_tabla_maestra
 
 
 def init_session_state():
@@ -18,12 +22,28 @@ def init_session_state():
 
 
 def ensure_tabla_maestra_loaded():
-    # Carga persistente de tabla maestra desde SQLite
-    if st.session_state["tabla_maestra"].empty:
-        try:
-            st.session_state["tabla_maestra"] = load_tabla_maestra_from_db()
-        except Exception as e:
-            st.warning(f"No se pudo cargar tabla desde archivosdata/rni.db: {e}")
+    # Tabla maestra compartida (db.dataset): en cada rerun se chequea la versión de la DB
+    # y, si cambió, se toman solo los cambios nuevos.
+    try:
+        df = obtener_tabla_maestra()
+    except Exception as e:
+        st.warning(f"No se pudo cargar tabla desde archivosdata/rni.db: {e}")
+        return
+
+    if df is not st.session_state["tabla_maestra"]:
+        st.session_state["tabla_maestra"] = df
+        st.session_state["data_version"] = df.attrs.get("data_version")
+
+
+def version_sesion() -> int | None:
+    """data_version de la DB con la que se cargó la tabla en sesión."""
+    return st.session_state.get("data_version")
+
+
+def sincronizar_tabla_maestra():
+    """Después de escribir (o de un conflicto): trae a la sesión la tabla al día."""
+    ensure_tabla_maestra_loaded()
+
 
 def init_global_filters():
     """Inicializa filtros globales en session_state."""
@@ -129,36 +149,53 @@ def render_global_filters_sidebar(df: pd.DataFrame, sb=st.sidebar):
             pass
 
 
+def _en_textos(s: pd.Series, valores) -> np.ndarray:
+    """Máscara de s (como texto) en `valores`; en categóricas se compara solo las categorías."""
+    valores = [str(x) for x in valores]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        en_cat = np.append(s.cat.categories.astype(str).isin(valores), False)
+        return en_cat[s.cat.codes.to_numpy()]  # código -1 (nulo) -> último: False
+    return s.astype(str).isin(valores).to_numpy()
+
+
 def get_df_filtrado_global(df: pd.DataFrame) -> pd.DataFrame:
-    """Devuelve df filtrado según session_state['global_filters']."""
+    """
+    Devuelve df filtrado según session_state['global_filters']. Arma una sola
+    máscara y copia solo las filas que pasan; sin filtros devuelve una copia
+    liviana (copy-on-write): los cambios del llamador no tocan la tabla compartida.
+    """
     init_global_filters()
     gf = st.session_state["global_filters"]
 
     if df is None or df.empty:
         return df
 
-    out = df.copy()
+    mask = np.ones(len(df), dtype=bool)
 
     # CCTE
-    if gf.get("ccte") and "CCTE" in out.columns:
-        out = out[out["CCTE"].astype(str).isin([str(x) for x in gf["ccte"]])]
+    if gf.get("ccte") and "CCTE" in df.columns:
+        mask &= _en_textos(df["CCTE"], gf["ccte"])
 
     # Provincia
-    if gf.get("provincia") and "Provincia" in out.columns:
-        out = out[out["Provincia"].astype(str).isin([str(x) for x in gf["provincia"]])]
+    if gf.get("provincia") and "Provincia" in df.columns:
+        mask &= _en_textos(df["Provincia"], gf["provincia"])
 
     # Año
     anio = gf.get("anio", "Todos")
     if anio != "Todos":
         anio_int = int(anio)
-        if "Fecha" in out.columns:
-            yy = pd.to_datetime(out["Fecha"], dayfirst=True, errors="coerce").dt.year
-            out = out[yy == anio_int]
-        elif "FechaHora" in out.columns:
-            yy = pd.to_datetime(out["FechaHora"], errors="coerce").dt.year
-            out = out[yy == anio_int]
-
-    return out
+        # Fecha ya viene datetime64 de la carga (db.sqlite_store): sin re-parsear
+        if "Fecha" in df.columns:
+            mask &= (df["Fecha"].dt.year == anio_int).to_numpy()
+        elif "FechaHora" in df.columns:
+            yy = pd.to_datetime(df["FechaHora"], errors="coerce").dt.year
+            mask &= (yy == anio_int).to_numpy()
+
+    if mask.all():
+        return df.copy(deep=False)
+    return df[mask]
+
+
 def global_filters_human_label() -> str:
     """Texto corto tipo: 'Viendo: CCTE X · Prov Y · Año 2025' """
     init_global_filters()
@@ -173,3 +210,26 @@ def global_filters_human_label() -> str:
         chips.append(f"Año: {gf['anio']}")
 
     return "Viendo: " + (" · ".join(chips) if chips else "todo")
+
+
+def is_admin() -> bool:
+    """True si la sesión se validó con la clave de administración (config.ADMIN_KEY)."""
+    return bool(st.session_state.get("admin_ok"))
+
+
+def render_admin_login(sb=st.sidebar):
+    """Pide la clave de admin (solo si hay una configurada en RNI_ADMIN_KEY)."""
+    if not ADMIN_KEY:
+        return
+
+    if is_admin():
+        sb.caption("🔐 Sesión de administración activa")
+        if sb.button("Salir de admin", key="admin_logout"):
+            st.session_state["admin_ok"] = False
+        return
+
+    clave = sb.text_input("Clave de administración", type="password", key="admin_clave")
+    if clave:
+        st.session_state["admin_ok"] = hmac.compare_digest(clave, ADMIN_KEY)
+        if not st.session_state["admin_ok"]:
+            sb.error("Clave incorrecta.")
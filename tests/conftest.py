@@ -0,0 +1,144 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import db.sqlite_store as store
+from bench.generar_datos import a_tabla_maestra, generar_mediciones
+
+
+@pytest.fixture
+def db_vacia(tmp_path, monkeypatch):
+    """Store apuntado a una DB temporal (como hace bench.correr)."""
+    monkeypatch.setattr(store, "DB_FILE", tmp_path / "rni.db")
+    return store.DB_FILE
+
+
+@pytest.fixture
+def tabla_sintetica():
+    """Tabla maestra sintética de bench.generar_datos (varios CCTE, provincias y localidades)."""
+    def _armar(filas: int = 3_000, seed: int = 7):
+        return a_tabla_maestra(generar_mediciones(filas, seed=seed))
+    return _armar
+
+
+@pytest.fixture
+def db_con_datos(db_vacia, tabla_sintetica):
+    df = tabla_sintetica()
+    store.save_tabla_maestra_to_db(df)
+    return df
+
+
+@pytest.fixture
+def db_con_cambios(db_vacia, tabla_sintetica):
+    """
+    DB armada con las escrituras incrementales del escritor: carga total, append
+    (con localidades nuevas y repetidas), borrado de una localidad y fusión de otras dos.
+    """
+    from db import repository
+
+    base = tabla_sintetica(20_000, seed=7)
+    store.save_tabla_maestra_to_db(base)
+    nuevas = a_tabla_maestra(generar_mediciones(10_000, seed=7, archivo_inicial=100))
+    assert store.append_mediciones_to_db(nuevas) == len(nuevas)
+
+    locs = (
+        pd.concat([base, nuevas])[["Localidad", "CCTE", "Provincia", "Expediente"]]
+        .astype(str).drop_duplicates("Localidad").sort_values("Localidad").to_numpy().tolist()
+    )
+    assert len(locs) >= 3
+    repository.delete_localidad(locs[0][0])
+    origen, (destino, ccte, provincia, expediente) = locs[1][0], locs[2]
+    repository.update_localidad_metadata(origen, ccte, provincia, destino, expediente)
+    return store.DB_FILE
+
+
+@pytest.fixture
+def reconstruccion_igual(db_vacia):
+    """
+    Compara la tabla derivada `tabla` tal como la dejaron las escrituras incrementales
+    con la que arma `rearmar(conn)` desde cero (sin guardar la reconstrucción).
+    """
+    def _comparar(tabla: str, rearmar):
+        conn = sqlite3.connect(db_vacia)
+        try:
+            leer = lambda: pd.read_sql_query(f"SELECT * FROM {tabla}", conn)
+            incremental = leer()
+            rearmar(conn)
+            completo = leer()
+            conn.rollback()
+        finally:
+            conn.close()
+
+        assert len(completo) > 0
+        claves = list(completo.columns)
+        ordenar = lambda df: df.sort_values(claves, kind="stable").reset_index(drop=True)
+        pd.testing.assert_frame_equal(ordenar(incremental), ordenar(completo))
+    return _comparar
+
+
+@pytest.fixture
+def igual_a_reconstruir(db_con_cambios, reconstruccion_igual):
+    """reconstruccion_igual sobre la DB de db_con_cambios."""
+    return reconstruccion_igual
+
+
+def _localidad(df: pd.DataFrame, nombre: str) -> dict:
+    return df.loc[df["Localidad"].astype(str) == nombre].iloc[0][["CCTE", "Provincia", "Expediente"]].astype(str).to_dict()
+
+
+@pytest.fixture
+def db_fusion(db_vacia, tabla_sintetica):
+    """
+    Fusión de dos localidades con update_localidad_metadata (lo que toca cubo y
+    hotspots). El destino ya tenía un archivo con el mismo nombre que uno del origen,
+    así que también se juntan mediciones de archivos repetidos.
+    Devuelve {"origen", "destino", "filas_origen", "filas_destino", "max_vm"}.
+    """
+    from db import repository
+
+    base = tabla_sintetica(20_000, seed=7)
+    origen, destino = sorted(base["Localidad"].astype(str).unique())[:2]
+    dest = _localidad(base, destino)
+
+    # Un archivo del origen, cargado también (otro día, otros valores) en el destino
+    repetido = base.loc[base["Localidad"].astype(str) == origen, "Nombre Archivo"].iloc[0]
+    copia = base.loc[base["Nombre Archivo"] == repetido].astype(object)
+    copia["Localidad"], copia["CCTE"], copia["Provincia"] = destino, dest["CCTE"], dest["Provincia"]
+    copia["Resultado"] = copia["Resultado"].astype(float) * 3
+    tabla = pd.concat([base.astype(object), copia], ignore_index=True)
+
+    store.save_tabla_maestra_to_db(tabla)
+    por_loc = tabla.assign(Resultado=pd.to_numeric(tabla["Resultado"])).groupby("Localidad")["Resultado"]
+    info = {
+        "origen": origen,
+        "destino": destino,
+        "filas_origen": int(por_loc.size()[origen]),
+        "filas_destino": int(por_loc.size()[destino]),
+        "max_vm": float(max(por_loc.max()[origen], por_loc.max()[destino])),
+    }
+    repository.update_localidad_metadata(origen, dest["CCTE"], dest["Provincia"], destino, dest["Expediente"])
+    return info
+
+
+@pytest.fixture
+def db_sin_expediente(db_vacia, tabla_sintetica):
+    """
+    Borrado de un expediente con delete_by_expediente (lo que toca geo y teselas).
+    Sus mediciones repetían el recorrido de un archivo que queda, con valores más
+    altos: las celdas compartidas siguen con puntos y tienen que bajar su máximo.
+    Devuelve {"expediente", "filas_borradas", "max_borrado"}.
+    """
+    from db import repository
+
+    base = tabla_sintetica(20_000, seed=7)
+    store.save_tabla_maestra_to_db(base)
+
+    archivo = base["Nombre Archivo"].iloc[0]
+    copia = base.loc[base["Nombre Archivo"] == archivo].astype(object)
+    copia["Nombre Archivo"], copia["Expediente"] = "medicion_extra.xlsx", "EX-2025-BORRAR-APN-ENACOM"
+    copia["Resultado"] = copia["Resultado"].astype(float) * 5
+    store.append_mediciones_to_db(copia)
+
+    assert repository.delete_by_expediente("EX-2025-BORRAR-APN-ENACOM") == len(copia)
+    return {"expediente": "EX-2025-BORRAR-APN-ENACOM", "filas_borradas": len(copia), "max_borrado": copia["Resultado"].max()}
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import db.sqlite_store as store
+from db import cuantiles
+
+
+def test_incremental_igual_a_reconstruir(igual_a_reconstruir):
+    igual_a_reconstruir(cuantiles.CUANTILES, cuantiles.recalcular)
+
+
+def test_bins_dentro_del_error_relativo():
+    vm = np.geomspace(cuantiles.VM_MIN, 500, 10_000)
+    aprox = cuantiles.valor_bin(cuantiles.bins(vm))
+    assert np.all(np.abs(aprox - vm) <= cuantiles.ERROR_RELATIVO * vm * (1 + 1e-9))
+
+
+@pytest.mark.parametrize("por", [None, "CCTE", "Provincia"])
+def test_percentiles_cerca_de_los_exactos(db_con_cambios, por):
+    tabla = store.load_tabla_maestra_from_db()
+    pct = pd.to_numeric(tabla["Resultado"], errors="coerce").astype("float64") ** 2 / 3770 / 0.20021 * 100
+    pct = pd.DataFrame({"grupo": tabla[por].astype(str) if por else "Total", "pct": pct}).dropna()
+
+    leidos = cuantiles.leer_percentiles(por=por).set_index(por or "Ámbito")
+    assert sorted(leidos.index) == sorted(pct["grupo"].unique())
+    for grupo, d in pct.groupby("grupo"):
+        assert leidos.loc[grupo, "Mediciones"] == len(d)
+        for q in cuantiles.PERCENTILES:
+            exacto = np.quantile(d["pct"].to_numpy(), q, method="lower")
+            # ~2 % por el bin de V/m, más el redondeo a 2 decimales
+            assert leidos.loc[grupo, f"p{q * 100:g} (%)"] == pytest.approx(exacto, rel=0.025, abs=0.01)
+
+
+@pytest.fixture
+def db_cambio_de_anio(db_vacia, tabla_sintetica):
+    """Append de una jornada que cruza el 31/12 a una localidad que ya tenía datos (años nuevos para ella)."""
+    base = tabla_sintetica(20_000, seed=7)
+    store.save_tabla_maestra_to_db(base)
+
+    jornada = base.loc[base["Nombre Archivo"] == base["Nombre Archivo"].iloc[0]].astype(object)
+    ts = pd.Timestamp("2026-12-31 22:00:00") + pd.to_timedelta(np.arange(len(jornada)) * 3, unit="s")
+    jornada["Fecha"], jornada["Hora"] = ts.strftime("%d/%m/%Y"), ts.strftime("%H:%M:%S")
+    jornada["Nombre Archivo"] = "medicion_fin_de_anio.xlsx"
+    store.append_mediciones_to_db(jornada)
+    return {"2026": int((ts.year == 2026).sum()), "2027": int((ts.year == 2027).sum())}
+
+
+def test_cambio_de_anio(db_cambio_de_anio, reconstruccion_igual):
+    reconstruccion_igual(cuantiles.CUANTILES, cuantiles.recalcular)
+
+    # Cada lado de la medianoche cae en su año, también con el filtro global de año
+    por_anio = cuantiles.leer_percentiles(por="Año").set_index("Año")["Mediciones"]
+    for anio, filas in db_cambio_de_anio.items():
+        assert por_anio[int(anio)] == filas
+        assert cuantiles.leer_percentiles({"anio": anio})["Mediciones"].tolist() == [filas]
+    assert por_anio.sum() == cuantiles.leer_percentiles()["Mediciones"].sum()
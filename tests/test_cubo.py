@@ -0,0 +1,27 @@
+import pandas as pd
+
+import db.sqlite_store as store
+from db import cubo, schema
+
+
+def test_incremental_igual_a_reconstruir(igual_a_reconstruir):
+    igual_a_reconstruir(cubo.CUBO, cubo.recalcular)
+
+
+def test_leer_cubo_cuenta_todas_las_filas(db_con_cambios):
+    conn = store.conectar_lectura()
+    try:
+        filas = conn.execute(f"SELECT COUNT(*) FROM {schema.FACT_TABLE}").fetchone()[0]
+        puntos = cubo.leer_cubo(conn=conn)["puntos"]
+    finally:
+        conn.close()
+    assert int(pd.to_numeric(puntos).sum()) == filas
+
+
+def test_fusion_de_localidades(db_fusion, reconstruccion_igual):
+    reconstruccion_igual(cubo.CUBO, cubo.recalcular)
+
+    cubo_df = cubo.leer_cubo()
+    por_loc = cubo_df.groupby("Localidad")["puntos"].sum()
+    assert db_fusion["origen"] not in por_loc.index
+    assert por_loc[db_fusion["destino"]] == db_fusion["filas_origen"] + db_fusion["filas_destino"]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from utils.downsampling import lttb, minmax_por_tramo, reducir_serie
+
+
+def _serie(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype="float64")
+    y = np.sin(x / 300) + rng.normal(0, 0.1, n)
+    return x, y
+
+
+def test_serie_corta_queda_entera():
+    x, y = _serie(100)
+    assert np.array_equal(reducir_serie(x, y, 500), np.arange(100))
+
+
+@pytest.mark.parametrize("metodo", ["lttb", "minmax"])
+def test_reduce_y_conserva_el_maximo(metodo):
+    x, y = _serie()
+    y[4321] = 50.0
+    idx = reducir_serie(x, y, 1_000, metodo=metodo)
+    # mín/máx por tramo más los extremos de la serie y el máximo global
+    assert len(idx) <= 1_000 + 3
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+
+def test_lttb_mantiene_extremos():
+    x, y = _serie()
+    idx = lttb(x, y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+
+
+def test_minmax_elige_min_y_max_de_cada_tramo():
+    y = np.array([3, 1, 2, 9, 5, 4, 0, 7, 6, 8], dtype="float64")
+    idx = minmax_por_tramo(y, 2)  # tramos [0, 5) y [5, 10)
+    assert {1, 3, 6, 9} <= set(idx.tolist())
+    assert {0, 9} <= set(idx.tolist())
+
+
+def test_metodo_desconocido():
+    x, y = _serie(10)
+    with pytest.raises(ValueError):
+        reducir_serie(x, y, 5, metodo="otro")
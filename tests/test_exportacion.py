@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from processing import exportacion
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exportacion, "EXPORT_DIR", tmp_path / "exports")
+    return exportacion.EXPORT_DIR
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet", "xlsx"])
+def test_exporta_todas_las_filas(db_con_datos, export_dir, formato):
+    ruta, filas = exportacion.exportar_mediciones({}, formato, chunksize=1_000)
+    assert filas == len(db_con_datos)
+    assert ruta.suffix == f".{formato}"
+    # Solo queda el archivo final (el temporal se renombra)
+    assert [p.name for p in export_dir.iterdir()] == [ruta.name]
+
+
+def test_dos_exportaciones_seguidas_no_se_pisan(db_con_datos, export_dir):
+    a, _ = exportacion.exportar_mediciones({}, "csv")
+    b, _ = exportacion.exportar_mediciones({}, "csv")
+    assert a != b
+    assert len(pd.read_csv(a)) == len(pd.read_csv(b)) == len(db_con_datos)
+
+
+def test_error_no_deja_archivos(db_con_datos, export_dir, monkeypatch):
+    def _falla(chunks, destino):
+        destino.write_text("a medias")
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setattr(exportacion, "_exportar_csv", _falla)
+    with pytest.raises(RuntimeError):
+        exportacion.exportar_mediciones({}, "csv")
+    assert list(export_dir.iterdir()) == []
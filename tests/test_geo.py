@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+import db.sqlite_store as store
+from db import geo, schema
+
+
+def test_incremental_igual_a_reconstruir(igual_a_reconstruir):
+    igual_a_reconstruir(geo.GEO, geo.reconstruir)
+
+
+def test_cercanas_igual_a_recorrer_todo(db_con_cambios):
+    conn = store.conectar_lectura()
+    try:
+        puntos = pd.read_sql_query(
+            f"SELECT id, Lat, Lon FROM {schema.FACT_TABLE} WHERE Lat IS NOT NULL AND Lon IS NOT NULL", conn
+        )
+        lat, lon = puntos.loc[len(puntos) // 2, ["Lat", "Lon"]]
+        cerca = geo.cercanas(lat, lon, radio_m=1_500, limite=20, conn=conn)
+    finally:
+        conn.close()
+
+    d = geo.distancia_m(lat, lon, puntos["Lat"], puntos["Lon"])
+    assert cerca.attrs["total"] == int((d <= 1_500).sum()) > 20
+    assert cerca["Distancia (m)"].tolist() == np.sort(d)[:20].round(1).tolist()
+
+
+def test_borrar_expediente(db_sin_expediente, reconstruccion_igual):
+    reconstruccion_igual(geo.GEO, geo.reconstruir)
+
+    conn = store.conectar_lectura()
+    try:
+        indexadas = conn.execute(f"SELECT COUNT(*), MAX(resultado) FROM {geo.GEO}").fetchone()
+        validas = conn.execute(
+            f"SELECT COUNT(*) FROM {schema.FACT_TABLE} WHERE Lat IS NOT NULL AND Lon IS NOT NULL"
+        ).fetchone()[0]
+        huerfanas = conn.execute(
+            f"SELECT COUNT(*) FROM {geo.GEO} g LEFT JOIN {schema.FACT_TABLE} m ON m.id = g.medicion_id WHERE m.id IS NULL"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert indexadas[0] == validas
+    assert huerfanas == 0
+    assert indexadas[1] < db_sin_expediente["max_borrado"]
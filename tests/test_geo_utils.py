@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.geo_utils import (
+    NOTA_CERO,
+    NOTA_FUERA_PAIS,
+    NOTA_FUERA_RANGO,
+    NOTA_ILEGIBLE,
+    NOTA_INVERTIDAS,
+    NOTA_SIGNO,
+    NOTA_SIN_DATO,
+    normalizar_coordenadas,
+    parse_dms_to_decimal,
+)
+
+
+def _una(lat, lon):
+    return normalizar_coordenadas([lat], [lon]).iloc[0]
+
+
+def test_canonica_queda_igual():
+    r = _una(-34.6, -58.4)
+    assert r["CoordValida"] and pd.isna(r["CoordNota"])
+    assert (r["Lat"], r["Lon"]) == (-34.6, -58.4)
+    assert np.isnan(r["LatOriginal"])
+
+
+def test_signo_corregido():
+    r = _una(34.6, 58.4)
+    assert r["CoordValida"] and r["CoordNota"] == NOTA_SIGNO
+    assert (r["Lat"], r["Lon"]) == (-34.6, -58.4)
+    assert (r["LatOriginal"], r["LonOriginal"]) == (34.6, 58.4)
+
+
+def test_invertidas():
+    r = _una(-58.4, -34.6)
+    assert r["CoordValida"] and r["CoordNota"] == NOTA_INVERTIDAS
+    assert (r["Lat"], r["Lon"]) == (-34.6, -58.4)
+
+
+def test_texto_dms():
+    r = _una("34°36'S", "58°24'O")
+    assert r["CoordValida"] and pd.isna(r["CoordNota"])
+    assert r["Lat"] == pytest.approx(-34.6)
+    assert r["Lon"] == pytest.approx(-58.4)
+
+
+@pytest.mark.parametrize("lat, lon, nota", [
+    (None, -58.4, NOTA_SIN_DATO),
+    ("sin dato", -58.4, NOTA_ILEGIBLE),
+    (-134.0, -58.4, NOTA_FUERA_RANGO),
+    (0, 0, NOTA_CERO),
+    (40.4, -3.7, NOTA_FUERA_PAIS),
+])
+def test_invalidas(lat, lon, nota):
+    r = _una(lat, lon)
+    assert not r["CoordValida"] and r["CoordNota"] == nota
+    assert np.isnan(r["Lat"]) and np.isnan(r["Lon"])
+
+
+def test_conserva_indice():
+    lat = pd.Series([-34.6, 34.6], index=[10, 20])
+    out = normalizar_coordenadas(lat, [-58.4, 58.4])
+    assert out.index.tolist() == [10, 20]
+    assert pd.isna(out.loc[10, "CoordNota"]) and out.loc[20, "CoordNota"] == NOTA_SIGNO
+
+
+@pytest.mark.parametrize("val, esperado", [
+    ("34 36 0 S", -34.6),
+    ("S 34°36'", -34.6),
+    ("-58,4", -58.4),
+    ("58°24'00\" W", -58.4),
+    (12.5, 12.5),
+])
+def test_parse_dms(val, esperado):
+    assert parse_dms_to_decimal(val) == pytest.approx(esperado)
+
+
+def test_parse_dms_vacio():
+    assert np.isnan(parse_dms_to_decimal(None))
+    assert np.isnan(parse_dms_to_decimal("s/d"))
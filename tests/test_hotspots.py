@@ -0,0 +1,31 @@
+import pytest
+
+import db.sqlite_store as store
+from db import hotspots
+
+
+def test_incremental_igual_a_reconstruir(igual_a_reconstruir):
+    igual_a_reconstruir(hotspots.PICOS, hotspots.recalcular)
+
+
+def test_ranking_igual_a_maximo_por_localidad(db_con_cambios):
+    tabla = store.load_tabla_maestra_from_db()
+    esperado = tabla.groupby("Localidad", observed=True)["Resultado"].max().sort_values(ascending=False)
+
+    ranking = hotspots.leer_ranking()
+    assert ranking["Localidad"].tolist() == esperado.index.astype(str).tolist()
+    assert ranking["MaxVm"].tolist() == pytest.approx(esperado.tolist())
+    # La fila del pico es la de ese máximo
+    assert ranking["Resultado"].astype(float).tolist() == pytest.approx(ranking["MaxVm"].tolist())
+
+
+def test_fusion_de_localidades(db_fusion, reconstruccion_igual):
+    reconstruccion_igual(hotspots.PICOS, hotspots.recalcular)
+
+    ranking = hotspots.leer_ranking()
+    assert db_fusion["origen"] not in ranking["Localidad"].tolist()
+    fila = ranking.set_index("Localidad").loc[db_fusion["destino"]]
+    # El pico del destino es el de las dos localidades juntas y apunta a esa medición
+    assert fila["MaxVm"] == pytest.approx(db_fusion["max_vm"])
+    assert float(fila["Resultado"]) == pytest.approx(fila["MaxVm"])
+    assert fila["Puntos"] == db_fusion["filas_origen"] + db_fusion["filas_destino"]
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from utils import perfilado as perf
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(perf, "PERF_LOG_FILE", tmp_path / "render_times.jsonl")
+    return perf.PERF_LOG_FILE
+
+
+def test_seccion_anidada_no_pisa_las_filas(log):
+    @perf.perfilado("adentro")
+    def adentro():
+        perf.registrar_filas(7)
+
+    @perf.perfilado("afuera")
+    def afuera():
+        perf.registrar_filas(100)
+        adentro()
+
+    afuera()
+    filas = perf.leer_registros().set_index("seccion")["filas"]
+    assert filas.to_dict() == {"adentro": 7, "afuera": 100}
+
+
+def test_fragmento_sin_registro(log, monkeypatch):
+    monkeypatch.setattr(perf, "_rerun_parcial", lambda: True)
+    monkeypatch.setattr(perf.st, "fragment", lambda fn, run_every=None: fn)
+
+    @perf.fragmento("espera", run_every=1, registrar=False)
+    def espera():
+        return "ok"
+
+    @perf.fragmento("tabla")
+    def tabla():
+        return "ok"
+
+    assert espera() == tabla() == "ok"
+    assert perf.leer_registros()["seccion"].str.endswith("tabla").tolist() == [True]
+
+
+def test_registra_rss_sin_tracemalloc(log):
+    @perf.perfilado("seccion")
+    def seccion():
+        return bytearray(20 * 1024 * 1024)
+
+    seccion()
+    reg = perf.leer_registros().iloc[0]
+    # Se mide por defecto (puede ser negativa si el proceso liberó memoria)
+    assert pd.notna(reg["mem_rss_mb"])
+    assert pd.isna(reg["mem_pico_mb"])
@@ -0,0 +1,22 @@
+import sqlite3
+
+import pytest
+
+from db import particiones, schema
+
+
+@pytest.mark.parametrize("fecha, anio", [
+    ("02/06/2024", 2024),
+    ("2023-11-30", 2023),
+    ("2023-11-30 10:00:00", 2023),
+    ("sin fecha", 0),
+    (None, 0),
+])
+def test_anio_fecha_igual_en_hechos_y_particiones(fecha, anio):
+    conn = sqlite3.connect(":memory:")
+    try:
+        de_hechos = conn.execute(f"SELECT {schema.ANIO_FECHA_SQL} FROM (SELECT ? AS Fecha) m", (fecha,)).fetchone()[0]
+        de_vista = conn.execute(f"SELECT {particiones.ANIO_SQL} FROM (SELECT ? AS Fecha)", (fecha,)).fetchone()[0]
+    finally:
+        conn.close()
+    assert de_hechos == de_vista == anio
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import db.sqlite_store as store
+from processing.streaming import agregar_por_bloques, resumen_por_localidad_streaming
+
+
+@pytest.fixture
+def db_bench(db_vacia, tabla_sintetica):
+    # Con este tamaño los grupos llegan en otro orden en serie y en el pool
+    df = tabla_sintetica(20_000, seed=42)
+    store.save_tabla_maestra_to_db(df)
+    return df
+
+
+def test_pool_igual_a_serie(db_bench):
+    por = ["CCTE", "Provincia", "Localidad"]
+    serie = agregar_por_bloques(por, procesos=1).resultado()
+    pool = agregar_por_bloques(por, procesos=2).resultado()
+    pd.testing.assert_frame_equal(serie, pool)
+
+
+def test_resumen_pool_igual_a_serie(db_bench):
+    serie = resumen_por_localidad_streaming(procesos=1)
+    pool = resumen_por_localidad_streaming(procesos=2)
+    assert serie.equals(pool)
+    assert serie.attrs["filas"] == pool.attrs["filas"] == len(db_bench)
+
+
+def _por_bloques(df, por, bloques):
+    from processing.streaming import AgregadoStreaming
+
+    total = AgregadoStreaming(por)
+    for parte in bloques:
+        parcial = AgregadoStreaming(por)
+        parcial.agregar(df.iloc[parte])
+        total.combinar(parcial)
+    return total
+
+
+def test_combinar_igual_a_todo_junto(tabla_sintetica):
+    df = tabla_sintetica()
+    por = ["CCTE", "Provincia", "Localidad"]
+    todo = _por_bloques(df, por, [slice(None)])
+    partes = _por_bloques(df, por, [slice(2_000, None), slice(0, 700), slice(700, 2_000)])
+    assert partes.filas == todo.filas == len(df)
+    pd.testing.assert_frame_equal(partes.resultado(), todo.resultado())
+
+
+def test_rollup_igual_a_agregar_con_menos_claves(tabla_sintetica):
+    df = tabla_sintetica()
+    fino = _por_bloques(df, ["CCTE", "Provincia", "Localidad"], [slice(0, 1_500), slice(1_500, None)])
+    grueso = _por_bloques(df, ["CCTE"], [slice(None)])
+    pd.testing.assert_frame_equal(fino.resultado(["CCTE"]), grueso.resultado())
+    with pytest.raises(ValueError):
+        grueso.resultado(["Localidad"])
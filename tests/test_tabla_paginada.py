@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from sections.tabla_paginada import paginar
+
+
+def _df():
+    return pd.DataFrame({
+        "Localidad": pd.Categorical(["Rosario", "Córdoba", "rosario norte", "Salta", "Mendoza"]),
+        "Resultado": [3.0, np.nan, 1.0, 5.0, 1.0],
+        "Obs": ["a", "B", "c", "b", None],
+    })
+
+
+def test_pagina_y_total():
+    page, total = paginar(_df(), offset=2, limite=2)
+    assert total == 5
+    assert page.index.tolist() == [2, 3]
+
+
+def test_orden_estable_con_nan_al_final():
+    page, _ = paginar(_df(), orden="Resultado", limite=10)
+    assert page.index.tolist() == [2, 4, 0, 3, 1]
+    page, _ = paginar(_df(), orden="Resultado", ascendente=False, limite=10)
+    assert page.index.tolist() == [3, 0, 2, 4, 1]
+
+
+def test_busqueda_sin_mayusculas_y_en_categorias():
+    page, total = paginar(_df(), busqueda="ROSARIO")
+    assert total == 2
+    assert page.index.tolist() == [0, 2]
+    page, total = paginar(_df(), busqueda="b")
+    assert total == 2 and page.index.tolist() == [1, 3]
+
+
+def test_busqueda_y_orden_juntos():
+    page, total = paginar(_df(), orden="Resultado", ascendente=False, busqueda="rosario", limite=1)
+    assert total == 2
+    assert page.index.tolist() == [0]
+
+
+def test_tipos_mezclados_ordena_como_texto():
+    df = pd.DataFrame({"x": [10, "b", 2, "a"]})
+    page, _ = paginar(df, orden="x")
+    assert page["x"].astype(str).tolist() == ["10", "2", "a", "b"]
+
+
+def test_columna_inexistente_no_ordena():
+    page, _ = paginar(_df(), orden="Nada", limite=10)
+    assert page.index.tolist() == [0, 1, 2, 3, 4]
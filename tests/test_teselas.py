@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+import db.sqlite_store as store
+from db import geo, teselas
+
+
+def test_incremental_igual_a_reconstruir(igual_a_reconstruir):
+    igual_a_reconstruir(teselas.TESELAS, teselas.reconstruir)
+
+
+def test_cada_nivel_suma_el_indice(db_con_cambios):
+    conn = store.conectar_lectura()
+    try:
+        puntos, maximo = conn.execute(f"SELECT COUNT(*), MAX(resultado) FROM {geo.GEO}").fetchone()
+        niveles = pd.read_sql_query(
+            f"SELECT nivel, SUM(puntos) AS puntos, MAX(max_vm) AS max_vm FROM {teselas.TESELAS} GROUP BY nivel", conn
+        )
+    finally:
+        conn.close()
+    assert niveles["nivel"].tolist() == list(range(teselas.NIVELES))
+    assert (niveles["puntos"] == puntos).all()
+    assert niveles["max_vm"].tolist() == pytest.approx([maximo] * teselas.NIVELES)
+
+
+def test_nivel_mas_fino_que_entra(db_con_cambios):
+    caja = (-56.0, -21.0, -74.0, -53.0)
+    fino = teselas.leer_teselas(*caja)
+    grueso = teselas.leer_teselas(*caja, max_teselas=3)
+    assert len(grueso) <= 3 < len(fino)
+    assert grueso.attrs["nivel"] > fino.attrs["nivel"]
+    assert grueso["puntos"].sum() == fino["puntos"].sum()
+
+
+def test_borrar_expediente(db_sin_expediente, reconstruccion_igual):
+    reconstruccion_igual(teselas.TESELAS, teselas.reconstruir)
+
+    conn = store.conectar_lectura()
+    try:
+        por_nivel = pd.read_sql_query(
+            f"SELECT nivel, SUM(puntos) AS puntos, MAX(max_vm) AS max_vm FROM {teselas.TESELAS} GROUP BY nivel", conn
+        )
+        puntos, maximo = conn.execute(f"SELECT COUNT(*), MAX(resultado) FROM {geo.GEO}").fetchone()
+    finally:
+        conn.close()
+    # Las celdas que compartía con lo que queda bajaron al máximo de lo que queda
+    assert (por_nivel["puntos"] == puntos).all()
+    assert por_nivel["max_vm"].tolist() == pytest.approx([maximo] * teselas.NIVELES)
+    assert maximo < db_sin_expediente["max_borrado"]
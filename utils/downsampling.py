@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import numpy as np
+
+METODOS = ("lttb", "minmax")
+
+
+def lttb(x, y, umbral: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: índices (ordenados) de a lo sumo `umbral`
+    puntos que conservan la forma de la serie. x debe venir ordenado y sin NaN.
+    Primero y último siempre quedan; de cada tramo se elige el punto que forma
+    el triángulo más grande con el elegido antes y el promedio del tramo siguiente.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(np.int64)
+    idx = np.empty(umbral, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(umbral - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        sig_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        cx, cy = x[fin:sig_fin].mean(), y[fin:sig_fin].mean()
+        area = np.abs((x[a] - cx) * (y[ini:fin] - y[a]) - (x[a] - x[ini:fin]) * (cy - y[a]))
+        a = ini + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_por_tramo(y, tramos: int) -> np.ndarray:
+    """Índices (ordenados) del mínimo y el máximo de cada uno de `tramos` tramos consecutivos."""
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    if 2 * tramos >= n or tramos < 1:
+        return np.arange(n)
+
+    bordes = np.linspace(0, n, tramos + 1).astype(np.int64)
+    tramo = np.repeat(np.arange(tramos), np.diff(bordes))
+    elegidos = [np.array([0, n - 1])]
+    for extremo in (np.minimum, np.maximum):
+        # Primer índice de cada tramo que alcanza el extremo del tramo (sin ordenar: O(n))
+        cand = np.flatnonzero(y == extremo.reduceat(y, bordes[:-1])[tramo])
+        _, primero = np.unique(tramo[cand], return_index=True)
+        elegidos.append(cand[primero])
+    return np.unique(np.concatenate(elegidos))
+
+
+def reducir_serie(x, y, max_puntos: int, metodo: str = "lttb") -> np.ndarray:
+    """
+    Índices a graficar de una serie (x ordenado, sin NaN) con a lo sumo ~max_puntos.
+    El máximo global de y queda siempre incluido: es lo que se busca en el gráfico.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de reducción desconocido: {metodo!r} (opciones: {', '.join(METODOS)})")
+
+    y = np.asarray(y, dtype="float64")
+    if len(y) <= max_puntos:
+        return np.arange(len(y))
+
+    if metodo == "lttb":
+        idx = lttb(x, y, max_puntos)
+    else:
+        idx = minmax_por_tramo(y, max_puntos // 2)
+    return np.union1d(idx, [int(np.argmax(y))])
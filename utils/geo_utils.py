@@ -2,6 +2,25 @@ import re
 import numpy as np
 import pandas as pd
 
+# Caja de Argentina (continental + Tierra del Fuego y Malvinas), en la convención canónica
+ARGENTINA_LAT = (-56.0, -21.0)
+ARGENTINA_LON = (-74.0, -53.0)
+
+# Notas de normalización (None = coordenada tal cual llegó)
+NOTA_SIGNO = "signo corregido"
+NOTA_INVERTIDAS = "Lat/Lon invertidas"
+NOTA_SIN_DATO = "sin coordenadas"
+NOTA_ILEGIBLE = "ilegible"
+NOTA_FUERA_RANGO = "fuera de rango"
+NOTA_CERO = "coordenada 0,0"
+NOTA_FUERA_PAIS = "fuera de Argentina"
+
+_HEMI = "NnSsEeWwOo"
+_RE_DMS = re.compile(
+    rf'([+-]?\d+(?:\.\d+)?)[^\d.{_HEMI}]+(\d+(?:\.\d+)?)(?:[^\d.{_HEMI}]+(\d+(?:\.\d+)?))?[^\d{_HEMI}]*([{_HEMI}])?'
+)
+_RE_HEMI_INICIO = re.compile(rf'^\W*([{_HEMI}])\b')
+
 
 def parse_dms_to_decimal(val):
     """Convierte coordenadas DMS (grados, minutos, segundos) a decimal."""
@@ -9,21 +28,90 @@ def parse_dms_to_decimal(val):
         return np.nan
     try:
         return float(val)
-    except:
+    except (TypeError, ValueError):
         pass
     s = str(val).strip().replace(",", ".")
-    m = re.search(r'([+-]?\d+(?:\.\d+)?)\D+(\d+(?:\.\d+)?)\D+(\d+(?:\.\d+)?)\D*\s*([NnSsEeWwOo])?', s)
+    inicio = _RE_HEMI_INICIO.search(s)
+    m = _RE_DMS.search(s)
     if m:
-        d = float(m.group(1)); mnt = float(m.group(2)); sec = float(m.group(3))
-        hemi = (m.group(4) or "").upper()
+        d = float(m.group(1)); mnt = float(m.group(2)); sec = float(m.group(3) or 0)
+        hemi = (m.group(4) or (inicio.group(1) if inicio else "")).upper()
         dec = abs(d) + mnt/60.0 + sec/3600.0
-        if hemi in ("S","W","O"):
+        if hemi in ("S","W","O") or (not hemi and d < 0):
             dec = -dec
         return dec
     m2 = re.search(r'([-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)', s)
     if m2:
         try:
-            return float(m2.group(1))
-        except:
+            dec = float(m2.group(1))
+        except ValueError:
             return np.nan
+        hemi = re.search(rf'([{_HEMI}])\W*$', s) or inicio
+        if hemi and hemi.group(1).upper() in ("S", "W", "O"):
+            dec = -abs(dec)
+        return dec
     return np.nan
+
+
+def _a_decimal(s: pd.Series) -> pd.Series:
+    """Numérico directo y DMS/texto solo para lo que no convierte."""
+    s = pd.Series(s)
+    num = pd.to_numeric(s, errors="coerce")
+    resto = num.isna() & s.notna()
+    if resto.any():
+        num = num.astype("float64")
+        num[resto] = s[resto].map(parse_dms_to_decimal).astype("float64")
+    return num.astype("float64")
+
+
+def _en_argentina(lat: pd.Series, lon: pd.Series) -> pd.Series:
+    return lat.between(*ARGENTINA_LAT) & lon.between(*ARGENTINA_LON)
+
+
+def normalizar_coordenadas(lat, lon) -> pd.DataFrame:
+    """
+    Lat/Lon crudas (número, texto o DMS) -> coordenada canónica con signo.
+
+    Argentina está en los hemisferios sur y oeste: los valores positivos se pasan a
+    negativos y, si Lat y Lon vienen cruzadas (la latitud cae en el rango de
+    longitudes y viceversa), se invierten. Lo que no queda dentro del país (o no se
+    puede leer) sale con Lat/Lon nulas y CoordValida = False.
+
+    Devuelve Lat, Lon, CoordValida, CoordNota (None si no se tocó nada) y
+    LatOriginal/LonOriginal (lo leído, solo en las filas corregidas o inválidas).
+    """
+    crudo_lat = pd.Series(lat)
+    crudo_lon = pd.Series(lon).set_axis(crudo_lat.index)
+    la, lo = _a_decimal(crudo_lat), _a_decimal(crudo_lon)
+    nota = pd.Series(None, index=la.index, dtype="object")
+
+    faltan = la.isna() | lo.isna()
+    vacias = faltan & (crudo_lat.isna() | crudo_lon.isna())
+    nota[vacias] = NOTA_SIN_DATO
+    nota[faltan & ~vacias] = NOTA_ILEGIBLE
+    nota[~faltan & ((la.abs() > 90) | (lo.abs() > 180))] = NOTA_FUERA_RANGO
+    nota[~faltan & (la == 0) & (lo == 0)] = NOTA_CERO
+
+    # Signo: hemisferios sur y oeste
+    lat_n, lon_n = -la.abs(), -lo.abs()
+    signo = nota.isna() & ((la > 0) | (lo > 0))
+
+    # Cruzadas: solo si así no entran y dadas vuelta sí
+    invertidas = nota.isna() & ~_en_argentina(lat_n, lon_n) & _en_argentina(lon_n, lat_n)
+    lat_n, lon_n = lat_n.where(~invertidas, -lo.abs()), lon_n.where(~invertidas, -la.abs())
+
+    fuera = nota.isna() & ~_en_argentina(lat_n, lon_n)
+    nota[fuera] = NOTA_FUERA_PAIS
+    nota[invertidas & ~fuera] = NOTA_INVERTIDAS
+    nota[signo & ~invertidas & ~fuera] = NOTA_SIGNO
+
+    valida = nota.isna() | nota.isin([NOTA_SIGNO, NOTA_INVERTIDAS])
+    tocada = nota.notna()
+    return pd.DataFrame({
+        "Lat": lat_n.where(valida),
+        "Lon": lon_n.where(valida),
+        "CoordValida": valida,
+        "CoordNota": nota,
+        "LatOriginal": la.where(tocada),
+        "LonOriginal": lo.where(tocada),
+    })
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from config import PERF_LOG_FILE, PERF_LOG_MAX_BYTES, PERF_TRACK_MEMORY
+
+_LOG_LOCK = threading.Lock()
+
+# tracemalloc es global al proceso: mide un solo render a la vez (si otro render
+# reseteara el pico, el que ya estaba midiendo registraría un pico falso)
+_MEM_LOCK = threading.Lock()
+_MEM_EN_USO = False
+
+# Bloque para leer el log desde el final
+_BLOQUE = 64 * 1024
+
+SECCIONES = [
+    "render_inicio",
+    "render_resumen_general",
+    "render_graficos",
+    "render_gestion_localidades",
+    "render_mapa",
+    "render_export_informes",
+    "render_diagnostico",
+]
+
+
+def registrar_filas(n: int):
+    """Las secciones avisan cuántas filas procesaron en este render."""
+    st.session_state["_perf_filas"] = int(n)
+
+
+def _mem_start() -> bool:
+    global _MEM_EN_USO
+    if not PERF_TRACK_MEMORY:
+        return False
+    with _MEM_LOCK:
+        if _MEM_EN_USO:
+            # Render superpuesto: queda sin memoria en el registro
+            return False
+        _MEM_EN_USO = True
+        tracemalloc.start()
+    return True
+
+
+def _mem_stop(base: int) -> float | None:
+    global _MEM_EN_USO
+    with _MEM_LOCK:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _MEM_EN_USO = False
+    return max(0, pico - base) / (1024 * 1024)
+
+
+def _rss_mb() -> float | None:
+    """Memoria residente del proceso en MB (psutil si está; si no, /proc en Linux; None si no se puede)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _ruta_rotada():
+    return PERF_LOG_FILE.with_name(PERF_LOG_FILE.name + ".1")
+
+
+def _escribir_registro(reg: dict):
+    try:
+        PERF_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with _LOG_LOCK:
+            if PERF_LOG_FILE.exists() and PERF_LOG_FILE.stat().st_size >= PERF_LOG_MAX_BYTES:
+                os.replace(PERF_LOG_FILE, _ruta_rotada())
+            with open(PERF_LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(reg, ensure_ascii=False) + "\n")
+    except OSError:
+        # El perfilado nunca debe romper la página
+        pass
+
+
+def perfilado(nombre: str):
+    """
+    Decorador para secciones `render_*`: registra wall time, filas procesadas
+    y memoria en el JSONL de perfilado: siempre la variación de RSS del proceso
+    (barata) y, con PERF_TRACK_MEMORY, el delta de pico de tracemalloc. Si el admin pidió
+    captura cProfile de esta sección, perfila una única ejecución y guarda el
+    reporte en session_state.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Una sección perfilada dentro de otra no pisa las filas de la de afuera
+            filas_afuera = st.session_state.get("_perf_filas")
+            st.session_state["_perf_filas"] = None
+
+            capturar = st.session_state.get("perf_cprofile_proximo") == nombre
+            prof = cProfile.Profile() if capturar else None
+
+            rss0 = _rss_mb()
+            mem_ok = _mem_start()
+            mem_base = tracemalloc.get_traced_memory()[0] if mem_ok else 0
+
+            t0 = time.perf_counter()
+            try:
+                if prof is not None:
+                    prof.enable()
+                return fn(*args, **kwargs)
+            finally:
+                if prof is not None:
+                    prof.disable()
+                wall = time.perf_counter() - t0
+                mem_mb = _mem_stop(mem_base) if mem_ok else None
+                rss1 = _rss_mb()
+
+                _escribir_registro({
+                    "ts": datetime.now().isoformat(timespec="seconds"),
+                    "seccion": nombre,
+                    "wall_s": round(wall, 4),
+                    "filas": st.session_state.get("_perf_filas"),
+                    "mem_rss_mb": round(rss1 - rss0, 2) if rss0 is not None and rss1 is not None else None,
+                    "mem_pico_mb": round(mem_mb, 2) if mem_mb is not None else None,
+                    "cprofile": capturar,
+                })
+                st.session_state["_perf_filas"] = filas_afuera
+
+                if prof is not None:
+                    buf = io.StringIO()
+                    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+                    st.session_state["perf_cprofile_proximo"] = None
+                    st.session_state["perf_cprofile_ultimo"] = {
+                        "seccion": nombre,
+                        "ts": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                        "wall_s": wall,
+                        "reporte": buf.getvalue(),
+                    }
+        return wrapper
+    return deco
+
+
+def _rerun_parcial() -> bool:
+    """True si este rerun es solo de fragmentos (no re-ejecuta toda la app)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def fragmento(nombre: str, run_every=None, registrar: bool = True):
+    """
+    st.fragment con perfilado: un widget adentro re-ejecuta solo esta función,
+    con los argumentos del último render completo. Los reruns parciales se
+    registran como tipo "fragmento" (con la página de la navegación) para
+    compararlos con el rerun completo de esa página (inicio_rerun / fin_rerun).
+    Con `run_every` (segundos o "2s") se re-ejecuta sola cada ese tiempo.
+    Con registrar=False no escribe en el log (avisos de espera que se repiten
+    cada segundo: llenarían el JSONL y correrían los p50/p95).
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registrar or not _rerun_parcial():
+                return fn(*args, **kwargs)
+
+            pagina = st.session_state.get("page", "Inicio")
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _escribir_registro({
+                    "ts": datetime.now().isoformat(timespec="seconds"),
+                    "seccion": f"{pagina} › {nombre}",
+                    "tipo": "fragmento",
+                    "pagina": pagina,
+                    "wall_s": round(time.perf_counter() - t0, 4),
+                })
+        return st.fragment(wrapper, run_every=run_every)
+    return deco
+
+
+def inicio_rerun():
+    """Marca el comienzo de un rerun completo de la app (arriba de app.py)."""
+    st.session_state["_perf_rerun_t0"] = time.perf_counter()
+
+
+def fin_rerun(pagina: str):
+    """Registra el wall time del rerun completo de la app para `pagina`."""
+    t0 = st.session_state.pop("_perf_rerun_t0", None)
+    if t0 is None:
+        return
+    _escribir_registro({
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "seccion": f"app · {pagina}",
+        "tipo": "app",
+        "pagina": pagina,
+        "wall_s": round(time.perf_counter() - t0, 4),
+    })
+
+
+def _ultimas_lineas(ruta, n: int) -> list[str]:
+    """Últimas n líneas de un archivo, leyendo bloques desde el final (no el archivo entero)."""
+    with open(ruta, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        datos = b""
+        while pos > 0 and datos.count(b"\n") <= n:
+            paso = min(_BLOQUE, pos)
+            pos -= paso
+            f.seek(pos)
+            datos = f.read(paso) + datos
+    lineas = datos.decode("utf-8", errors="replace").splitlines()
+    # Con pos > 0 la primera línea está cortada; sobra porque hay más de n saltos
+    return lineas[-n:] if n > 0 else []
+
+
+def leer_registros(max_lineas: int = 20_000) -> pd.DataFrame:
+    """Últimos registros del JSONL de perfilado (completando con la copia rotada)."""
+    lineas: list[str] = []
+    with _LOG_LOCK:
+        for ruta in (PERF_LOG_FILE, _ruta_rotada()):
+            faltan = max_lineas - len(lineas)
+            if faltan <= 0 or not ruta.exists():
+                continue
+            lineas = _ultimas_lineas(ruta, faltan) + lineas
+
+    regs = []
+    for ln in lineas:
+        try:
+            regs.append(json.loads(ln))
+        except json.JSONDecodeError:
+            continue
+    return pd.DataFrame(regs)
+
+
+def resumen_percentiles(regs: pd.DataFrame) -> pd.DataFrame:
+    """p50/p95 de wall time (y memoria) por sección."""
+    if regs is None or regs.empty or "seccion" not in regs.columns:
+        return pd.DataFrame()
+
+    regs = regs.copy()
+    for c in ("wall_s", "filas", "mem_rss_mb", "mem_pico_mb"):
+        regs[c] = pd.to_numeric(regs[c], errors="coerce") if c in regs.columns else float("nan")
+
+    g = regs.groupby("seccion")
+    out = pd.DataFrame({
+        "Renders": g.size(),
+        "p50 (s)": g["wall_s"].quantile(0.50),
+        "p95 (s)": g["wall_s"].quantile(0.95),
+        "Máx (s)": g["wall_s"].max(),
+        "Filas p50": g["filas"].quantile(0.50),
+        "RSS Δ p95 (MB)": g["mem_rss_mb"].quantile(0.95),
+        "Pico tracemalloc p95 (MB)": g["mem_pico_mb"].quantile(0.95),
+    })
+    return out.sort_values("p95 (s)", ascending=False).reset_index().round(3)
+
+
+def comparar_fragmentos(regs: pd.DataFrame) -> pd.DataFrame:
+    """p50 de cada fragmento contra el p50 del rerun completo de su página."""
+    if regs is None or regs.empty or "tipo" not in regs.columns:
+        return pd.DataFrame()
+
+    regs = regs.assign(wall_s=pd.to_numeric(regs["wall_s"], errors="coerce"))
+    frag = regs[regs["tipo"] == "fragmento"]
+    if frag.empty:
+        return pd.DataFrame()
+
+    completo = regs[regs["tipo"] == "app"].groupby("pagina")["wall_s"].median()
+    out = (
+        frag.groupby(["pagina", "seccion"])["wall_s"]
+        .agg(Reruns="size", p50_fragmento="median")
+        .reset_index()
+    )
+    out["p50_completo"] = out["pagina"].map(completo)
+    out["Más rápido (x)"] = out["p50_completo"] / out["p50_fragmento"].where(out["p50_fragmento"] > 0)
+    return out.rename(columns={
+        "pagina": "Página",
+        "seccion": "Fragmento",
+        "p50_fragmento": "p50 fragmento (s)",
+        "p50_completo": "p50 rerun completo (s)",
+    }).round(3)
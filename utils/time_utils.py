@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import timedelta
+import numpy as np
 import pandas as pd
 
 
@@ -25,6 +26,59 @@ def _normalize_time_str(s: pd.Series) -> pd.Series:
     return out
 
 
+def parse_fecha_robusta(s: pd.Series) -> pd.Series:
+    """
+    Parsea fechas texto ("20/03/2025", "2025-03-20", "2025-03-20 10:00:00") a datetime64.
+    ISO primero (con dayfirst, dateutil invierte día/mes en "2025-03-04") y el resto dd/mm/yyyy.
+    Se parsean solo los valores únicos: las fechas se repiten miles de veces.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+
+    codes, uniques = pd.factorize(s.astype("string").str.strip(), use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype="string")
+
+    parsed = pd.to_datetime(uniques, errors="coerce", format="ISO8601")
+    resto = parsed.isna() & uniques.notna()
+    if resto.any():
+        parsed[resto] = pd.to_datetime(uniques[resto], dayfirst=True, errors="coerce", format="mixed")
+
+    # codes == -1 (nulos) apunta al NaT agregado al final
+    values = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    out = values[codes]
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def _parse_horas(horas: pd.Series) -> pd.Series:
+    """
+    Horas normalizadas -> datetime (solo importa la hora). Primero los formatos
+    de siempre (vectorizado); dateutil solo para lo que no encaje.
+    """
+    out = pd.to_datetime(horas, errors="coerce", format="%I:%M:%S%p")
+    for fmt in ("%H:%M:%S", "mixed"):
+        resto = out.isna() & horas.notna() & (horas != "")
+        if not resto.any():
+            break
+        out[resto] = pd.to_datetime(horas[resto], errors="coerce", format=fmt)
+    return out
+
+
+def fechahora_desde_texto(fecha: pd.Series, hora: pd.Series) -> pd.Series:
+    """
+    Fecha + Hora (texto, como quedan en la DB) -> datetime64.
+    Mismo criterio que add_fechahora, pero parseando solo valores únicos.
+    NaT si la fecha o la hora no se pueden interpretar.
+    """
+    fecha_dt = parse_fecha_robusta(fecha).dt.normalize()
+
+    codes, uniques = pd.factorize(hora, use_na_sentinel=True)
+    hora_dt = _parse_horas(_normalize_time_str(pd.Series(uniques, dtype="string")))
+    segundos = (hora_dt.dt.hour * 3600 + hora_dt.dt.minute * 60 + hora_dt.dt.second).to_numpy(dtype="float64")
+    segundos = np.append(segundos, np.nan)[codes]
+
+    return fecha_dt + pd.to_timedelta(segundos, unit="s")
+
+
 def add_fechahora(df: pd.DataFrame, fecha_col="Fecha", hora_col="Hora", out_col="FechaHora") -> pd.DataFrame:
     """
     Crea una columna datetime (out_col) combinando fecha y hora en forma robusta.
@@ -119,7 +173,7 @@ def calcular_tiempo_total_por_archivo(df: pd.DataFrame) -> timedelta:
         group_cols = ["Nombre Archivo", "_Dia"]
 
     # Min/Max por grupo y sumo duraciones (vectorizado, sin apply por fila)
-    agg = out.groupby(group_cols)["FechaHora"].agg(["min", "max"]).reset_index()
+    agg = out.groupby(group_cols, observed=True)["FechaHora"].agg(["min", "max"]).reset_index()
     dur = (agg["max"] - agg["min"]).dropna()
 
     if dur.empty: